@@ -0,0 +1,104 @@
+"""Micro-benchmark de `_classificar_dispositivo` sobre um corpus de rótulos.
+
+Por padrão usa um corpus com a distribuição típica de um decreto/lei goiano; com `--json` os
+rótulos são extraídos de JSONs estruturados pelo parser (arquivos locais baixados do bucket).
+
+    python -m scripts.benchmark_classificador --json saida/*.json --repeticoes 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional
+
+from src.parser.dispositivos import _classificar_dispositivo
+
+ROMANOS = ["I", "II", "III", "IV", "V", "VI", "VII", "VIII", "IX", "X", "XI", "XII", "XIII", "XIV", "XV"]
+
+
+def _corpus_padrao(total_atos: int = 200, semente: int = 7) -> List[str]:
+    aleatorio = random.Random(semente)
+    rotulos: List[str] = []
+    for _ in range(total_atos):
+        for capitulo in ROMANOS[: aleatorio.randint(0, 4)]:
+            rotulos.append(f"CAPÍTULO {capitulo}")
+            if aleatorio.random() < 0.3:
+                rotulos.append("Seção Única")
+        for artigo in range(1, aleatorio.randint(3, 40)):
+            rotulos.append(f"Art. {artigo}{'º' if artigo < 10 else ''}")
+            if aleatorio.random() < 0.05:
+                rotulos.append(f"Art. {artigo}-A")
+            if aleatorio.random() < 0.3:
+                rotulos.append("Parágrafo único")
+            for paragrafo in range(1, aleatorio.randint(1, 4)):
+                rotulos.append(f"§ {paragrafo}º")
+            for inciso in ROMANOS[: aleatorio.randint(0, 8)]:
+                rotulos.append(inciso)
+                for letra in "abcde"[: aleatorio.randint(0, 3)]:
+                    rotulos.append(f"{letra})")
+    return rotulos
+
+
+def _rotulos_json(dispositivos: Iterable[dict]) -> Iterable[str]:
+    pilha = list(dispositivos)
+    while pilha:
+        no = pilha.pop()
+        if not isinstance(no, dict):
+            continue
+        yield no.get("rotulo") or ""
+        pilha.extend(no.get("filhos") or [])
+
+
+def _corpus_json(caminhos: List[str]) -> List[str]:
+    rotulos: List[str] = []
+    for caminho in caminhos:
+        dados = json.loads(Path(caminho).read_text(encoding="utf-8"))
+        rotulos.extend(_rotulos_json(dados.get("dispositivos") or []))
+    return rotulos
+
+
+def _medir(funcao: Callable[[str], object], rotulos: List[str], repeticoes: int) -> float:
+    """Melhor tempo (ns por rótulo) entre as repetições."""
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter_ns()
+        for rotulo in rotulos:
+            funcao(rotulo)
+        melhor = min(melhor, (time.perf_counter_ns() - inicio) / len(rotulos))
+    return melhor
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Mede o custo de classificar rótulos de dispositivos.")
+    parser.add_argument("--json", nargs="*", default=[], help="JSONs do parser para extrair rótulos reais.")
+    parser.add_argument("--repeticoes", type=int, default=10, help="Repetições por cenário (usa o melhor tempo).")
+    args = parser.parse_args(argv)
+
+    rotulos = _corpus_json(args.json) if args.json else _corpus_padrao()
+    if not rotulos:
+        raise SystemExit("Nenhum rótulo encontrado no corpus.")
+    sem_cache = _classificar_dispositivo.__wrapped__
+
+    _classificar_dispositivo.cache_clear()
+    inicio = time.perf_counter_ns()
+    for rotulo in rotulos:
+        _classificar_dispositivo(rotulo)
+    frio = (time.perf_counter_ns() - inicio) / len(rotulos)
+
+    cenarios = {
+        "sem memo": _medir(sem_cache, rotulos, args.repeticoes),
+        "memo (primeira passada)": frio,
+        "memo (aquecido)": _medir(_classificar_dispositivo, rotulos, args.repeticoes),
+    }
+    info = _classificar_dispositivo.cache_info()
+    print(f"Rótulos: {len(rotulos)} ({len(set(rotulos))} distintos); cache: {info.currsize}/{info.maxsize}")
+    for nome, ns in cenarios.items():
+        print(f"{nome:<26} {ns:>9.0f} ns/rótulo  {1e9 / ns:>12,.0f} rótulos/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Benchmark de latência da busca híbrida (`src.consulta.hibrida`) sobre um corpus sintético.
+
+O banco é simulado em memória: a busca textual por um índice invertido com idf e a vetorial por
+produto escalar esparso sobre os vetores do `HashingEmbedder` (no lugar do HNSW), cada uma com a
+latência de rede/consulta informada em `--latencia-ms`. Mede o motor em si (embedding da consulta,
+paralelismo das duas buscas, fusão e reranking) nos modos sequencial e paralelo.
+
+    python -m scripts.benchmark_hibrida --dispositivos 20000 --consultas 200 --latencia-ms 15
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import statistics
+import time
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.consulta.hibrida import MotorHibrido, fundir
+from src.consulta.busca import resultado_de_linha
+from src.utils.embeddings import HashingEmbedder
+
+_TOKEN_RE = re.compile(r"\w+")
+
+ESFERAS = ("br;federal", "br;go;estadual", "br;go;goiania;municipal")
+# Slugs como o crawler grava na URN (tipo qualificado e acentuado), além das formas curtas.
+TIPOS_ATO = (
+    "constituicao",
+    "lei.complementar",
+    "lei.ordinária",
+    "lei",
+    "decreto.numerado",
+    "decreto",
+    "portaria.orçamentária",
+    "portaria",
+)
+TIPOS_DISPOSITIVO = ("artigo", "paragrafo", "inciso", "alinea")
+TEMAS = (
+    "isenção do imposto sobre circulação de mercadorias para energia solar fotovoltaica",
+    "servidor público efetivo estabilidade estágio probatório avaliação de desempenho",
+    "licitação pregão eletrônico dispensa inexigibilidade contrato administrativo",
+    "meio ambiente licenciamento ambiental recursos hídricos outorga de uso da água",
+    "saúde pública vigilância sanitária sistema único de saúde atenção básica",
+    "educação básica piso salarial magistério fundo de manutenção",
+    "trânsito multa infração habilitação veículo automotor",
+    "tributo taxa contribuição de melhoria lançamento crédito tributário prescrição",
+    "segurança pública polícia militar bombeiro corpo de bombeiros",
+    "previdência aposentadoria pensão regime próprio contribuição",
+)
+CONECTIVOS = ("fica", "é", "compete ao", "nos termos do", "observado o disposto em", "na forma da", "para fins de")
+
+
+def _tokens(texto: str) -> List[str]:
+    texto = "".join(ch for ch in unicodedata.normalize("NFKD", texto.lower()) if not unicodedata.combining(ch))
+    return _TOKEN_RE.findall(texto)
+
+
+def _corpus(total: int, semente: int = 7) -> List[Dict]:
+    aleatorio = random.Random(semente)
+    linhas = []
+    for indice in range(total):
+        tema = aleatorio.choice(TEMAS).split()
+        palavras = aleatorio.sample(tema, k=min(len(tema), aleatorio.randint(4, 8)))
+        texto = " ".join(f"{aleatorio.choice(CONECTIVOS)} {palavra}" for palavra in palavras)
+        esfera = aleatorio.choice(ESFERAS)
+        tipo_ato = aleatorio.choice(TIPOS_ATO)
+        ato = indice // 40
+        linhas.append(
+            {
+                "dispositivo_id": f"d{indice}",
+                "ato_id": f"a{ato}",
+                "urn_lexml": f"{esfera};{tipo_ato};2019-01-{ato % 28 + 1:02d};{ato}",
+                "titulo": None,
+                "tipo_ato": tipo_ato,
+                "status_vigencia": "revogado" if aleatorio.random() < 0.1 else "vigente",
+                "id_lexml": f"art{indice % 40 + 1}",
+                "tipo": aleatorio.choice(TIPOS_DISPOSITIVO),
+                "rotulo": f"Art. {indice % 40 + 1}",
+                "trecho": texto,
+            }
+        )
+    return linhas
+
+
+class RepositorioSimulado:
+    """Implementa as duas buscas de `ConsultaRepository` em memória, com latência fixa por chamada."""
+
+    def __init__(self, linhas: List[Dict], embedder: HashingEmbedder, latencia_ms: float) -> None:
+        self.linhas = linhas
+        self.latencia = latencia_ms / 1000
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+        self.dimensoes: Dict[int, List[Tuple[int, float]]] = defaultdict(list)
+        for posicao, linha in enumerate(linhas):
+            for token in set(_tokens(linha["trecho"])):
+                self.postings[token].append(posicao)
+        for inicio in range(0, len(linhas), 1000):
+            lote = linhas[inicio : inicio + 1000]
+            for deslocamento, vetor in enumerate(embedder.embutir([linha["trecho"] for linha in lote])):
+                for dimensao, valor in enumerate(vetor):
+                    if valor:
+                        self.dimensoes[dimensao].append((inicio + deslocamento, valor))
+
+    def _filtrar(self, pontuacoes: Dict[int, float], limite: int, jurisdicao: Optional[str]) -> List[Dict]:
+        ordenados = sorted(pontuacoes.items(), key=lambda item: -item[1])
+        saida = []
+        for posicao, pontuacao in ordenados:
+            linha = self.linhas[posicao]
+            if jurisdicao and not linha["urn_lexml"].startswith(jurisdicao):
+                continue
+            saida.append({**linha, "relevancia": pontuacao})
+            if len(saida) >= limite:
+                break
+        time.sleep(self.latencia)
+        return saida
+
+    def buscar_dispositivos(self, consulta: str, *, limite: int, jurisdicao=None, **_filtros) -> List[Dict]:
+        pontuacoes: Dict[int, float] = defaultdict(float)
+        for token in set(_tokens(consulta)):
+            postings = self.postings.get(token, [])
+            if postings:
+                peso = 1.0 / len(postings)
+                for posicao in postings:
+                    pontuacoes[posicao] += peso
+        return self._filtrar(pontuacoes, limite, jurisdicao)
+
+    def buscar_dispositivos_vetorial(self, embedding: str, *, modelo: str, limite: int, candidatos: int, jurisdicao=None, **_filtros) -> List[Dict]:
+        consulta = [float(valor) for valor in embedding.strip("[]").split(",")]
+        pontuacoes: Dict[int, float] = defaultdict(float)
+        for dimensao, valor in enumerate(consulta):
+            if valor:
+                for posicao, componente in self.dimensoes.get(dimensao, ()):
+                    pontuacoes[posicao] += valor * componente
+        return self._filtrar(pontuacoes, limite, jurisdicao)
+
+
+def _consultas(total: int, semente: int = 11) -> List[str]:
+    aleatorio = random.Random(semente)
+    return [" ".join(aleatorio.sample(aleatorio.choice(TEMAS).split(), k=3)) for _ in range(total)]
+
+
+def _percentil(valores: List[float], fracao: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(fracao * len(ordenados)))]
+
+
+def _medir(motor: MotorHibrido, consultas: List[str], k: int, jurisdicao: Optional[str]) -> List[float]:
+    tempos = []
+    for consulta in consultas:
+        inicio = time.perf_counter()
+        motor.buscar(consulta, k=k, jurisdicao=jurisdicao)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return tempos
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Mede a latência da busca híbrida sobre um corpus sintético.")
+    parser.add_argument("--dispositivos", type=int, default=20000, help="Tamanho do corpus sintético.")
+    parser.add_argument("--consultas", type=int, default=200, help="Consultas medidas por cenário.")
+    parser.add_argument("--latencia-ms", type=float, default=15.0, help="Latência simulada de cada busca no banco.")
+    parser.add_argument("--k", type=int, default=5, help="Dispositivos devolvidos por consulta.")
+    parser.add_argument("--jurisdicao", help="Filtro de jurisdição aplicado em todas as consultas (ex.: go).")
+    args = parser.parse_args(argv)
+
+    embedder = HashingEmbedder()
+    inicio = time.perf_counter()
+    repo = RepositorioSimulado(_corpus(args.dispositivos), embedder, args.latencia_ms)
+    print(f"Corpus: {args.dispositivos} dispositivos indexados em {time.perf_counter() - inicio:.1f}s")
+    consultas = _consultas(args.consultas)
+
+    # Custo local isolado: embedding da consulta e fusão/reranking de 2 × 50 candidatos.
+    listas = [
+        [resultado_de_linha(linha) for linha in repo.linhas[:50]],
+        [resultado_de_linha(linha) for linha in repo.linhas[25:75]],
+    ]
+    inicio = time.perf_counter()
+    for consulta in consultas:
+        embedder.embutir([consulta])
+    embedding_ms = (time.perf_counter() - inicio) * 1000 / len(consultas)
+    inicio = time.perf_counter()
+    for _ in consultas:
+        fundir(listas)
+    fusao_ms = (time.perf_counter() - inicio) * 1000 / len(consultas)
+    print(f"embedding da consulta   {embedding_ms:>8.3f} ms")
+    print(f"fusão + reranking       {fusao_ms:>8.3f} ms")
+
+    for nome, paralelo in (("sequencial", False), ("paralelo", True)):
+        motor = MotorHibrido(repo, embedder, paralelo=paralelo)  # type: ignore[arg-type]
+        try:
+            motor.buscar(consultas[0], k=args.k)  # aquecimento do pool
+            tempos = _medir(motor, consultas, args.k, args.jurisdicao)
+        finally:
+            motor.fechar()
+        print(
+            f"{nome:<23} p50 {statistics.median(tempos):>7.1f} ms  p95 {_percentil(tempos, 0.95):>7.1f} ms  "
+            f"média {statistics.fmean(tempos):>7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -30,19 +30,14 @@ def _fetch_registro(origin_id: str, urn: str) -> dict:
 
 
 def _call_llm(registro: dict, texto: str, *, model: str | None) -> tuple[str, str]:
-    if llm_utils.genai is None:
-        raise SystemExit("Pacote google-generativeai não está instalado.")
-
-    config = llm_utils._get_config(model)  # pylint: disable=protected-access
-    llm_utils.genai.configure(api_key=config.api_key)
+    provider = llm_utils.obter_provider()
     prompt = llm_utils._build_prompt(texto, registro, LLM_HEURISTICS_INFO)  # pylint: disable=protected-access
 
-    modelo = llm_utils.genai.GenerativeModel(config.model)
-    resposta = modelo.generate_content(prompt)  # type: ignore[no-untyped-call]
-    if not resposta.candidates:
+    resposta = provider.gerar(prompt, model=llm_utils.resolver_modelo(model))
+    if resposta.texto is None:
         raise RuntimeError("Resposta vazia do LLM.")
 
-    texto_resposta = resposta.candidates[0].content.parts[0].text  # type: ignore[attr-defined]
+    texto_resposta = resposta.texto
     json_str = llm_utils._extract_first_json_block(texto_resposta)  # pylint: disable=protected-access
     return texto_resposta, json_str
 
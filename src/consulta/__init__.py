@@ -0,0 +1 @@
+"""Consultas sobre o esquema relacional carregado pelo loader."""
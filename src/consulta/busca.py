@@ -0,0 +1,176 @@
+"""Busca textual em português sobre o texto dos dispositivos.
+
+As colunas `busca` (migração 014) são `tsvector` gerados com a configuração `portugues_sem_acento`
+(`portuguese` + `unaccent`), indexados com GIN; o Postgres os recalcula a cada linha gravada, então
+a carga incremental do loader mantém o índice em dia. `buscar_dispositivos` ordena por `ts_rank_cd`
+do dispositivo com bônus para título/ementa do ato e aplica os filtros no próprio SQL.
+
+Uso:
+    python -m src.consulta.busca "revogação de incentivo fiscal" --jurisdicao go --tipo-ato lei --vigente-em 2020-01-01
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import re
+import unicodedata
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from .repository import ConsultaRepository
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+_SEPARADORES_TIPO_RE = re.compile(r"[\s_/-]+")
+
+LIMITE_PADRAO = 20
+LIMITE_MAXIMO = 200
+
+# Atalhos aceitos em `jurisdicao`; qualquer outro valor é usado como prefixo da URN.
+JURISDICOES = {
+    "federal": "br;federal",
+    "go": "br;go;estadual",
+    "goias": "br;go;estadual",
+    "estadual": "br;go;estadual",
+}
+
+
+@dataclass
+class ResultadoBusca:
+    dispositivo_id: str
+    ato_id: str
+    urn: str
+    titulo: Optional[str]
+    tipo_ato: Optional[str]
+    status_vigencia: Optional[str]
+    id_lexml: str
+    tipo: str
+    rotulo: Optional[str]
+    trecho: str
+    relevancia: float
+
+    @property
+    def urn_dispositivo(self) -> str:
+        """URN do ato com o dispositivo como fragmento (`...;21500!art2p1`)."""
+        return f"{self.urn}!{self.id_lexml}" if self.id_lexml else self.urn
+
+
+def _prefixo_jurisdicao(jurisdicao: Optional[str]) -> Optional[str]:
+    if not jurisdicao:
+        return None
+    valor = jurisdicao.strip().lower()
+    return JURISDICOES.get(valor, valor)
+
+
+def normalizar_tipo_ato(tipo: str) -> str:
+    """Tipo do ato na forma comparada pelo SQL: minúsculas, sem acentos e com "." entre as palavras
+    (`Lei Ordinária` → `lei.ordinaria`, `decreto-lei` → `decreto.lei`)."""
+    tipo = unicodedata.normalize("NFKD", tipo.strip().lower())
+    tipo = "".join(ch for ch in tipo if not unicodedata.combining(ch))
+    return _SEPARADORES_TIPO_RE.sub(".", tipo).strip(".")
+
+
+def normalizar_filtros(
+    *,
+    jurisdicao: Optional[str] = None,
+    tipos_ato: Optional[Sequence[str]] = None,
+    tipos_dispositivo: Optional[Sequence[str]] = None,
+    status_vigencia: Optional[Sequence[str]] = None,
+    vigente_em: Optional[date] = None,
+) -> Dict:
+    """Filtros no formato esperado por `ConsultaRepository` (atalhos de jurisdição, tipos em minúsculas).
+
+    Os tipos de ato casam por prefixo no SQL: `lei` traz também `lei.ordinaria` e `lei.complementar`."""
+    return {
+        "jurisdicao": _prefixo_jurisdicao(jurisdicao),
+        "tipos_ato": [normalizar_tipo_ato(tipo) for tipo in tipos_ato] if tipos_ato else None,
+        "tipos_dispositivo": [tipo.strip().lower() for tipo in tipos_dispositivo] if tipos_dispositivo else None,
+        "status_vigencia": list(status_vigencia) if status_vigencia else None,
+        "vigente_em": vigente_em,
+    }
+
+
+def resultado_de_linha(linha: Dict) -> ResultadoBusca:
+    return ResultadoBusca(
+        dispositivo_id=linha["dispositivo_id"],
+        ato_id=linha["ato_id"],
+        urn=linha.get("urn_lexml") or "",
+        titulo=linha.get("titulo"),
+        tipo_ato=linha.get("tipo_ato"),
+        status_vigencia=linha.get("status_vigencia"),
+        id_lexml=linha.get("id_lexml") or "",
+        tipo=linha.get("tipo") or "",
+        rotulo=linha.get("rotulo"),
+        trecho=linha.get("trecho") or "",
+        relevancia=float(linha.get("relevancia") or 0.0),
+    )
+
+
+def buscar(
+    consulta: str,
+    *,
+    limite: int = LIMITE_PADRAO,
+    jurisdicao: Optional[str] = None,
+    tipos_ato: Optional[Sequence[str]] = None,
+    tipos_dispositivo: Optional[Sequence[str]] = None,
+    status_vigencia: Optional[Sequence[str]] = None,
+    vigente_em: Optional[date] = None,
+    repo: Optional[ConsultaRepository] = None,
+) -> List[ResultadoBusca]:
+    """Dispositivos mais relevantes para `consulta` (sintaxe de busca web: aspas, `or`, `-termo`).
+
+    `vigente_em` mantém só dispositivos com versão em vigor na data (ou sem versões registradas);
+    `status_vigencia` filtra pela situação do ato."""
+    consulta = (consulta or "").strip()
+    if not consulta:
+        return []
+    repo = repo or ConsultaRepository()
+    linhas = repo.buscar_dispositivos(
+        consulta,
+        limite=max(1, min(limite, LIMITE_MAXIMO)),
+        **normalizar_filtros(
+            jurisdicao=jurisdicao,
+            tipos_ato=tipos_ato,
+            tipos_dispositivo=tipos_dispositivo,
+            status_vigencia=status_vigencia,
+            vigente_em=vigente_em,
+        ),
+    )
+    return [resultado_de_linha(linha) for linha in linhas]
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Busca textual nos dispositivos carregados")
+    parser.add_argument("consulta", help="Termos da busca")
+    parser.add_argument("--limite", type=int, default=LIMITE_PADRAO, help="Máximo de resultados")
+    parser.add_argument("--jurisdicao", help="go, federal ou prefixo de URN (ex.: br;go;estadual)")
+    parser.add_argument("--tipo-ato", action="append", dest="tipos_ato", help="Tipo do ato (repetível)")
+    parser.add_argument(
+        "--tipo-dispositivo",
+        action="append",
+        dest="tipos_dispositivo",
+        help="Tipo do dispositivo: artigo, paragrafo, inciso... (repetível)",
+    )
+    parser.add_argument("--status", action="append", dest="status_vigencia", help="Situação do ato (repetível)")
+    parser.add_argument("--vigente-em", type=date.fromisoformat, help="Só dispositivos em vigor na data (AAAA-MM-DD)")
+    args = parser.parse_args(argv)
+
+    resultados = buscar(
+        args.consulta,
+        limite=args.limite,
+        jurisdicao=args.jurisdicao,
+        tipos_ato=args.tipos_ato,
+        tipos_dispositivo=args.tipos_dispositivo,
+        status_vigencia=args.status_vigencia,
+        vigente_em=args.vigente_em,
+    )
+    logging.info("%s resultado(s) para %r.", len(resultados), args.consulta)
+    for resultado in resultados:
+        print(f"{resultado.relevancia:.4f}  {resultado.urn_dispositivo}  {resultado.rotulo or ''}")
+        print(f"    {resultado.trecho}")
+
+
+if __name__ == "__main__":
+    main()
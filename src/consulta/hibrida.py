@@ -0,0 +1,231 @@
+"""Recuperação híbrida (PRD 7.1): busca textual + vetorial, fusão por RRF e reranking hierárquico.
+
+As duas buscas rodam em paralelo, cada uma com os filtros de jurisdição, tipo e vigência aplicados no
+SQL (`buscar_dispositivos`, migração 014, e `buscar_dispositivos_vetorial`, migração 016; o vetor da
+consulta é calculado na thread da busca vetorial, em paralelo com a textual). As listas são fundidas
+por reciprocal rank fusion, que só usa as posições e dispensa calibrar ts_rank contra cosseno, e a
+pontuação fundida é multiplicada por pesos da hierarquia normativa tirados da URN do ato (esfera e
+tipo: CF > CE > municipal) e do tipo do dispositivo.
+
+Uso:
+    python -m src.consulta.hibrida "isenção de ICMS para energia solar" --k 5 --jurisdicao go
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from ..utils.embeddings import Embedder, obter_embedder, vetor_pgvector
+from .busca import ResultadoBusca, normalizar_filtros, normalizar_tipo_ato, resultado_de_linha
+from .repository import ConsultaRepository
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+K_PADRAO = 5
+K_RRF = 60
+CANDIDATOS_POR_BUSCA = 50
+CANDIDATOS_HNSW = 200
+
+# Pesos multiplicativos sobre a pontuação RRF: desempatam e reordenam resultados de relevância
+# parecida, sem deixar um ato de hierarquia maior e pouco relevante passar à frente de tudo. Tipos
+# qualificados sem entrada própria (`decreto.numerado`, `portaria.orcamentaria`) usam o tipo base.
+PESO_ESFERA = {"federal": 1.1, "estadual": 1.0, "municipal": 0.9}
+PESO_TIPO_ATO = {
+    "constituicao": 1.3,
+    "emenda.constitucional": 1.2,
+    "lei.organica": 1.15,
+    "lei.complementar": 1.1,
+    "lei": 1.0,
+    "lei.ordinaria": 1.0,
+    "lei.delegada": 1.0,
+    "decreto.lei": 1.0,
+    "decreto.legislativo": 0.95,
+    "decreto": 0.95,
+    "resolucao": 0.9,
+    "instrucao.normativa": 0.85,
+    "portaria": 0.85,
+}
+PESO_TIPO_DISPOSITIVO = {
+    "artigo": 1.0,
+    "paragrafo": 1.0,
+    "paragrafo_unico": 1.0,
+    "inciso": 0.97,
+    "alinea": 0.95,
+    "item": 0.95,
+}
+PESO_ESTRUTURAL = 0.9  # títulos, capítulos, seções: rótulo e ementa, pouco conteúdo normativo
+PESO_REVOGADO = 0.6
+
+
+@dataclass
+class ResultadoHibrido(ResultadoBusca):
+    posicao_textual: Optional[int] = None
+    posicao_vetorial: Optional[int] = None
+    rrf: float = 0.0
+    peso: float = 1.0
+    pontuacao: float = 0.0
+
+
+def esfera_da_urn(urn: str) -> Optional[str]:
+    partes = urn.split(";")
+    if len(partes) > 1 and partes[1] == "federal":
+        return "federal"
+    for esfera in ("municipal", "estadual"):
+        if esfera in partes:
+            return esfera
+    return None
+
+
+def peso_hierarquia(urn: str, tipo_dispositivo: str, status_vigencia: Optional[str] = None) -> float:
+    """Peso do resultado pela esfera e tipo do ato (da URN `...;<tipo>;<data>;<numero>`) e pelo tipo do dispositivo."""
+    partes = urn.split(";")
+    tipo_ato = normalizar_tipo_ato(partes[-3]) if len(partes) >= 4 else ""
+    peso_tipo = PESO_TIPO_ATO.get(tipo_ato)
+    if peso_tipo is None:
+        peso_tipo = PESO_TIPO_ATO.get(tipo_ato.split(".", 1)[0], 1.0)
+    peso = PESO_ESFERA.get(esfera_da_urn(urn) or "", 1.0) * peso_tipo
+    peso *= PESO_TIPO_DISPOSITIVO.get(tipo_dispositivo, PESO_ESTRUTURAL)
+    if (status_vigencia or "").lower().startswith("revogad"):
+        peso *= PESO_REVOGADO
+    return peso
+
+
+def fundir(listas: Sequence[Sequence[ResultadoBusca]], *, k_rrf: int = K_RRF) -> List[ResultadoHibrido]:
+    """Reciprocal rank fusion (`Σ 1/(k + posição)`) das listas, na ordem recebida (textual, vetorial),
+    seguida do reranking por `peso_hierarquia`. Vale o trecho da primeira lista que trouxe o dispositivo."""
+    fundidos: Dict[str, ResultadoHibrido] = {}
+    for indice, lista in enumerate(listas):
+        for posicao, resultado in enumerate(lista, start=1):
+            hibrido = fundidos.get(resultado.dispositivo_id)
+            if hibrido is None:
+                hibrido = ResultadoHibrido(**{campo.name: getattr(resultado, campo.name) for campo in fields(ResultadoBusca)})
+                fundidos[resultado.dispositivo_id] = hibrido
+            if indice == 0:
+                hibrido.posicao_textual = posicao
+            elif indice == 1:
+                hibrido.posicao_vetorial = posicao
+            hibrido.rrf += 1.0 / (k_rrf + posicao)
+    for hibrido in fundidos.values():
+        hibrido.peso = peso_hierarquia(hibrido.urn, hibrido.tipo, hibrido.status_vigencia)
+        hibrido.pontuacao = hibrido.rrf * hibrido.peso
+    return sorted(fundidos.values(), key=lambda hibrido: (-hibrido.pontuacao, hibrido.dispositivo_id))
+
+
+class MotorHibrido:
+    """Busca híbrida reutilizável: mantém o repositório, o embedder e o pool das duas consultas."""
+
+    def __init__(
+        self,
+        repo: Optional[ConsultaRepository] = None,
+        embedder: Optional[Embedder] = None,
+        *,
+        candidatos: int = CANDIDATOS_POR_BUSCA,
+        k_rrf: int = K_RRF,
+        paralelo: bool = True,
+    ) -> None:
+        self.repo = repo or ConsultaRepository()
+        self.embedder = embedder or obter_embedder()
+        self.candidatos = candidatos
+        self.k_rrf = k_rrf
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="hibrida") if paralelo else None
+
+    def fechar(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+
+    def _textual(self, consulta: str, limite: int, filtros: Dict) -> List[ResultadoBusca]:
+        linhas = self.repo.buscar_dispositivos(consulta, limite=limite, **filtros)
+        return [resultado_de_linha(linha) for linha in linhas]
+
+    def _vetorial(self, consulta: str, limite: int, filtros: Dict) -> List[ResultadoBusca]:
+        vetor = self.embedder.embutir([consulta])[0]
+        linhas = self.repo.buscar_dispositivos_vetorial(
+            vetor_pgvector(vetor),
+            modelo=self.embedder.modelo,
+            limite=limite,
+            candidatos=max(CANDIDATOS_HNSW, limite),
+            **filtros,
+        )
+        return [resultado_de_linha(linha) for linha in linhas]
+
+    def _executar(self, nome: str, funcao: Callable[[], List[ResultadoBusca]]) -> List[ResultadoBusca]:
+        # Uma busca com erro não derruba a outra: o resultado fica só com a que respondeu.
+        try:
+            return funcao()
+        except Exception as exc:  # noqa: BLE001
+            logging.warning("Busca %s falhou; seguindo sem ela: %s", nome, exc)
+            return []
+
+    def buscar(
+        self,
+        consulta: str,
+        *,
+        k: int = K_PADRAO,
+        jurisdicao: Optional[str] = None,
+        tipos_ato: Optional[Sequence[str]] = None,
+        tipos_dispositivo: Optional[Sequence[str]] = None,
+        status_vigencia: Optional[Sequence[str]] = None,
+        vigente_em: Optional[date] = None,
+    ) -> List[ResultadoHibrido]:
+        """Os `k` dispositivos mais bem colocados após fusão e reranking."""
+        consulta = (consulta or "").strip()
+        if not consulta:
+            return []
+        filtros = normalizar_filtros(
+            jurisdicao=jurisdicao,
+            tipos_ato=tipos_ato,
+            tipos_dispositivo=tipos_dispositivo,
+            status_vigencia=status_vigencia,
+            vigente_em=vigente_em,
+        )
+        limite = max(self.candidatos, 4 * k)
+        buscas = (
+            ("textual", lambda: self._textual(consulta, limite, filtros)),
+            ("vetorial", lambda: self._vetorial(consulta, limite, filtros)),
+        )
+        if self._executor is None:
+            listas = [self._executar(nome, funcao) for nome, funcao in buscas]
+        else:
+            futuros = [self._executor.submit(self._executar, nome, funcao) for nome, funcao in buscas]
+            listas = [futuro.result() for futuro in futuros]
+        return fundir(listas, k_rrf=self.k_rrf)[: max(1, k)]
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Busca híbrida (textual + vetorial) nos dispositivos carregados")
+    parser.add_argument("consulta", help="Pergunta ou termos da busca")
+    parser.add_argument("--k", type=int, default=K_PADRAO, help="Quantidade de dispositivos devolvidos")
+    parser.add_argument("--jurisdicao", help="go, federal ou prefixo de URN (ex.: br;go;estadual)")
+    parser.add_argument("--tipo-ato", action="append", dest="tipos_ato", help="Tipo do ato (repetível)")
+    parser.add_argument("--status", action="append", dest="status_vigencia", help="Situação do ato (repetível)")
+    parser.add_argument("--vigente-em", type=date.fromisoformat, help="Só dispositivos em vigor na data (AAAA-MM-DD)")
+    parser.add_argument("--embedder", help="Embedder da consulta (o mesmo usado na geração dos vetores)")
+    args = parser.parse_args(argv)
+
+    motor = MotorHibrido(embedder=obter_embedder(args.embedder))
+    try:
+        resultados = motor.buscar(
+            args.consulta,
+            k=args.k,
+            jurisdicao=args.jurisdicao,
+            tipos_ato=args.tipos_ato,
+            status_vigencia=args.status_vigencia,
+            vigente_em=args.vigente_em,
+        )
+    finally:
+        motor.fechar()
+    for resultado in resultados:
+        print(
+            f"{resultado.pontuacao:.5f}  {resultado.urn_dispositivo}  {resultado.rotulo or ''}"
+            f"  (textual: {resultado.posicao_textual or '-'}, vetorial: {resultado.posicao_vetorial or '-'})"
+        )
+        print(f"    {resultado.trecho}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Leitura do esquema relacional para as consultas (funções SQL das migrações)."""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from ..utils.db import get_supabase_client
+
+TAMANHO_PAGINA = 1000
+TAMANHO_LOTE_FILTRO = 200
+
+
+class ConsultaRepository:
+    """Abstrai as leituras feitas pelos módulos de consulta."""
+
+    def __init__(self) -> None:
+        self.client = get_supabase_client()
+
+    def ato_por_urn(self, urn: str) -> Optional[Dict]:
+        response = (
+            self.client.table("ato_normativo")
+            .select("id,urn_lexml,titulo,data_legislacao")
+            .eq("urn_lexml", urn)
+            .limit(1)
+            .execute()
+        )
+        linhas = response.data or []
+        return linhas[0] if linhas else None
+
+    def texto_consolidado(self, ato_id: str, data: date, *, page_size: int = TAMANHO_PAGINA) -> List[Dict]:
+        """Dispositivos em vigor na data, com o texto da versão aplicável (migração 013), paginados
+        por `(ordem, id)` até uma página incompleta."""
+        linhas: List[Dict] = []
+        apos: Dict = {}
+        while True:
+            response = self.client.rpc(
+                "texto_consolidado",
+                {"p_ato_id": ato_id, "p_data": data.isoformat(), "p_limite": page_size, **apos},
+            ).execute()
+            pagina = response.data or []
+            linhas.extend(pagina)
+            if len(pagina) < page_size:
+                return linhas
+            apos = {"p_apos_ordem": pagina[-1]["ordem"], "p_apos_id": pagina[-1]["id"]}
+
+    def fronteiras_vigencia(self, ato_id: str) -> List[date]:
+        response = self.client.rpc("fronteiras_vigencia", {"p_ato_id": ato_id}).execute()
+        datas = []
+        for linha in response.data or []:
+            valor = linha.get("fronteiras_vigencia") if isinstance(linha, dict) else linha
+            if valor:
+                datas.append(date.fromisoformat(valor))
+        return sorted(datas)
+
+    def buscar_dispositivos(
+        self,
+        consulta: str,
+        *,
+        limite: int,
+        **filtros,
+    ) -> List[Dict]:
+        """Dispositivos mais relevantes para a consulta textual (migração 014)."""
+        response = self.client.rpc(
+            "buscar_dispositivos",
+            {"p_consulta": consulta, "p_limite": limite, **_parametros_filtro(**filtros)},
+        ).execute()
+        return response.data or []
+
+    def buscar_dispositivos_vetorial(
+        self,
+        embedding: str,
+        *,
+        modelo: str,
+        limite: int,
+        candidatos: int,
+        **filtros,
+    ) -> List[Dict]:
+        """Dispositivos mais próximos do vetor da consulta (literal pgvector, migração 016)."""
+        response = self.client.rpc(
+            "buscar_dispositivos_vetorial",
+            {
+                "p_embedding": embedding,
+                "p_modelo": modelo,
+                "p_limite": limite,
+                "p_candidatos": candidatos,
+                **_parametros_filtro(**filtros),
+            },
+        ).execute()
+        return response.data or []
+
+
+    def linhas(
+        self,
+        tabela: str,
+        campos: str,
+        *,
+        coluna: Optional[str] = None,
+        valores: Optional[Sequence[str]] = None,
+    ) -> Iterator[Dict]:
+        """Todas as linhas da tabela (ou as com `coluna` em `valores`), paginadas por id."""
+        fatias = [None] if coluna is None else [
+            list(valores[inicio : inicio + TAMANHO_LOTE_FILTRO]) for inicio in range(0, len(valores or ()), TAMANHO_LOTE_FILTRO)
+        ]
+        for fatia in fatias:
+            ultimo: Optional[str] = None
+            while True:
+                consulta = self.client.table(tabela).select(campos).order("id").limit(TAMANHO_PAGINA)
+                if fatia is not None:
+                    consulta = consulta.in_(coluna, fatia)
+                if ultimo is not None:
+                    consulta = consulta.gt("id", ultimo)
+                linhas = consulta.execute().data or []
+                yield from linhas
+                if len(linhas) < TAMANHO_PAGINA:
+                    break
+                ultimo = linhas[-1]["id"]
+
+
+def _parametros_filtro(
+    *,
+    jurisdicao: Optional[str] = None,
+    tipos_ato: Optional[Sequence[str]] = None,
+    tipos_dispositivo: Optional[Sequence[str]] = None,
+    status_vigencia: Optional[Sequence[str]] = None,
+    vigente_em: Optional[date] = None,
+) -> Dict:
+    """Filtros comuns às funções de busca (`NULL` desliga cada um)."""
+    return {
+        "p_jurisdicao": jurisdicao,
+        "p_tipos_ato": list(tipos_ato) if tipos_ato else None,
+        "p_tipos_dispositivo": list(tipos_dispositivo) if tipos_dispositivo else None,
+        "p_status_vigencia": list(status_vigencia) if status_vigencia else None,
+        "p_vigente_em": vigente_em.isoformat() if vigente_em else None,
+    }
@@ -0,0 +1,224 @@
+"""Texto consolidado de um ato numa data ("qual era o texto do ato X em D").
+
+`texto_consolidado` (migração 013) devolve os dispositivos em vigor na data, com o texto da versão
+de `versao_textual` que a cobre (índice GiST sobre o intervalo de vigência). O resultado só muda
+nas datas devolvidas por `fronteiras_vigencia`, então `MotorTemporal` guarda as consolidações num
+LRU por (ato, faixa entre duas fronteiras): qualquer data da mesma faixa reaproveita a montagem.
+
+Uso:
+    python -m src.consulta.temporal --urn "br;go;estadual;lei;2018-12-20;21500" --data 2020-01-01
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from datetime import date, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .repository import ConsultaRepository
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+CAPACIDADE_PADRAO = 256
+
+
+@dataclass
+class DispositivoVigente:
+    id: str
+    parent_id: Optional[str]
+    id_lexml: str
+    tipo: str
+    rotulo: Optional[str]
+    ordem: int
+    texto: str
+    versao_id: Optional[str] = None
+    vigencia_inicio: Optional[str] = None
+    vigencia_fim: Optional[str] = None
+    status_vigencia: Optional[str] = None
+    filhos: List["DispositivoVigente"] = field(default_factory=list)
+
+
+@dataclass
+class Consolidacao:
+    """Árvore de dispositivos de um ato em vigor numa faixa de datas (`valida_de` a `valida_ate`)."""
+
+    ato_id: str
+    data: date
+    dispositivos: List[DispositivoVigente]
+    total: int
+    valida_de: Optional[date] = None
+    valida_ate: Optional[date] = None
+
+    def percorrer(self) -> Iterator[Tuple[int, DispositivoVigente]]:
+        """(profundidade, dispositivo) em pré-ordem, sem recursão."""
+        pilha = [(0, no) for no in reversed(self.dispositivos)]
+        while pilha:
+            profundidade, no = pilha.pop()
+            yield profundidade, no
+            pilha.extend((profundidade + 1, filho) for filho in reversed(no.filhos))
+
+    def texto(self) -> str:
+        linhas = []
+        for profundidade, no in self.percorrer():
+            cabecalho = f"{no.rotulo} " if no.rotulo else ""
+            linhas.append(f"{'  ' * profundidade}{cabecalho}{no.texto}".rstrip())
+        return "\n".join(linhas)
+
+
+def montar_arvore(linhas: List[Dict]) -> Tuple[List[DispositivoVigente], int]:
+    """Monta a árvore pelos `parent_id`, irmãos por `ordem`. Dispositivos cujo pai não está em vigor
+    na data ficam de fora, com toda a subárvore."""
+    nos: Dict[str, DispositivoVigente] = {}
+    for linha in linhas:
+        nos[linha["id"]] = DispositivoVigente(
+            id=linha["id"],
+            parent_id=linha.get("parent_id"),
+            id_lexml=linha.get("id_lexml") or "",
+            tipo=linha.get("tipo") or "",
+            rotulo=linha.get("rotulo"),
+            ordem=linha.get("ordem") or 0,
+            texto=linha.get("texto") or "",
+            versao_id=linha.get("versao_id"),
+            vigencia_inicio=linha.get("vigencia_inicio"),
+            vigencia_fim=linha.get("vigencia_fim"),
+            status_vigencia=linha.get("status_vigencia"),
+        )
+    raizes: List[DispositivoVigente] = []
+    for no in nos.values():
+        if no.parent_id is None:
+            raizes.append(no)
+        elif no.parent_id in nos:
+            nos[no.parent_id].filhos.append(no)
+
+    raizes.sort(key=lambda no: no.ordem)
+    total = 0
+    pilha = list(raizes)
+    while pilha:
+        no = pilha.pop()
+        total += 1
+        no.filhos.sort(key=lambda filho: filho.ordem)
+        pilha.extend(no.filhos)
+    return raizes, total
+
+
+class MotorTemporal:
+    """Consolidações por (ato, faixa de vigência) em LRU; as fronteiras de cada ato também ficam
+    em memória. Seguro para uso entre threads."""
+
+    def __init__(self, repo: Optional[ConsultaRepository] = None, *, capacidade: int = CAPACIDADE_PADRAO) -> None:
+        self.repo = repo or ConsultaRepository()
+        self.capacidade = capacidade
+        self.acertos = 0
+        self.faltas = 0
+        self._consolidacoes: "OrderedDict[Tuple[str, int], Consolidacao]" = OrderedDict()
+        self._fronteiras: "OrderedDict[str, List[date]]" = OrderedDict()
+        self._atos_por_urn: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def invalidar(self, ato_id: Optional[str] = None) -> None:
+        """Descarta o cache do ato (após recarregá-lo) ou de todos."""
+        with self._lock:
+            if ato_id is None:
+                self._consolidacoes.clear()
+                self._fronteiras.clear()
+                return
+            self._fronteiras.pop(ato_id, None)
+            for chave in [chave for chave in self._consolidacoes if chave[0] == ato_id]:
+                del self._consolidacoes[chave]
+
+    def _lembrar(self, cache: OrderedDict, chave, valor) -> None:
+        cache[chave] = valor
+        cache.move_to_end(chave)
+        while len(cache) > self.capacidade:
+            cache.popitem(last=False)
+
+    def fronteiras(self, ato_id: str) -> List[date]:
+        with self._lock:
+            fronteiras = self._fronteiras.get(ato_id)
+            if fronteiras is not None:
+                self._fronteiras.move_to_end(ato_id)
+                return fronteiras
+        fronteiras = self.repo.fronteiras_vigencia(ato_id)
+        with self._lock:
+            self._lembrar(self._fronteiras, ato_id, fronteiras)
+        return fronteiras
+
+    def ato_id(self, urn: str) -> Optional[str]:
+        # Só URNs encontradas ficam no cache: o ato pode ser carregado depois.
+        with self._lock:
+            ato_id = self._atos_por_urn.get(urn)
+        if ato_id is None:
+            ato = self.repo.ato_por_urn(urn)
+            if ato is None:
+                return None
+            ato_id = ato["id"]
+            with self._lock:
+                self._atos_por_urn[urn] = ato_id
+        return ato_id
+
+    def consolidar(self, ato_id: str, data: date) -> Consolidacao:
+        fronteiras = self.fronteiras(ato_id)
+        faixa = bisect.bisect_right(fronteiras, data)
+        chave = (ato_id, faixa)
+        with self._lock:
+            consolidacao = self._consolidacoes.get(chave)
+            if consolidacao is not None:
+                self._consolidacoes.move_to_end(chave)
+                self.acertos += 1
+                # Mesma árvore (compartilhada, não altere), só a data consultada muda.
+                return replace(consolidacao, data=data)
+            self.faltas += 1
+
+        dispositivos, total = montar_arvore(self.repo.texto_consolidado(ato_id, data))
+        consolidacao = Consolidacao(
+            ato_id=ato_id,
+            data=data,
+            dispositivos=dispositivos,
+            total=total,
+            valida_de=fronteiras[faixa - 1] if faixa > 0 else None,
+            valida_ate=fronteiras[faixa] - timedelta(days=1) if faixa < len(fronteiras) else None,
+        )
+        with self._lock:
+            self._lembrar(self._consolidacoes, chave, consolidacao)
+        return consolidacao
+
+    def consolidar_por_urn(self, urn: str, data: date) -> Optional[Consolidacao]:
+        ato_id = self.ato_id(urn)
+        if ato_id is None:
+            return None
+        return self.consolidar(ato_id, data)
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Texto consolidado de um ato numa data")
+    parser.add_argument("--urn", required=True, help="URN LexML do ato")
+    parser.add_argument(
+        "--data",
+        type=date.fromisoformat,
+        default=date.today(),
+        help="Data de referência (AAAA-MM-DD). Padrão: hoje.",
+    )
+    args = parser.parse_args(argv)
+
+    consolidacao = MotorTemporal().consolidar_por_urn(args.urn, args.data)
+    if consolidacao is None:
+        logging.error("Ato %s não encontrado.", args.urn)
+        return
+    logging.info(
+        "Ato %s em %s: %s dispositivos em vigor (texto válido de %s a %s).",
+        args.urn,
+        args.data.isoformat(),
+        consolidacao.total,
+        consolidacao.valida_de or "-",
+        consolidacao.valida_ate or "-",
+    )
+    print(consolidacao.texto())
+
+
+if __name__ == "__main__":
+    main()
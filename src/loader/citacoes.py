@@ -0,0 +1,176 @@
+"""Extração determinística de citações normativas no texto dos dispositivos.
+
+As relações (`altera`, `revoga`, `cita`...) só existem quando o LLM as devolve em `relacoes`. Aqui,
+padrões pré-compilados reconhecem citações completas da legislação ("Lei nº 21.500, de 20 de
+dezembro de 2018", "art. 2º, § 1º, do Decreto nº 9.000, de 2 de janeiro de 2019") e geram a URN no
+formato de `_build_urn` do crawler, já canonizada como no vinculador. O tipo da relação vem do verbo
+da mesma oração, antes ou logo depois da citação ("revoga-se", "passa a vigorar", "regulamenta");
+sem verbo, `cita`.
+
+Só citações com data completa viram relação: sem ela não há URN para vincular. A jurisdição só
+entra na URN quando o texto a declara ("Lei Federal", "Lei estadual") ou quando o verbo a implica:
+um ato só altera ou revoga atos da própria esfera. Nos demais casos ("Lei nº 8.666, de 21 de junho
+de 1993", que é federal) a relação é um `cita` com URN sem jurisdição (`br;lei;1993-06-21;8666`),
+que o vinculador não liga a ato nenhum só pelo número e pela data.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+from ..parser.dispositivos import id_lexml_de_citacao
+from .vinculos import canonizar_urn
+
+MESES = {
+    "janeiro": 1,
+    "fevereiro": 2,
+    "marco": 3,
+    "março": 3,
+    "abril": 4,
+    "maio": 5,
+    "junho": 6,
+    "julho": 7,
+    "agosto": 8,
+    "setembro": 9,
+    "outubro": 10,
+    "novembro": 11,
+    "dezembro": 12,
+}
+
+CITACAO_RE = re.compile(
+    r"\b(?P<tipo>lei\s+complementar|lei\s+delegada|decreto[\s-]+lei|decreto\s+legislativo|lei|decreto"
+    r"|emenda\s+constitucional|resolu[çc][ãa]o|portaria|instru[çc][ãa]o\s+normativa)"
+    r"(?:\s+(?P<esfera>federal|estadual))?"
+    r"\s+n\.?\s*[º°o]?\.?\s*(?P<numero>\d{1,3}(?:\.\d{3})+|\d+)(?:/\d{2,4})?"
+    r",?\s+de\s+(?P<dia>\d{1,2})\s*[º°o]?\s+de\s+(?P<mes>[a-zç]+)\s+de\s+(?P<ano>\d{4})",
+    re.IGNORECASE,
+)
+# Dispositivo citado logo antes do ato ("art. 2º, § 1º, do Decreto ..."), buscado só nessa janela.
+DISPOSITIVO_ANTES_RE = re.compile(r"\b(?P<dispositivo>art(?:igo)?s?\.?\s*\d[^;()]*?),?\s+d[oa]\s+$", re.IGNORECASE)
+JANELA_DISPOSITIVO = 100
+
+# Toda citação aproveitável termina em "de <ano>": textos sem isso nem passam por `CITACAO_RE`.
+_INDICIO_RE = re.compile(r"de\s+\d{4}")  # sem `\b`: o prefixo literal deixa a busca ~40x mais rápida
+
+# Verbos que definem o tipo da relação; vale o primeiro que aparecer no trecho.
+VERBOS_RELACAO_RE = re.compile(
+    r"(?P<revoga>\brevog(?:a|am|ad[oa]s?)(?:-se)?\b)"
+    r"|(?P<altera>\balter(?:a|am|ad[oa]s?)(?:-se)?\b|\bpassa(?:m)?\s+a\s+vigorar|\bnova\s+reda[çc][ãa]o|\bacresc(?:id|ent))"
+    r"|(?P<regulamenta>\bregulament(?:a|am|ad[oa]s?)\b)"
+    r"|(?P<consolida>\bconsolid(?:a|am|ad[oa]s?)\b)",
+    re.IGNORECASE,
+)
+
+
+# Citações enumeradas ("revoga a Lei ... e o Decreto ...") herdam o tipo da anterior.
+ENUMERACAO_RE = re.compile(r"\s*[,;]?\s*(?:e|bem\s+como)?\s*(?:[oa]s?\s+)?", re.IGNORECASE)
+
+# O verbo só vale dentro da mesma oração: a janela para em ";", ":" ou fim de frase (ponto seguido de
+# maiúscula, fora de "art." e "inc.") e não passa de `JANELA_VERBO` caracteres.
+FIM_ORACAO_RE = re.compile(r"[;:]|(?<![Aa]rt)(?<![Ii]nc)\.(?=\s+[A-ZÀ-Ý])")
+JANELA_VERBO = 80
+# Citação dentro de um adjunto ("nos termos da Lei ...", "conforme a Lei ..."): o verbo que vem
+# depois dela tem outro sujeito ("..., os contratos serão revogados").
+PREPOSICAO_ANTES_RE = re.compile(
+    r"\b(?:d[oa]s?|n[oa]s?|pel[oa]s?|(?:conforme|segundo|consoante|mediante|com)(?:\s+[oa]s?)?)\s+$",
+    re.IGNORECASE,
+)
+
+
+ESFERAS = {"federal": "br;federal", "estadual": "br;go;estadual"}
+# Prefixo das citações sem jurisdição conhecida: nenhum ato carregado tem URN com ele.
+JURISDICAO_INDEFINIDA = "br"
+RELACOES_DA_PROPRIA_ESFERA = frozenset({"altera", "revoga"})
+
+
+@dataclass
+class Citacao:
+    tipo: str
+    urn: str
+    id_lexml_alvo: Optional[str]
+    trecho: str
+
+
+def _oracao_antes(texto: str, inicio: int, fim: int) -> str:
+    """Trecho da mesma oração antes de `fim`, sem recuar além de `inicio`."""
+    trecho = texto[max(inicio, fim - JANELA_VERBO) : fim]
+    limites = list(FIM_ORACAO_RE.finditer(trecho))
+    return trecho[limites[-1].end() :] if limites else trecho
+
+
+def _oracao_depois(texto: str, inicio: int, fim: int) -> str:
+    """Trecho da mesma oração depois de `inicio`, sem avançar além de `fim`."""
+    trecho = texto[inicio : min(fim, inicio + JANELA_VERBO)]
+    limite = FIM_ORACAO_RE.search(trecho)
+    return trecho[: limite.start()] if limite else trecho
+
+
+def _tipo_relacao(antes: str, depois: str) -> str:
+    """Verbo na oração entre a citação anterior e esta ("revoga a Lei ..."); se não houver, o que
+    vem logo depois dela, na mesma oração ("O art. 2º da Lei ... passa a vigorar")."""
+    for trecho in (antes, depois):
+        match = VERBOS_RELACAO_RE.search(trecho)
+        if match:
+            return match.lastgroup
+    return "cita"
+
+
+def _ultima_enumerada(texto: str, matches: List[re.Match], posicao: int) -> int:
+    """Índice da última citação do grupo enumerado que começa em `posicao` ("Lei ..., e Lei ...")."""
+    while posicao + 1 < len(matches) and ENUMERACAO_RE.fullmatch(
+        texto, matches[posicao].end(), matches[posicao + 1].start()
+    ):
+        posicao += 1
+    return posicao
+
+
+def extrair_citacoes(texto: Optional[str], *, jurisdicao: Optional[str] = None) -> List[Citacao]:
+    """Citações com data completa, na ordem do texto. `jurisdicao` é o prefixo da URN do ato citante
+    (`br;go;estadual`), usado nas citações sem esfera explícita que ele altera ou revoga."""
+    citacoes: List[Citacao] = []
+    if not texto or not _INDICIO_RE.search(texto):
+        return citacoes
+    matches = list(CITACAO_RE.finditer(texto))
+    tipo_anterior = "cita"
+    for posicao, match in enumerate(matches):
+        mes = MESES.get(match.group("mes").lower())
+        dia = int(match.group("dia"))
+        if mes is None or not 1 <= dia <= 31:
+            continue
+        dispositivo = DISPOSITIVO_ANTES_RE.search(texto, max(0, match.start() - JANELA_DISPOSITIVO), match.start())
+        inicio = dispositivo.start() if dispositivo else match.start()
+        anterior = matches[posicao - 1].end() if posicao else 0
+        if citacoes and posicao and ENUMERACAO_RE.fullmatch(texto, anterior, match.start()):
+            tipo = tipo_anterior
+        else:
+            antes = _oracao_antes(texto, anterior, inicio)
+            depois = ""
+            if not PREPOSICAO_ANTES_RE.search(antes):
+                # O verbo posposto vale para o grupo enumerado inteiro: procura depois da última citação dele.
+                ultima = _ultima_enumerada(texto, matches, posicao)
+                fim = matches[ultima + 1].start() if ultima + 1 < len(matches) else len(texto)
+                depois = _oracao_depois(texto, matches[ultima].end(), fim)
+            tipo = _tipo_relacao(antes, depois)
+        tipo_anterior = tipo
+
+        esfera = ESFERAS.get((match.group("esfera") or "").lower())
+        if esfera is None and jurisdicao and tipo in RELACOES_DA_PROPRIA_ESFERA:
+            esfera = jurisdicao
+        if esfera is None:
+            esfera, tipo = JURISDICAO_INDEFINIDA, "cita"
+        urn, _ = canonizar_urn(
+            f"{esfera};{match.group('tipo')};{match.group('ano')}-{mes:02d}-{dia:02d};{match.group('numero')}"
+        )
+        if urn is None:
+            continue
+        citacoes.append(
+            Citacao(
+                tipo=tipo,
+                urn=urn,
+                id_lexml_alvo=id_lexml_de_citacao(dispositivo.group("dispositivo")) if dispositivo else None,
+                trecho=texto[inicio : match.end()],
+            )
+        )
+    return citacoes
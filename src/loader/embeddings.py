@@ -0,0 +1,132 @@
+"""Etapa de embeddings: embute os textos de dispositivos que ainda não têm vetor.
+
+A unidade é o `hash_texto`, não o dispositivo (tabela `embedding_texto`, migração 015): um texto
+já embutido pelo mesmo modelo nunca é reprocessado, então renormalizar um ato só gera vetores para
+os dispositivos cujo texto mudou. Os textos pendentes vêm em páginas pela RPC
+`textos_sem_embedding`, são embutidos em lotes grandes e gravados por upserts em massa numa thread
+à parte, enquanto o lote seguinte é calculado.
+
+Uso:
+    python -m src.loader.embeddings --embedder hashing
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, List, Optional
+
+from ..utils.embeddings import EMBEDDERS, Embedder, obter_embedder, vetor_pgvector
+from .repository import NormativeRepository
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+TAMANHO_LOTE_EMBEDDING = 256
+# Não pode passar do `max_rows` do PostgREST (1000 por padrão), que corta a página em silêncio.
+TAMANHO_PAGINA_EMBEDDING = 1000
+TAMANHO_LOTE_UPSERT = 500
+
+
+def _gravar(repo: NormativeRepository, linhas: List[dict]) -> int:
+    for inicio in range(0, len(linhas), TAMANHO_LOTE_UPSERT):
+        repo.inserir_em_massa(
+            "embedding_texto",
+            linhas[inicio : inicio + TAMANHO_LOTE_UPSERT],
+            on_conflict="hash_texto,modelo",
+        )
+    return len(linhas)
+
+
+def gerar_embeddings(
+    repo: NormativeRepository,
+    embedder: Embedder,
+    *,
+    tamanho_lote: int = TAMANHO_LOTE_EMBEDDING,
+    limite: Optional[int] = None,
+    dry_run: bool = False,
+) -> Counter:
+    """Embute os textos pendentes do modelo do `embedder` (no máximo `limite`)."""
+    estatisticas: Counter = Counter()
+    inicio_execucao = time.perf_counter()
+    gravacoes: List[Future] = []
+    apos: Optional[str] = None
+
+    def aguardar_gravacoes() -> None:
+        # Falha de gravação não interrompe a etapa: os hashes continuam pendentes para a próxima.
+        while gravacoes:
+            futuro = gravacoes.pop()
+            try:
+                estatisticas["gravados"] += futuro.result()
+            except Exception as exc:  # noqa: BLE001
+                estatisticas["falhas"] += 1
+                logging.error("Falha ao gravar embeddings: %s", exc)
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="embeddings") as escritor:
+        while limite is None or estatisticas["textos"] < limite:
+            tamanho_pagina = TAMANHO_PAGINA_EMBEDDING
+            if limite is not None:
+                tamanho_pagina = min(tamanho_pagina, limite - estatisticas["textos"])
+            pagina = repo.textos_sem_embedding(embedder.modelo, apos=apos, limite=tamanho_pagina)
+            if not pagina:
+                break
+            apos = pagina[-1]["hash_texto"]
+            for inicio in range(0, len(pagina), tamanho_lote):
+                lote = pagina[inicio : inicio + tamanho_lote]
+                estatisticas["textos"] += len(lote)
+                try:
+                    vetores = embedder.embutir([linha.get("texto") or "" for linha in lote])
+                except Exception as exc:  # noqa: BLE001
+                    estatisticas["falhas"] += 1
+                    logging.error("Falha ao embutir lote de %s textos: %s", len(lote), exc)
+                    continue
+                linhas = [
+                    {"hash_texto": linha["hash_texto"], "modelo": embedder.modelo, "embedding": vetor_pgvector(vetor)}
+                    for linha, vetor in zip(lote, vetores)
+                ]
+                if dry_run:
+                    continue
+                # Uma gravação por vez: o lote seguinte é calculado enquanto a anterior sobe.
+                aguardar_gravacoes()
+                gravacoes.append(escritor.submit(_gravar, repo, linhas))
+        aguardar_gravacoes()
+
+    duracao = time.perf_counter() - inicio_execucao
+    logging.info(
+        "Embeddings (%s): %s textos, %s gravados, %s falhas em %.1fs (%.0f textos/s)%s",
+        embedder.modelo,
+        estatisticas["textos"],
+        estatisticas["gravados"],
+        estatisticas["falhas"],
+        duracao,
+        estatisticas["textos"] / duracao if duracao else 0.0,
+        " (dry-run)" if dry_run else "",
+    )
+    return estatisticas
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Gera embeddings para os textos de dispositivos ainda sem vetor")
+    parser.add_argument(
+        "--embedder",
+        choices=sorted(EMBEDDERS),
+        help="Backend de embeddings (padrão: ATLAS_EMBEDDER ou hashing)",
+    )
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE_EMBEDDING, help="Textos por chamada ao embedder")
+    parser.add_argument("--limite", type=int, help="Máximo de textos nesta execução")
+    parser.add_argument("--dry-run", action="store_true", help="Calcula os vetores sem gravar")
+    args = parser.parse_args(argv)
+
+    gerar_embeddings(
+        NormativeRepository(),
+        obter_embedder(args.embedder),
+        tamanho_lote=max(1, args.lote),
+        limite=args.limite,
+        dry_run=args.dry_run,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -7,31 +7,38 @@ import hashlib
 import json
 import logging
 import unicodedata
-from datetime import datetime
-from typing import Dict, Iterable, List, Optional, Tuple
-
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from ..consulta import grafo
+from ..parser.dispositivos import id_lexml_de_citacao
+from ..utils import artefato
 from ..utils import db as db_utils
+from ..utils.arvore import TIPOS_DISPOSITIVO, ArvoreDispositivos
+from ..utils.embeddings import obter_embedder
 from ..utils import storage as storage_utils
-from .repository import NormativeRepository
+from . import embeddings, vinculos
+from .citacoes import Citacao, extrair_citacoes
+from .repository import (
+    CAMPOS_COMPARADOS,
+    EscritorEmLote,
+    NormativeRepository,
+    linha_anexo,
+    linha_ato,
+    linha_dispositivo,
+    linha_relacao,
+    linha_versao_textual,
+)
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 
-TIPOS_VALIDOS = {
-    "titulo",
-    "livro",
-    "parte",
-    "capitulo",
-    "secao",
-    "subsecao",
-    "artigo",
-    "paragrafo",
-    "paragrafo_unico",
-    "inciso",
-    "alinea",
-    "item",
-    "dispositivo_auxiliar",
-}
+TIPOS_VALIDOS = set(TIPOS_DISPOSITIVO)
 
 TIPOS_RELACAO_ENUM = {
     "altera",
@@ -122,6 +129,7 @@ def _build_relacao_payload(relacao: Dict, dispositivo_id: Optional[str]) -> Opti
 
     alvo = relacao.get("alvo") or {}
     urn_alvo = alvo.get("urn") or relacao.get("urn") or relacao.get("urn_alvo")
+    dispositivo_alvo = alvo.get("dispositivo")
 
     descricao = relacao.get("descricao") or relacao.get("texto")
     if not descricao:
@@ -145,59 +153,124 @@ def _build_relacao_payload(relacao: Dict, dispositivo_id: Optional[str]) -> Opti
         "dispositivo_origem_id": dispositivo_id,
         "dispositivo_alvo_id": relacao.get("dispositivo_alvo_id"),
         "urn_alvo": urn_alvo,
+        "id_lexml_alvo": id_lexml_de_citacao(dispositivo_alvo) if isinstance(dispositivo_alvo, str) else None,
         "tipo": tipo_normalizado,
         "descricao": descricao,
     }
     return payload
 
 
+@dataclass
+class _EstadoDispositivos:
+    """Estado compartilhado entre as subárvores de um mesmo ato (carregadas uma de cada vez).
+
+    `existentes` traz os dispositivos já gravados por `id_lexml`: quem reaparece mantém o id (e o
+    histórico em `versao_textual`) e só é regravado se mudou.
+    """
+
+    urn: Optional[str] = None
+    rotulo_index: Dict[str, List[str]] = field(default_factory=dict)
+    ids_em_uso: Dict[str, int] = field(default_factory=dict)
+    sequencia: int = 0
+    raizes: int = 0
+    existentes: Dict[str, Dict] = field(default_factory=dict)
+    mantidos: Set[str] = field(default_factory=set)
+    inseridos: int = 0
+    atualizados: int = 0
+    inalterados: int = 0
+    # Citações achadas no texto, gravadas em `concluir` se o LLM não trouxe a mesma relação.
+    extrair_citacoes: bool = True
+    citacoes: List[Tuple[str, Citacao]] = field(default_factory=list)
+    relacoes_vistas: Set[Tuple[Optional[str], str]] = field(default_factory=set)
+
+    def registrar_relacao(self, escritor: EscritorEmLote, ato_id: Optional[str], payload: Dict) -> None:
+        urn, _ = vinculos.canonizar_urn(payload.get("urn_alvo"))
+        if urn:
+            self.relacoes_vistas.add((payload.get("dispositivo_origem_id"), _chave_relacao(urn)))
+        escritor.adicionar("dispositivo_relacao", linha_relacao(ato_id, payload))
+
+    @property
+    def jurisdicao(self) -> Optional[str]:
+        """Prefixo da URN do ato (`br;go;estadual`), antes de tipo, data e número."""
+        urn, _ = vinculos.canonizar_urn(self.urn)
+        return urn.rsplit(";", 3)[0] if urn else None
+
+    def remover(self) -> List[str]:
+        """Ids gravados cujo `id_lexml` não apareceu na nova árvore."""
+        return [linha["id"] for linha in self.existentes.values() if linha["id"] not in self.mantidos]
+
+
+def _vigencia_invertida(inicio: Optional[str], fim: Optional[str]) -> bool:
+    """Fim anterior ao início; datas ausentes ou ilegíveis ficam para o banco decidir."""
+    try:
+        return bool(inicio and fim) and date.fromisoformat(str(fim)[:10]) < date.fromisoformat(str(inicio)[:10])
+    except ValueError:
+        return False
+
+
 def _registrar_dispositivos(
-    repo: NormativeRepository,
+    escritor: EscritorEmLote,
     ato_id: str,
-    dispositivos: List[Dict],
-    *,
-    parent_id: Optional[str] = None,
-    sequencia: List[int],
-    ids_em_uso: Dict[str, int],
-    rotulo_index: Dict[str, List[str]],
+    arvore: ArvoreDispositivos,
+    estado: _EstadoDispositivos,
 ) -> None:
-    for ordem, dispositivo in enumerate(dispositivos, start=1):
-        sequencia[0] += 1
-        base_id = dispositivo.get("id_lexml") or f"auto_{sequencia[0]}"
+    """Enfileira em pré-ordem (pais antes dos filhos) os dispositivos novos ou alterados."""
+    ids_em_uso = estado.ids_em_uso
+    ids_banco: List[str] = []
+    for indice in range(len(arvore)):
+        base_id = arvore.ids_lexml[indice] or f"auto_{estado.sequencia + indice + 1}"
         duplicidade = ids_em_uso.get(base_id, 0)
         if duplicidade:
             novo_id = f"{base_id}__{duplicidade+1}"
             logging.warning(
                 "Duplicidade de id_lexml '%s' no ato %s. Ajustando para '%s'.",
                 base_id,
-                ato_id,
+                estado.urn or ato_id,
                 novo_id,
             )
             id_lexml = novo_id
         else:
             id_lexml = base_id
         ids_em_uso[base_id] = duplicidade + 1
-        texto = dispositivo.get("texto") or ""
-        tipo = _inferir_tipo(dispositivo)
-        atributos = dispositivo.get("atributos", {})
+        texto = arvore.texto(indice)
+        rotulo = arvore.rotulos[indice]
+        extras = arvore.extras.get(indice, {})
+        tipo = _inferir_tipo(
+            {"tipo": arvore.nome_tipo(indice) or extras.get("tipo"), "id_lexml": arvore.ids_lexml[indice]}
+        )
+        pai = arvore.pai[indice]
 
-        dispositivo_id = repo.inserir_dispositivo(
+        existente = estado.existentes.get(id_lexml)
+        dispositivo_id = existente["id"] if existente else str(uuid.uuid4())
+        linha = linha_dispositivo(
+            id=dispositivo_id,
             ato_id=ato_id,
-            parent_id=parent_id,
+            parent_id=ids_banco[pai] if pai >= 0 else None,
             id_lexml=id_lexml,
             tipo=tipo,
-            rotulo=dispositivo.get("rotulo"),
+            rotulo=rotulo,
             texto=texto,
-            ordem=ordem,
-            atributos=atributos,
+            ordem=arvore.ordem[indice] + (estado.raizes if pai < 0 else 0),
+            atributos=extras.get("atributos", {}),
             hash_texto=_hash_texto(texto),
         )
+        if existente is None:
+            estado.inseridos += 1
+            escritor.adicionar("dispositivo", linha)
+        else:
+            estado.mantidos.add(dispositivo_id)
+            if any(linha[campo] != existente.get(campo) for campo in CAMPOS_COMPARADOS):
+                estado.atualizados += 1
+                escritor.adicionar("dispositivo", linha)
+            else:
+                estado.inalterados += 1
+        ids_banco.append(dispositivo_id)
 
-        rotulo_chave = (dispositivo.get("rotulo") or "").strip().lower()
+        rotulo_chave = (rotulo or "").strip().lower()
         if rotulo_chave:
-            rotulo_index.setdefault(rotulo_chave, []).append(dispositivo_id)
+            estado.rotulo_index.setdefault(rotulo_chave, []).append(dispositivo_id)
 
-        for versao in dispositivo.get("versoes", []) or []:
+        for versao in extras.get("versoes", []) or []:
             texto_versao = versao.get("texto")
             if texto_versao is None:
                 texto_versao = texto
@@ -214,40 +287,204 @@ def _registrar_dispositivos(
                 logging.warning(
                     "Ignorando versao textual sem texto nem hash no dispositivo %s (ato %s).",
                     dispositivo_id,
-                    ato_id,
+                    estado.urn or ato_id,
+                )
+                continue
+            if _vigencia_invertida(versao_payload["vigencia_inicio"], versao_payload["vigencia_fim"]):
+                logging.warning(
+                    "Ignorando versao textual com vigencia_fim %s anterior a vigencia_inicio %s no dispositivo %s (ato %s).",
+                    versao_payload["vigencia_fim"],
+                    versao_payload["vigencia_inicio"],
+                    dispositivo_id,
+                    estado.urn or ato_id,
                 )
                 continue
-            repo.inserir_versao_textual(dispositivo_id, versao_payload)
+            escritor.adicionar("versao_textual", linha_versao_textual(dispositivo_id, versao_payload))
 
-        for relacao in dispositivo.get("relacoes", []) or []:
+        for relacao in extras.get("relacoes", []) or []:
             relacao_payload = _build_relacao_payload(relacao, dispositivo_id)
             if relacao_payload:
-                repo.inserir_relacao(ato_id, relacao_payload)
+                estado.registrar_relacao(escritor, ato_id, relacao_payload)
+
+        if estado.extrair_citacoes:
+            estado.citacoes.extend((dispositivo_id, citacao) for citacao in extrair_citacoes(texto, jurisdicao=estado.jurisdicao))
+
+    estado.sequencia += len(arvore)
+    estado.raizes += sum(1 for _ in arvore.raizes())
+
+
+def _chave_relacao(urn: str) -> str:
+    """Tipo base, data e número da URN canônica: a citação escreve `lei` onde o ato tem
+    `lei.ordinaria` e pode vir sem jurisdição, que o LLM costuma preencher."""
+    return ";".join(vinculos.urn_tipo_base(urn).split(";")[-3:])
+
 
-        filhos = dispositivo.get("filhos")
-        if isinstance(filhos, list) and filhos:
-            _registrar_dispositivos(
-                repo,
+def _registrar_citacoes(escritor: EscritorEmLote, ato_id: Optional[str], estado: _EstadoDispositivos) -> int:
+    """Relações extraídas do texto que o LLM não trouxe (mesmo dispositivo de origem e mesmo ato citado,
+    comparado por `_chave_relacao`)."""
+    proprio, _ = vinculos.canonizar_urn(estado.urn)
+    proprio = _chave_relacao(proprio) if proprio else None
+    novas = 0
+    for dispositivo_id, citacao in estado.citacoes:
+        chave = (dispositivo_id, _chave_relacao(citacao.urn))
+        if chave[1] == proprio or chave in estado.relacoes_vistas:
+            continue
+        estado.relacoes_vistas.add(chave)
+        escritor.adicionar(
+            "dispositivo_relacao",
+            linha_relacao(
                 ato_id,
-                filhos,
-                parent_id=dispositivo_id,
-                sequencia=sequencia,
-                ids_em_uso=ids_em_uso,
-                rotulo_index=rotulo_index,
-            )
+                {
+                    "dispositivo_origem_id": dispositivo_id,
+                    "urn_alvo": citacao.urn,
+                    "id_lexml_alvo": citacao.id_lexml_alvo,
+                    "tipo": citacao.tipo,
+                    "descricao": citacao.trecho,
+                },
+            ),
+        )
+        novas += 1
+    estado.citacoes = []
+    return novas
 
 
-def _registrar_anexos(repo: NormativeRepository, ato_id: str, anexos: List[Dict]) -> None:
+def _registrar_anexos(escritor: EscritorEmLote, ato_id: str, anexos: List[Dict]) -> None:
     for ordem, anexo in enumerate(anexos, start=1):
         texto = anexo.get("texto") or ""
-        repo.inserir_anexo(
-            ato_id=ato_id,
-            id_lexml=anexo.get("id_lexml"),
-            titulo=anexo.get("titulo"),
-            texto=texto,
-            ordem=ordem,
-            hash_texto=_hash_texto(texto),
+        escritor.adicionar(
+            "anexo",
+            linha_anexo(
+                ato_id=ato_id,
+                id_lexml=anexo.get("id_lexml"),
+                titulo=anexo.get("titulo"),
+                texto=texto,
+                ordem=ordem,
+                hash_texto=_hash_texto(texto),
+            ),
+        )
+
+
+class _FalhaArtefato(RuntimeError):
+    """Artefato indisponível (download) ou incoerente com o texto bruto."""
+
+
+class _CargaAto:
+    """Consome os eventos de `artefato.ler_em_fluxo` e grava o ato à medida que chegam.
+
+    No formato compacto o cabeçalho precede os dispositivos, então cada subárvore de primeiro nível
+    é convertida em linhas assim que termina de ser lida. JSONs legados (cabeçalho depois dos
+    dispositivos) são acumulados e convertidos no fim, como antes.
+
+    Nos dois modos as linhas só são preparadas durante a leitura: nada é gravado antes de o
+    artefato ser lido até o fim, então um JSON truncado ou corrompido não deixa o ato pela metade.
+    Com `transacional`, todas seguem numa única chamada à RPC `carregar_ato_normativo` (o ato_id das
+    linhas é preenchido no banco); sem ela, o ato é gravado no fim e as linhas vão em lotes.
+    """
+
+    def __init__(
+        self,
+        repo: NormativeRepository,
+        registro: Dict,
+        *,
+        dry_run: bool,
+        transacional: bool = True,
+        extrair_citacoes: bool = True,
+    ) -> None:
+        self.repo = repo
+        self.registro = registro
+        self.dry_run = dry_run
+        self.transacional = transacional
+        self.cabecalho: Dict = {}
+        self.ato_id: Optional[str] = None
+        self.estado = _EstadoDispositivos(urn=registro["urn_lexml"], extrair_citacoes=extrair_citacoes)
+        self.escritor = EscritorEmLote(repo, tamanho_lote=None)
+        self._iniciado = False
+        self.pendentes: List[Dict] = []
+        self.total_dispositivos = 0
+        self._texto_bruto: Optional[str] = None
+
+    def campo(self, chave: str, valor) -> None:
+        self.cabecalho[chave] = valor
+
+    def dispositivo(self, no: Dict) -> None:
+        self.total_dispositivos += 1
+        if self.dry_run:
+            return
+        if self.cabecalho.get("formato") != artefato.FORMATO_COMPACTO:
+            self.pendentes.append(no)
+            return
+        if not self._iniciado:
+            self._iniciar()
+        self._inserir(no)
+
+    def _iniciar(self, pendentes: Sequence[Dict] = ()) -> None:
+        # Artefatos compactos antigos não têm `texto_em_offsets` e trazem `formato` depois dos
+        # dispositivos: os nós acumulados também decidem se é preciso o texto bruto.
+        if artefato.usa_offsets({**self.cabecalho, artefato.CHAVE_DISPOSITIVOS: list(pendentes)}):
+            try:
+                texto_bruto = storage_utils.download_text(self.registro.get("caminho_texto_bruto") or "")
+                artefato.verificar_texto_bruto(self.cabecalho, texto_bruto)
+            except Exception as exc:  # noqa: BLE001
+                raise _FalhaArtefato(f"não foi possível reconstruir os textos a partir do texto bruto: {exc}") from exc
+            self._texto_bruto = texto_bruto
+        self._iniciado = True
+        self.estado.existentes = self.repo.dispositivos_existentes(self.registro["id"])
+
+    def _inserir(self, no: Dict) -> None:
+        if not isinstance(no, dict):
+            return
+        if self._texto_bruto is not None:
+            artefato.expandir_no(no, self._texto_bruto)
+        arvore = ArvoreDispositivos.de_json([no])
+        _registrar_dispositivos(self.escritor, self.ato_id, arvore, self.estado)
+
+    def concluir(self, hash_json: str) -> None:
+        if not self._iniciado:
+            self._iniciar(self.pendentes)
+        pendentes, self.pendentes = self.pendentes, []
+        for no in pendentes:
+            self._inserir(no)
+        _registrar_anexos(self.escritor, self.ato_id, self.cabecalho.get("anexos", []) or [])
+
+        for relacao in self.cabecalho.get("relacoes", []) or []:
+            rotulo_origem = (relacao.get("dispositivo_origem_rotulo") or "").strip().lower()
+            dispositivo_id = None
+            if rotulo_origem:
+                ids = self.estado.rotulo_index.get(rotulo_origem)
+                if ids:
+                    dispositivo_id = ids[0]
+            relacao_payload = _build_relacao_payload(relacao, dispositivo_id)
+            if relacao_payload:
+                self.estado.registrar_relacao(self.escritor, self.ato_id, relacao_payload)
+        citacoes = _registrar_citacoes(self.escritor, self.ato_id, self.estado)
+
+        remover = self.estado.remover()
+        logging.info(
+            "Ato %s: %s dispositivos novos, %s alterados, %s inalterados, %s removidos; %s relações extraídas do texto.",
+            self.registro["urn_lexml"],
+            self.estado.inseridos,
+            self.estado.atualizados,
+            self.estado.inalterados,
+            len(remover),
+            citacoes,
         )
+        if self.transacional:
+            self.ato_id = self.repo.carregar_ato_transacional(
+                linha_ato(self.registro, self.cabecalho, hash_json),
+                self.escritor.coletar(),
+                remover,
+            )
+            return
+        # O artefato foi lido por inteiro: só agora o ato é tocado. O hash do JSON só é gravado ao
+        # fim da carga, então uma carga interrompida não parece concluída.
+        self.ato_id = self.repo.upsert_ato(self.registro, self.cabecalho, None)
+        self.repo.limpar_anexos_relacoes(self.ato_id)
+        self.escritor.definir_ato(self.ato_id)
+        self.escritor.descarregar()
+        # Remoção só depois dos upserts: os dispositivos mantidos já apontam para os novos pais.
+        self.repo.remover_dispositivos(self.ato_id, remover)
+        logging.info("Ato %s gravado em %s inserções em massa.", self.registro["urn_lexml"], self.escritor.requisicoes)
+        self.repo.definir_hash_json(self.ato_id, hash_json)
 
 
 def carregar_ato(
@@ -255,6 +492,8 @@ def carregar_ato(
     registro: Dict,
     *,
     dry_run: bool = False,
+    transacional: bool = True,
+    extrair_citacoes: bool = True,
 ) -> Tuple[bool, Optional[str]]:
     urn = registro["urn_lexml"]
     caminho_json = registro.get("caminho_parser_json")
@@ -262,59 +501,95 @@ def carregar_ato(
         logging.warning("Registro %s sem caminho_parser_json. Pulando.", urn)
         return False, None
 
-    try:
-        conteudo = storage_utils.download_text(caminho_json)
-    except Exception as exc:  # noqa: BLE001
-        logging.exception("Falha ao baixar JSON estruturado de %s: %s", urn, exc)
-        return False, None
+    hash_eventos = artefato.HashConteudo()
+
+    def blocos() -> Iterator[bytes]:
+        try:
+            yield from storage_utils.download_stream(caminho_json)
+        except Exception as exc:  # noqa: BLE001
+            raise _FalhaArtefato(f"falha ao baixar JSON estruturado: {exc}") from exc
 
+    carga = _CargaAto(
+        repo,
+        registro,
+        dry_run=dry_run,
+        transacional=transacional,
+        extrair_citacoes=extrair_citacoes,
+    )
     try:
-        estrutura = json.loads(conteudo)
-    except json.JSONDecodeError as exc:
+        # O hash é calculado durante a leitura; o JSON nunca fica inteiro em memória.
+        for tipo, chave, valor in artefato.ler_em_fluxo(blocos()):
+            hash_eventos.atualizar(tipo, chave, valor)
+            if tipo == "dispositivo":
+                carga.dispositivo(valor)
+            else:
+                carga.campo(chave, valor)
+        hash_json = hash_eventos.hexdigest()
+        if dry_run:
+            logging.info(
+                "Carregaria ato %s (hash %s, dispositivos=%s, anexos=%s)",
+                urn,
+                hash_json,
+                carga.total_dispositivos,
+                len(carga.cabecalho.get("anexos", []) or []),
+            )
+            return True, hash_json
+        carga.concluir(hash_json)
+    except _FalhaArtefato as exc:
+        logging.error("Não foi possível carregar %s: %s", urn, exc)
+        return False, None
+    except (json.JSONDecodeError, UnicodeDecodeError) as exc:
         logging.exception("JSON inválido para %s: %s", urn, exc)
         return False, None
 
-    hash_json = hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+    return True, hash_json
 
-    if dry_run:
-        dispositivos = len(estrutura.get("dispositivos", []) or [])
-        anexos = len(estrutura.get("anexos", []) or [])
-        logging.info(
-            "Carregaria ato %s (hash %s, dispositivos=%s, anexos=%s)",
-            urn,
-            hash_json,
-            dispositivos,
-            anexos,
-        )
-        return True, hash_json
 
-    ato_id = repo.upsert_ato(registro, estrutura, hash_json)
-    repo.limpar_componentes(ato_id)
+def _marcar_normalizado(repo: NormativeRepository, registro: Dict) -> None:
+    updated_registro = dict(registro)
+    updated_registro["status_parsing"] = registro.get("status_parsing")
+    updated_registro["status_normalizacao"] = "processado"
+    repo.marcar_normalizado(updated_registro)
 
-    rotulo_index: Dict[str, List[str]] = {}
-    _registrar_dispositivos(
-        repo,
-        ato_id,
-        estrutura.get("dispositivos", []) or [],
-        parent_id=None,
-        sequencia=[0],
-        ids_em_uso={},
-        rotulo_index=rotulo_index,
-    )
-    _registrar_anexos(repo, ato_id, estrutura.get("anexos", []) or [])
-
-    for relacao in estrutura.get("relacoes", []) or []:
-        rotulo_origem = (relacao.get("dispositivo_origem_rotulo") or "").strip().lower()
-        dispositivo_id = None
-        if rotulo_origem:
-            ids = rotulo_index.get(rotulo_origem)
-            if ids:
-                dispositivo_id = ids[0]
-        relacao_payload = _build_relacao_payload(relacao, dispositivo_id)
-        if relacao_payload:
-            repo.inserir_relacao(ato_id, relacao_payload)
 
-    return True, hash_json
+_local = threading.local()
+
+
+def _repo_da_thread() -> NormativeRepository:
+    """Um repositório por worker, cada um com seu próprio cliente do Supabase (o de
+    `get_supabase_client` é único no processo)."""
+    repo = getattr(_local, "repo", None)
+    if repo is None:
+        repo = _local.repo = NormativeRepository(db_utils.criar_supabase_client())
+    return repo
+
+
+def _processar_registro(
+    repo: Optional[NormativeRepository],
+    registro: Dict,
+    *,
+    dry_run: bool,
+    transacional: bool,
+    extrair_citacoes: bool,
+) -> bool:
+    """Carrega um ato e o marca como normalizado; qualquer falha fica restrita a ele."""
+    urn = registro["urn_lexml"]
+    repo = repo or _repo_da_thread()
+    logging.info("Processando normalização de %s", urn)
+    try:
+        ok, _ = carregar_ato(
+            repo,
+            registro,
+            dry_run=dry_run,
+            transacional=transacional,
+            extrair_citacoes=extrair_citacoes,
+        )
+        if ok and not dry_run:
+            _marcar_normalizado(repo, registro)
+        return ok
+    except Exception as exc:  # noqa: BLE001
+        logging.exception("Falha inesperada ao carregar %s: %s", urn, exc)
+        return False
 
 
 def main(argv: Optional[Iterable[str]] = None) -> None:
@@ -327,8 +602,42 @@ def main(argv: Optional[Iterable[str]] = None) -> None:
         help="URN LexML específica a normalizar (pode repetir). Ignora --limit para esses itens.",
     )
     parser.add_argument("--dry-run", action="store_true", help="Simula execução sem gravar")
+    parser.add_argument(
+        "--gravacao",
+        choices=("rpc", "lotes"),
+        default="rpc",
+        help="rpc: uma transação por ato via carregar_ato_normativo (migração 011); lotes: upserts em massa sem transação.",
+    )
+    parser.add_argument(
+        "--forcar-recarga",
+        action="store_true",
+        help="Recarrega mesmo os atos cujo JSON estruturado não mudou desde a última carga.",
+    )
+    parser.add_argument(
+        "--sem-citacoes",
+        action="store_true",
+        help="Não extrai do texto dos dispositivos as citações normativas que o LLM não trouxe em relacoes.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Atos carregados em paralelo (cada worker com seu próprio cliente do Supabase). Padrão: 1.",
+    )
+    parser.add_argument(
+        "--embeddings",
+        action="store_true",
+        help="Ao final, gera embeddings para os textos de dispositivos ainda sem vetor (migração 015).",
+    )
+    parser.add_argument(
+        "--grafo",
+        action="store_true",
+        help="Ao final, atualiza o snapshot CSR do grafo normativo com os atos carregados (ATLAS_GRAFO_ARQUIVO).",
+    )
 
     args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers deve ser maior ou igual a 1")
 
     origens = db_utils.fetch_origens(args.origin_id)
     if not origens:
@@ -338,6 +647,11 @@ def main(argv: Optional[Iterable[str]] = None) -> None:
     repo = NormativeRepository()
     urns_param = list(dict.fromkeys(args.urn)) if args.urn else None
     processados = 0
+    pulados = 0
+    falhas = 0
+    urns_carregadas: List[str] = []
+    inicio = time.monotonic()
+    executor = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="loader") if args.workers > 1 else None
 
     for origem in origens:
         origem_id = str(origem["id"])
@@ -355,24 +669,74 @@ def main(argv: Optional[Iterable[str]] = None) -> None:
         if urns_param:
             logging.info("Processando %s URN(s) específicas na origem %s.", len(registros), origem_id)
 
+        # Uma consulta por lote: atos cujo JSON do parser é o mesmo já carregado não são baixados.
+        hashes_carregados = (
+            {} if args.forcar_recarga else repo.hashes_json_carregados([str(registro["id"]) for registro in registros])
+        )
+
+        a_carregar: List[Dict] = []
         for registro in registros:
             urn = registro["urn_lexml"]
-            logging.info("Processando normalização de %s", urn)
-            ok, hash_json = carregar_ato(repo, registro, dry_run=args.dry_run)
+            hash_parser = registro.get("hash_parser_json")
+            if hash_parser and hashes_carregados.get(str(registro["id"])) == hash_parser:
+                logging.info("JSON estruturado de %s inalterado (hash %s). Pulando carga.", urn, hash_parser)
+                pulados += 1
+                if not args.dry_run:
+                    _marcar_normalizado(repo, registro)
+                continue
+            a_carregar.append(registro)
+
+        opcoes = {
+            "dry_run": args.dry_run,
+            "transacional": args.gravacao == "rpc",
+            "extrair_citacoes": not args.sem_citacoes,
+        }
+        if executor is None:
+            resultados = (_processar_registro(repo, registro, **opcoes) for registro in a_carregar)
+        else:
+            resultados = executor.map(lambda registro: _processar_registro(None, registro, **opcoes), a_carregar)
+        for registro, ok in zip(a_carregar, resultados):
             if ok:
                 processados += 1
-                if not args.dry_run:
-                    updated_registro = dict(registro)
-                    updated_registro["status_parsing"] = registro.get("status_parsing")
-                    updated_registro["status_normalizacao"] = "processado"
-                    repo.marcar_normalizado(updated_registro)
+                urns_carregadas.append(registro["urn_lexml"])
+            else:
+                falhas += 1
 
+    if executor is not None:
+        executor.shutdown()
+    duracao = time.monotonic() - inicio
     logging.info(
-        "Normalização concluída: %s itens%s",
+        "Normalização concluída: %s itens carregados, %s inalterados, %s falhas em %.1fs (%.2f atos/s, %s workers)%s",
         processados,
+        pulados,
+        falhas,
+        duracao,
+        processados / duracao if duracao > 0 else 0.0,
+        args.workers,
         " (dry-run)" if args.dry_run else "",
     )
 
+    if urns_carregadas and not args.dry_run:
+        # Relações recém-gravadas e as que já apontavam para os atos carregados agora.
+        try:
+            vinculos.vincular(repo, urns_carregadas=urns_carregadas)
+        except Exception as exc:  # noqa: BLE001
+            logging.exception("Falha ao vincular relações (rode `python -m src.loader.vinculos`): %s", exc)
+
+    if args.embeddings and urns_carregadas and not args.dry_run:
+        # Só textos novos: dispositivos com hash_texto já embutido não voltam ao embedder.
+        try:
+            embeddings.gerar_embeddings(repo, obter_embedder())
+        except Exception as exc:  # noqa: BLE001
+            logging.exception("Falha ao gerar embeddings (rode `python -m src.loader.embeddings`): %s", exc)
+
+    if args.grafo and urns_carregadas and not args.dry_run:
+        # Depois do vínculo: as relações que passaram a apontar para os atos carregados entram juntas.
+        try:
+            grafo.exportar(urns_alteradas=urns_carregadas)
+        except Exception as exc:  # noqa: BLE001
+            logging.exception("Falha ao atualizar o grafo (rode `python -m src.consulta.grafo --exportar`): %s", exc)
+
 
 if __name__ == "__main__":
     main()
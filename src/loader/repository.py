@@ -3,17 +3,118 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from supabase import Client
 
 from ..utils.db import get_supabase_client
 from ..utils.status import resolve_status
 
 
+TAMANHO_LOTE_INSERCAO = 1000
+# Ids por filtro `in.(...)`: mantém a URL do PostgREST curta.
+TAMANHO_LOTE_IDS = 200
+
+CAMPOS_RELACAO_ALVO = "id,urn_alvo,id_lexml_alvo,dispositivo_alvo_id"
+
+# Colunas que, junto do id_lexml, decidem se um dispositivo já gravado precisa ser atualizado.
+CAMPOS_COMPARADOS = ("parent_id", "tipo", "rotulo", "ordem", "atributos", "hash_texto")
+
+
+def linha_ato(registro: Dict, estrutura: Dict, hash_json: Optional[str]) -> Dict:
+    fonte_extra = estrutura.get("fonte") or {}
+    return {
+        "fonte_documento_id": registro["id"],
+        "urn_lexml": registro["urn_lexml"],
+        "tipo_ato": fonte_extra.get("tipo_ato") or registro.get("tipo_ato"),
+        "titulo": fonte_extra.get("titulo") or registro.get("titulo"),
+        "ementa": fonte_extra.get("ementa") or registro.get("ementa"),
+        "orgao_publicador": registro.get("orgao_publicador"),
+        "data_legislacao": registro.get("data_legislacao"),
+        "data_publicacao": registro.get("data_publicacao_diario"),
+        "status_vigencia": fonte_extra.get("situacao_vigencia"),
+        "hash_texto_bruto": registro.get("hash_texto_bruto"),
+        "hash_json_estruturado": hash_json,
+        "metadata_extra": fonte_extra,
+    }
+
+
+def linha_dispositivo(
+    *,
+    id: str,
+    ato_id: str,
+    parent_id: Optional[str],
+    id_lexml: str,
+    tipo: str,
+    rotulo: Optional[str],
+    texto: str,
+    ordem: int,
+    atributos: Dict,
+    hash_texto: Optional[str],
+) -> Dict:
+    return {
+        "id": id,
+        "ato_id": ato_id,
+        "parent_id": parent_id,
+        "id_lexml": id_lexml,
+        "tipo": tipo,
+        "rotulo": (rotulo or "")[:160],
+        "texto": texto,
+        "ordem": ordem,
+        "atributos": atributos or {},
+        "hash_texto": hash_texto,
+    }
+
+
+def linha_anexo(
+    *,
+    ato_id: str,
+    id_lexml: Optional[str],
+    titulo: Optional[str],
+    texto: str,
+    ordem: int,
+    hash_texto: Optional[str],
+) -> Dict:
+    return {
+        "ato_id": ato_id,
+        "id_lexml": id_lexml,
+        "titulo": titulo,
+        "texto": texto,
+        "ordem": ordem,
+        "hash_texto": hash_texto,
+    }
+
+
+def linha_versao_textual(dispositivo_id: str, versao: Dict) -> Dict:
+    return {
+        "dispositivo_id": dispositivo_id,
+        "hash_texto": versao.get("hash_texto"),
+        "texto": versao.get("texto"),
+        "vigencia_inicio": versao.get("vigencia_inicio"),
+        "vigencia_fim": versao.get("vigencia_fim"),
+        "origem_alteracao": versao.get("origem_alteracao"),
+        "status_vigencia": versao.get("status_vigencia"),
+        "anotacoes": versao.get("anotacoes", {}),
+    }
+
+
+def linha_relacao(ato_id: str, relacao: Dict) -> Dict:
+    return {
+        "ato_id": ato_id,
+        "dispositivo_origem_id": relacao.get("dispositivo_origem_id"),
+        "dispositivo_alvo_id": relacao.get("dispositivo_alvo_id"),
+        "urn_alvo": relacao.get("urn_alvo"),
+        "id_lexml_alvo": relacao.get("id_lexml_alvo"),
+        "tipo": relacao.get("tipo"),
+        "descricao": relacao.get("descricao"),
+    }
+
+
 class NormativeRepository:
     """Abstrai operações de escrita nas tabelas relacionais."""
 
-    def __init__(self) -> None:
-        self.client = get_supabase_client()
+    def __init__(self, client: Optional[Client] = None) -> None:
+        self.client = client or get_supabase_client()
 
     def fetch_para_normalizacao(
         self,
@@ -37,29 +138,9 @@ class NormativeRepository:
         response = query.execute()
         return response.data or []
 
-    def upsert_ato(self, registro: Dict, estrutura: Dict, hash_json: str) -> str:
+    def upsert_ato(self, registro: Dict, estrutura: Dict, hash_json: Optional[str]) -> str:
         fonte_documento_id = registro["id"]
-        urn = registro["urn_lexml"]
-
-        fonte_extra = estrutura.get("fonte") or {}
-        titulo = fonte_extra.get("titulo") or registro.get("titulo")
-        ementa = fonte_extra.get("ementa") or registro.get("ementa")
-        tipo_ato = fonte_extra.get("tipo_ato") or registro.get("tipo_ato")
-
-        payload = {
-            "fonte_documento_id": fonte_documento_id,
-            "urn_lexml": urn,
-            "tipo_ato": tipo_ato,
-            "titulo": titulo,
-            "ementa": ementa,
-            "orgao_publicador": registro.get("orgao_publicador"),
-            "data_legislacao": registro.get("data_legislacao"),
-            "data_publicacao": registro.get("data_publicacao_diario"),
-            "status_vigencia": fonte_extra.get("situacao_vigencia"),
-            "hash_texto_bruto": registro.get("hash_texto_bruto"),
-            "hash_json_estruturado": hash_json,
-            "metadata_extra": fonte_extra,
-        }
+        payload = linha_ato(registro, estrutura, hash_json)
 
         existing_resp = (
             self.client.table("ato_normativo")
@@ -80,83 +161,174 @@ class NormativeRepository:
 
         return ato_id
 
-    def limpar_componentes(self, ato_id: str) -> None:
+    def hashes_json_carregados(self, fonte_documento_ids: List[str]) -> Dict[str, Optional[str]]:
+        """`hash_json_estruturado` já gravado para cada `fonte_documento_id` que tem ato."""
+        hashes: Dict[str, Optional[str]] = {}
+        for inicio in range(0, len(fonte_documento_ids), TAMANHO_LOTE_IDS):
+            response = (
+                self.client.table("ato_normativo")
+                .select("fonte_documento_id,hash_json_estruturado")
+                .in_("fonte_documento_id", fonte_documento_ids[inicio : inicio + TAMANHO_LOTE_IDS])
+                .execute()
+            )
+            for linha in response.data or []:
+                hashes[str(linha["fonte_documento_id"])] = linha.get("hash_json_estruturado")
+        return hashes
+
+    def definir_hash_json(self, ato_id: str, hash_json: str) -> None:
+        self.client.table("ato_normativo").update({"hash_json_estruturado": hash_json}).eq("id", ato_id).execute()
+
+    def dispositivos_existentes(self, fonte_documento_id: str, *, page_size: int = 1000) -> Dict[str, Dict]:
+        """Dispositivos já gravados do ato (sem o texto), indexados por `id_lexml`."""
+        ato_resp = (
+            self.client.table("ato_normativo")
+            .select("id")
+            .eq("fonte_documento_id", fonte_documento_id)
+            .execute()
+        )
+        if not ato_resp.data:
+            return {}
+        ato_id = ato_resp.data[0]["id"]
+        existentes: Dict[str, Dict] = {}
+        inicio = 0
+        while True:
+            response = (
+                self.client.table("dispositivo")
+                .select(",".join(("id", "id_lexml") + CAMPOS_COMPARADOS))
+                .eq("ato_id", ato_id)
+                .order("id")
+                .range(inicio, inicio + page_size - 1)
+                .execute()
+            )
+            linhas = response.data or []
+            for linha in linhas:
+                existentes[linha["id_lexml"]] = linha
+            if len(linhas) < page_size:
+                return existentes
+            inicio += page_size
+
+    def limpar_anexos_relacoes(self, ato_id: str) -> None:
         self.client.table("dispositivo_relacao").delete().eq("ato_id", ato_id).execute()
         self.client.table("anexo").delete().eq("ato_id", ato_id).execute()
-        self.client.table("dispositivo").delete().eq("ato_id", ato_id).execute()
 
-    def inserir_dispositivo(
+    def remover_dispositivos(self, ato_id: str, ids: List[str]) -> None:
+        for inicio in range(0, len(ids), TAMANHO_LOTE_IDS):
+            (
+                self.client.table("dispositivo")
+                .delete()
+                .eq("ato_id", ato_id)
+                .in_("id", ids[inicio : inicio + TAMANHO_LOTE_IDS])
+                .execute()
+            )
+
+    def carregar_ato_transacional(
         self,
-        *,
-        ato_id: str,
-        parent_id: Optional[str],
-        id_lexml: str,
-        tipo: str,
-        rotulo: Optional[str],
-        texto: str,
-        ordem: int,
-        atributos: Dict,
-        hash_texto: Optional[str],
+        ato: Dict,
+        componentes: Dict[str, List[Dict]],
+        remover: List[str],
     ) -> str:
-        payload = {
-            "ato_id": ato_id,
-            "parent_id": parent_id,
-            "id_lexml": id_lexml,
-            "tipo": tipo,
-            "rotulo": (rotulo or "")[:160],
-            "texto": texto,
-            "ordem": ordem,
-            "atributos": atributos or {},
-            "hash_texto": hash_texto,
-        }
-        result = self.client.table("dispositivo").insert(payload).execute()
-        if not result.data:
-            raise RuntimeError("Falha ao inserir dispositivo")
-        return result.data[0]["id"]
+        """Grava o ato e aplica o diff dos componentes numa única transação (RPC das migrações 010/011)."""
+        response = self.client.rpc(
+            "carregar_ato_normativo",
+            {
+                "p_ato": ato,
+                "p_dispositivos": componentes.get("dispositivo", []),
+                "p_versoes": componentes.get("versao_textual", []),
+                "p_anexos": componentes.get("anexo", []),
+                "p_relacoes": componentes.get("dispositivo_relacao", []),
+                "p_remover": remover,
+            },
+        ).execute()
+        if not response.data:
+            raise RuntimeError("Falha ao carregar ato_normativo via RPC")
+        return response.data
 
-    def inserir_anexo(
-        self,
-        *,
-        ato_id: str,
-        id_lexml: Optional[str],
-        titulo: Optional[str],
-        texto: str,
-        ordem: int,
-        hash_texto: Optional[str],
-    ) -> None:
-        payload = {
-            "ato_id": ato_id,
-            "id_lexml": id_lexml,
-            "titulo": titulo,
-            "texto": texto,
-            "ordem": ordem,
-            "hash_texto": hash_texto,
-        }
-        self.client.table("anexo").insert(payload).execute()
+    def urns_atos(self, *, page_size: int = 1000) -> Iterator[Dict]:
+        """`id` e `urn_lexml` de todos os atos, paginados por id."""
+        ultimo: Optional[str] = None
+        while True:
+            consulta = self.client.table("ato_normativo").select("id,urn_lexml").order("id").limit(page_size)
+            if ultimo is not None:
+                consulta = consulta.gt("id", ultimo)
+            linhas = consulta.execute().data or []
+            yield from linhas
+            if len(linhas) < page_size:
+                return
+            ultimo = linhas[-1]["id"]
 
-    def inserir_versao_textual(self, dispositivo_id: str, versao: Dict) -> None:
-        payload = {
-            "dispositivo_id": dispositivo_id,
-            "hash_texto": versao.get("hash_texto"),
-            "texto": versao.get("texto"),
-            "vigencia_inicio": versao.get("vigencia_inicio"),
-            "vigencia_fim": versao.get("vigencia_fim"),
-            "origem_alteracao": versao.get("origem_alteracao"),
-            "status_vigencia": versao.get("status_vigencia"),
-            "anotacoes": versao.get("anotacoes", {}),
-        }
-        self.client.table("versao_textual").upsert(payload, on_conflict="dispositivo_id,hash_texto").execute()
+    def relacoes_nao_verificadas(self, *, page_size: int = 1000) -> Iterator[List[Dict]]:
+        """Páginas das relações que o vinculador ainda não examinou (`vinculo_verificado_em` nulo)."""
+        ultimo: Optional[str] = None
+        while True:
+            consulta = (
+                self.client.table("dispositivo_relacao")
+                .select(CAMPOS_RELACAO_ALVO)
+                .is_("vinculo_verificado_em", "null")
+                .order("id")
+                .limit(page_size)
+            )
+            if ultimo is not None:
+                consulta = consulta.gt("id", ultimo)
+            linhas = consulta.execute().data or []
+            if linhas:
+                yield linhas
+            if len(linhas) < page_size:
+                return
+            ultimo = linhas[-1]["id"]
 
-    def inserir_relacao(self, ato_id: str, relacao: Dict) -> None:
-        payload = {
-            "ato_id": ato_id,
-            "dispositivo_origem_id": relacao.get("dispositivo_origem_id"),
-            "dispositivo_alvo_id": relacao.get("dispositivo_alvo_id"),
-            "urn_alvo": relacao.get("urn_alvo"),
-            "tipo": relacao.get("tipo"),
-            "descricao": relacao.get("descricao"),
-        }
-        self.client.table("dispositivo_relacao").insert(payload).execute()
+    def relacoes_sem_alvo(self, urns_alvo: List[str]) -> List[Dict]:
+        """Relações já verificadas, ainda sem ato alvo, que apontam para alguma das URNs."""
+        linhas: List[Dict] = []
+        for inicio in range(0, len(urns_alvo), TAMANHO_LOTE_IDS):
+            response = (
+                self.client.table("dispositivo_relacao")
+                .select(CAMPOS_RELACAO_ALVO)
+                .is_("ato_alvo_id", "null")
+                .in_("urn_alvo", urns_alvo[inicio : inicio + TAMANHO_LOTE_IDS])
+                .execute()
+            )
+            linhas.extend(response.data or [])
+        return linhas
+
+    def ids_dispositivos(self, ato_id: str, ids_lexml: List[str]) -> Dict[str, str]:
+        """`id_lexml` → `id` dos dispositivos pedidos de um ato."""
+        ids: Dict[str, str] = {}
+        for inicio in range(0, len(ids_lexml), TAMANHO_LOTE_IDS):
+            response = (
+                self.client.table("dispositivo")
+                .select("id,id_lexml")
+                .eq("ato_id", ato_id)
+                .in_("id_lexml", ids_lexml[inicio : inicio + TAMANHO_LOTE_IDS])
+                .execute()
+            )
+            for linha in response.data or []:
+                ids[linha["id_lexml"]] = linha["id"]
+        return ids
+
+    def vincular_relacoes(self, vinculos: List[Dict]) -> int:
+        """Grava os alvos resolvidos num único UPDATE (RPC da migração 012)."""
+        if not vinculos:
+            return 0
+        response = self.client.rpc("vincular_relacoes", {"p_vinculos": vinculos}).execute()
+        return response.data or 0
+
+    def textos_sem_embedding(self, modelo: str, *, apos: Optional[str] = None, limite: int = 1000) -> List[Dict]:
+        """`hash_texto`/`texto` distintos ainda sem embedding do modelo, após o hash `apos` (migração 015)."""
+        response = self.client.rpc(
+            "textos_sem_embedding",
+            {"p_modelo": modelo, "p_apos": apos, "p_limite": limite},
+        ).execute()
+        return response.data or []
+
+    def inserir_em_massa(self, tabela: str, linhas: List[Dict], *, on_conflict: Optional[str] = None) -> None:
+        """Um único INSERT (ou upsert, com `on_conflict`) para todas as linhas."""
+        if not linhas:
+            return
+        consulta = self.client.table(tabela)
+        if on_conflict:
+            consulta.upsert(linhas, on_conflict=on_conflict).execute()
+        else:
+            consulta.insert(linhas).execute()
 
     def marcar_normalizado(self, registro: Dict) -> None:
         novo_status = resolve_status(
@@ -170,3 +342,65 @@ class NormativeRepository:
             "status": novo_status,
         }
         self.client.table("fonte_documento").update(payload).eq("id", registro["id"]).execute()
+
+
+class EscritorEmLote:
+    """Acumula as linhas de um ato e as envia em INSERTs em massa.
+
+    Os ids dos dispositivos são gerados no cliente (ou reaproveitados dos já gravados, e então a
+    linha é um upsert por `id`), então filhos, versões e relações já chegam com as chaves
+    estrangeiras preenchidas. Cada descarga grava as tabelas na ordem de `ORDEM` e os
+    dispositivos em pré-ordem: um pai está sempre no mesmo lote do filho ou em um anterior (o
+    Postgres verifica as FKs ao fim de cada comando, não linha a linha). Com `tamanho_lote=None`
+    nada é enviado ao adicionar: as linhas são entregues de uma vez por `coletar` (carga
+    transacional via RPC) ou enviadas em lotes por `descarregar`.
+    """
+
+    ORDEM = ("dispositivo", "versao_textual", "anexo", "dispositivo_relacao")
+    CONFLITOS = {"dispositivo": "id", "versao_textual": "dispositivo_id,hash_texto"}
+
+    def __init__(self, repo: NormativeRepository, *, tamanho_lote: Optional[int] = TAMANHO_LOTE_INSERCAO) -> None:
+        self.repo = repo
+        self.tamanho_lote = tamanho_lote
+        self.requisicoes = 0
+        self._pendentes: Dict[str, List[Dict]] = {tabela: [] for tabela in self.ORDEM}
+        self._versoes: Dict[Tuple[str, Optional[str]], Dict] = {}
+
+    def adicionar(self, tabela: str, linha: Dict) -> None:
+        if tabela == "versao_textual":
+            # Upsert em massa não aceita a mesma chave duas vezes no comando: a última versão vence,
+            # como acontecia com upserts sucessivos.
+            self._versoes[(linha["dispositivo_id"], linha.get("hash_texto"))] = linha
+            tamanho = len(self._versoes)
+        else:
+            self._pendentes[tabela].append(linha)
+            tamanho = len(self._pendentes[tabela])
+        if self.tamanho_lote is not None and tamanho >= self.tamanho_lote:
+            self.descarregar()
+
+    def definir_ato(self, ato_id: str) -> None:
+        """Preenche o `ato_id` das linhas preparadas antes de o ato ser gravado."""
+        for tabela in ("dispositivo", "anexo", "dispositivo_relacao"):
+            for linha in self._pendentes[tabela]:
+                linha["ato_id"] = ato_id
+
+    def coletar(self) -> Dict[str, List[Dict]]:
+        """Entrega e esvazia as linhas pendentes, por tabela."""
+        self._pendentes["versao_textual"] = list(self._versoes.values())
+        self._versoes = {}
+        pendentes = self._pendentes
+        self._pendentes = {tabela: [] for tabela in self.ORDEM}
+        return pendentes
+
+    def descarregar(self) -> None:
+        pendentes = self.coletar()
+        tamanho_lote = self.tamanho_lote or TAMANHO_LOTE_INSERCAO
+        for tabela in self.ORDEM:
+            linhas = pendentes[tabela]
+            for inicio in range(0, len(linhas), tamanho_lote):
+                self.repo.inserir_em_massa(
+                    tabela,
+                    linhas[inicio : inicio + tamanho_lote],
+                    on_conflict=self.CONFLITOS.get(tabela),
+                )
+                self.requisicoes += 1
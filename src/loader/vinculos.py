@@ -0,0 +1,270 @@
+"""Vincula `dispositivo_relacao` aos atos e dispositivos já carregados.
+
+O LLM grava o alvo das relações como texto (`urn_alvo`, com ou sem `urn:lex:`, números com ponto,
+`:` no lugar de `;`...) e quase nunca informa `dispositivo_alvo_id`. Esta passada normaliza as URNs,
+resolve cada uma contra um índice em memória de `ato_normativo.urn_lexml` e, quando a relação
+indica o dispositivo citado (`id_lexml_alvo` ou fragmento `!art2` da URN), contra os pares
+`(ato, id_lexml)` de `dispositivo`. Os alvos são gravados em lote pela RPC `vincular_relacoes`
+(migração 012).
+
+É incremental: só relações com `vinculo_verificado_em` nulo (as recém-carregadas) e, para os atos
+acabados de carregar, as relações antigas que apontavam para eles sem alvo resolvido.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .repository import NormativeRepository
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+_PREFIXO_URN_RE = re.compile(r"^\s*urn\s*:\s*lex\s*:\s*")
+_SEPARADORES_URN_RE = re.compile(r"[;:]")
+_SEPARADORES_TIPO_RE = re.compile(r"[\s_/]+")
+_NUMERO_ANO_RE = re.compile(r"^(?P<numero>[^/]+)/\d{2,4}$")
+_FRAGMENTO_LEXML_RE = re.compile(r"(?P<prefixo>art|par|inc|ali|ite|cpt)(?P<valor>\d*[a-z]?)")
+
+# Grafias da localidade vistas nas URNs geradas pelo LLM → forma usada por `_build_urn` do crawler.
+ALIASES_LOCALIDADE = {"goias": "go"}
+
+_FORMATOS_DATA = ("%Y-%m-%d", "%d/%m/%Y", "%d.%m.%Y", "%d-%m-%Y")
+
+
+def _sem_acentos(texto: str) -> str:
+    if texto.isascii():
+        return texto
+    return "".join(ch for ch in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(ch))
+
+
+def _normalizar_data(valor: str) -> str:
+    try:
+        return date.fromisoformat(valor).isoformat()
+    except ValueError:
+        pass
+    for formato in _FORMATOS_DATA[1:]:
+        try:
+            return datetime.strptime(valor, formato).date().isoformat()
+        except ValueError:
+            continue
+    return valor
+
+
+def _normalizar_numero(valor: str) -> str:
+    match = _NUMERO_ANO_RE.match(valor)
+    if match:
+        valor = match.group("numero")
+    numero = "".join(ch for ch in valor if ch.isalnum())
+    if numero.isdigit():
+        return numero.lstrip("0") or "0"
+    return numero
+
+
+def _romano(numero: int) -> str:
+    partes = []
+    for valor, simbolo in (
+        (1000, "m"), (900, "cm"), (500, "d"), (400, "cd"), (100, "c"), (90, "xc"),
+        (50, "l"), (40, "xl"), (10, "x"), (9, "ix"), (5, "v"), (4, "iv"), (1, "i"),
+    ):
+        while numero >= valor:
+            partes.append(simbolo)
+            numero -= valor
+    return "".join(partes)
+
+
+def id_lexml_de_fragmento(fragmento: Optional[str]) -> Optional[str]:
+    """Converte o fragmento de uma URN (`art2_par1_inc2_ali1`, padrão LexML) para o `id_lexml` do
+    loader (`art2p1inciialia`); fragmentos já no formato do loader passam direto."""
+    fragmento = (fragmento or "").strip().lower()
+    if not fragmento.startswith("art"):
+        return None
+    if "_" not in fragmento:
+        return fragmento
+    id_lexml = ""
+    for componente in fragmento.split("_"):
+        match = _FRAGMENTO_LEXML_RE.fullmatch(componente)
+        if match is None:
+            break
+        prefixo, valor = match.group("prefixo"), match.group("valor")
+        if prefixo == "cpt":
+            continue
+        if prefixo == "art":
+            id_lexml = f"art{valor}"
+        elif prefixo == "par":
+            id_lexml += "pu" if valor == "1u" else f"p{valor}"
+        elif prefixo == "inc" and valor.isdigit():
+            id_lexml += f"inc{_romano(int(valor))}"
+        elif prefixo == "ali" and valor.isdigit() and 0 < int(valor) <= 26:
+            id_lexml += f"ali{chr(ord('a') + int(valor) - 1)}"
+        elif prefixo == "ite":
+            id_lexml += f"item{valor}"
+        else:
+            break
+    return id_lexml or None
+
+
+def canonizar_urn(urn: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """URN no formato de `_build_urn` (`br;go;estadual;lei;2018-12-20;21500`) e `id_lexml` do
+    fragmento, se houver. Retorna `(None, ...)` quando a URN não tem tipo, data e número."""
+    texto = _sem_acentos((urn or "").strip().lower())
+    texto = _PREFIXO_URN_RE.sub("", texto)
+    texto, _, fragmento = texto.partition("!")
+    texto = texto.split("@", 1)[0]
+    partes = [parte.strip() for parte in _SEPARADORES_URN_RE.split(texto) if parte.strip()]
+    id_lexml = id_lexml_de_fragmento(fragmento) if fragmento else None
+    if len(partes) < 4:
+        return None, id_lexml
+    *localidade, tipo, data, numero = partes
+    localidade = [ALIASES_LOCALIDADE.get(parte, parte) for parte in localidade]
+    tipo = _SEPARADORES_TIPO_RE.sub(".", tipo.replace("º", "").replace("ª", "")).strip(".")
+    return ";".join(localidade + [tipo, _normalizar_data(data), _normalizar_numero(numero)]), id_lexml
+
+
+def urn_tipo_base(urn: str) -> str:
+    """URN canônica com o tipo reduzido ao tipo base (`lei.ordinaria` → `lei`).
+
+    O crawler grava o tipo qualificado (`lei.ordinária`, `decreto.numerado`), enquanto o LLM e as
+    citações do texto escrevem só `lei`/`decreto`; esta é a chave em que as duas grafias se encontram."""
+    partes = urn.split(";")
+    if len(partes) < 4:
+        return urn
+    partes[-3] = partes[-3].split(".", 1)[0]
+    return ";".join(partes)
+
+
+@dataclass
+class IndiceAlvos:
+    """URNs canônicas dos atos carregados e cache dos `(ato, id_lexml)` já consultados.
+
+    `por_tipo_base` indexa os mesmos atos por `urn_tipo_base`; fica `None` quando dois atos caem na
+    mesma chave (ex.: `lei.ordinaria` e `lei.complementar` com mesma data e número)."""
+
+    atos: Dict[str, str] = field(default_factory=dict)
+    por_tipo_base: Dict[str, Optional[str]] = field(default_factory=dict)
+    dispositivos: Dict[Tuple[str, str], Optional[str]] = field(default_factory=dict)
+
+    @classmethod
+    def carregar(cls, repo: NormativeRepository) -> "IndiceAlvos":
+        indice = cls()
+        for linha in repo.urns_atos():
+            urn, _ = canonizar_urn(linha.get("urn_lexml"))
+            if urn:
+                indice.atos[urn] = linha["id"]
+                base = urn_tipo_base(urn)
+                indice.por_tipo_base[base] = linha["id"] if base not in indice.por_tipo_base else None
+        return indice
+
+    def ato(self, urn: Optional[str]) -> Optional[str]:
+        """Id do ato da URN canônica: grafia exata primeiro e, só quando a URN traz o tipo base
+        (`lei`), pelo tipo base. Um tipo qualificado (`lei.complementar`) nunca cai em outro
+        qualificado (`lei.ordinaria`) de mesma data e número."""
+        if not urn:
+            return None
+        encontrado = self.atos.get(urn)
+        if encontrado is not None or urn_tipo_base(urn) != urn:
+            return encontrado
+        return self.por_tipo_base.get(urn)
+
+    def buscar_dispositivos(self, repo: NormativeRepository, pedidos: Iterable[Tuple[str, str]]) -> None:
+        """Consulta em lote, por ato, os pares ainda fora do cache."""
+        por_ato: Dict[str, Set[str]] = defaultdict(set)
+        for ato_id, id_lexml in pedidos:
+            if (ato_id, id_lexml) not in self.dispositivos:
+                por_ato[ato_id].add(id_lexml)
+        for ato_id, ids_lexml in por_ato.items():
+            encontrados = repo.ids_dispositivos(ato_id, sorted(ids_lexml))
+            for id_lexml in ids_lexml:
+                self.dispositivos[(ato_id, id_lexml)] = encontrados.get(id_lexml)
+
+
+def resolver(repo: NormativeRepository, indice: IndiceAlvos, relacoes: List[Dict], estatisticas: Counter) -> List[Dict]:
+    """Linhas para `vincular_relacoes`, uma por relação (alvos nulos quando não encontrados)."""
+    resolvidas: List[Tuple[Dict, Optional[str], Optional[str], Optional[str]]] = []
+    for relacao in relacoes:
+        urn, id_fragmento = canonizar_urn(relacao.get("urn_alvo"))
+        ato_id = indice.ato(urn)
+        resolvidas.append((relacao, urn, ato_id, relacao.get("id_lexml_alvo") or id_fragmento))
+    indice.buscar_dispositivos(
+        repo,
+        ((ato_id, id_lexml) for _, _, ato_id, id_lexml in resolvidas if ato_id and id_lexml),
+    )
+
+    vinculos: List[Dict] = []
+    for relacao, urn, ato_id, id_lexml in resolvidas:
+        dispositivo_id = indice.dispositivos.get((ato_id, id_lexml)) if ato_id and id_lexml else None
+        estatisticas["verificadas"] += 1
+        estatisticas["atos"] += ato_id is not None
+        estatisticas["dispositivos"] += dispositivo_id is not None
+        vinculos.append(
+            {
+                "id": relacao["id"],
+                "ato_alvo_id": ato_id,
+                "dispositivo_alvo_id": dispositivo_id,
+                "urn_alvo": urn,
+                "id_lexml_alvo": id_lexml,
+            }
+        )
+    return vinculos
+
+
+def vincular(
+    repo: NormativeRepository,
+    *,
+    urns_carregadas: Optional[List[str]] = None,
+    dry_run: bool = False,
+) -> Counter:
+    """Resolve as relações novas e, para as URNs informadas, as antigas ainda sem alvo."""
+    indice = IndiceAlvos.carregar(repo)
+    estatisticas: Counter = Counter()
+
+    def gravar(relacoes: List[Dict]) -> None:
+        vinculos = resolver(repo, indice, relacoes, estatisticas)
+        if not dry_run:
+            repo.vincular_relacoes(vinculos)
+
+    for pagina in repo.relacoes_nao_verificadas():
+        gravar(pagina)
+    if urns_carregadas:
+        canonicas = {urn for urn in (canonizar_urn(bruta)[0] for bruta in urns_carregadas) if urn}
+        # Relações antigas podem ter gravado o alvo só com o tipo base (`...;lei;...`).
+        canonicas = sorted(canonicas | {urn_tipo_base(urn) for urn in canonicas})
+        pendentes = repo.relacoes_sem_alvo(canonicas)
+        if pendentes:
+            gravar(pendentes)
+
+    logging.info(
+        "Vínculos: %s relações verificadas, %s com ato alvo, %s com dispositivo alvo%s",
+        estatisticas["verificadas"],
+        estatisticas["atos"],
+        estatisticas["dispositivos"],
+        " (dry-run)" if dry_run else "",
+    )
+    return estatisticas
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Vincula relações normativas aos atos e dispositivos carregados")
+    parser.add_argument(
+        "--todas",
+        action="store_true",
+        help="Revisa também as relações já verificadas que continuam sem ato alvo.",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Resolve os alvos sem gravar")
+    args = parser.parse_args(argv)
+
+    repo = NormativeRepository()
+    urns = None
+    if args.todas:
+        urns = [linha["urn_lexml"] for linha in repo.urns_atos() if linha.get("urn_lexml")]
+    vincular(repo, urns_carregadas=urns, dry_run=args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Memoização persistente dos resultados do LLM por chunk (tabela `parser_chunk_cache`).
+
+A chave é o hash do texto do chunk + modelo + versão do prompt: retomadas após falha e
+reprocessamentos de textos levemente corrigidos só enviam ao LLM os chunks novos ou alterados.
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import logging
+from typing import Any, Dict, Iterable, Optional
+
+from ..utils import db as db_utils
+
+TIPO_ESTRUTURA = "estrutura"
+TIPO_LIMITE = "limite"
+
+
+class CacheChunks:
+    """Cache em dois níveis: memória do processo e tabela no Supabase (desativada ao primeiro erro)."""
+
+    def __init__(
+        self,
+        *,
+        versoes: Dict[str, str],
+        modelos: Dict[str, str],
+        gravar: bool = True,
+    ) -> None:
+        self.versoes = versoes
+        self.modelos = modelos
+        self.gravar_habilitado = gravar
+        self.acertos = 0
+        self.faltas = 0
+        self._memoria: Dict[str, Any] = {}
+        self._persistente = True
+
+    def chave(self, tipo: str, texto: str) -> str:
+        base = "\0".join((tipo, self.modelos.get(tipo, ""), self.versoes.get(tipo, ""), texto))
+        return hashlib.sha256(base.encode("utf-8")).hexdigest()
+
+    def _desativar(self, exc: Exception) -> None:
+        logging.warning("Cache de chunks indisponível (%s); seguindo apenas em memória.", exc)
+        self._persistente = False
+
+    def carregar(self, tipo: str, textos: Iterable[str]) -> None:
+        """Busca numa única consulta os resultados já gravados para os textos informados."""
+        chaves = [self.chave(tipo, texto) for texto in textos]
+        faltantes = [chave for chave in dict.fromkeys(chaves) if chave not in self._memoria]
+        if not faltantes or not self._persistente:
+            return
+        try:
+            for linha in db_utils.buscar_cache_chunks(faltantes):
+                self._memoria[linha["chave"]] = linha["resultado"]
+        except Exception as exc:  # noqa: BLE001
+            self._desativar(exc)
+
+    def obter(self, tipo: str, texto: str) -> Optional[Any]:
+        chave = self.chave(tipo, texto)
+        if chave not in self._memoria:
+            self.carregar(tipo, [texto])
+        resultado = self._memoria.get(chave)
+        if resultado is None:
+            self.faltas += 1
+            return None
+        self.acertos += 1
+        # O chamador normaliza/atribui ids nos dispositivos: nunca devolva o objeto do cache.
+        return copy.deepcopy(resultado)
+
+    def gravar(self, tipo: str, texto: str, resultado: Any) -> None:
+        chave = self.chave(tipo, texto)
+        self._memoria[chave] = copy.deepcopy(resultado)
+        if not self.gravar_habilitado or not self._persistente:
+            return
+        try:
+            db_utils.gravar_cache_chunk(
+                {
+                    "chave": chave,
+                    "tipo": tipo,
+                    "modelo": self.modelos.get(tipo),
+                    "versao_prompt": self.versoes.get(tipo),
+                    "hash_texto": hashlib.sha256(texto.encode("utf-8")).hexdigest(),
+                    "resultado": resultado,
+                }
+            )
+        except Exception as exc:  # noqa: BLE001
+            self._desativar(exc)
@@ -6,8 +6,13 @@ from dataclasses import dataclass
 from typing import Dict, List, Optional
 
 from ..utils import llm as llm_utils
+from ..utils import tokens as tokens_utils
+from .cache_chunks import TIPO_LIMITE, CacheChunks
 
+# Usado apenas quando o orçamento por modelo não pode ser calculado.
 DEFAULT_MAX_CHARS = 15000
+# Abaixo disso o prompt fixo domina o custo; não vale a pena fatiar mais fino.
+MIN_CHUNK_CHARS = 2000
 
 
 @dataclass
@@ -26,8 +31,13 @@ def _detectar_limite_seguro(
     *,
     offset_inicial: int,
     model: Optional[str],
+    cache: Optional[CacheChunks] = None,
 ) -> Optional[int]:
     """Usa o LLM auxiliar para localizar o último dispositivo completo dentro do trecho."""
+    if cache is not None:
+        memorizado = cache.obter(TIPO_LIMITE, trecho)
+        if isinstance(memorizado, int) and 0 < memorizado <= len(trecho):
+            return memorizado
     try:
         resposta = llm_utils.detectar_limite_dispositivo(
             trecho,
@@ -42,17 +52,45 @@ def _detectar_limite_seguro(
         return None
     if resposta <= 0 or resposta > len(trecho):
         return None
+    if cache is not None:
+        cache.gravar(TIPO_LIMITE, trecho, resposta)
     return resposta
 
 
+def calcular_max_chars(
+    registro: Dict,
+    *,
+    model: Optional[str] = None,
+    heuristicas: Optional[str] = None,
+) -> int:
+    """Tamanho máximo de chunk derivado do perfil de tokens do modelo de estruturação."""
+    try:
+        perfil = tokens_utils.obter_perfil(model)
+        prompt_fixo = llm_utils.estimar_tokens_prompt_fixo(registro, heuristicas, model=model)
+        max_chars = tokens_utils.calcular_max_chars(perfil, tokens_prompt_fixo=prompt_fixo)
+    except Exception:  # noqa: BLE001
+        return DEFAULT_MAX_CHARS
+    return max(max_chars, MIN_CHUNK_CHARS)
+
+
 def gerar_chunks(
     texto_bruto: str,
     registro: Dict,
     *,
-    max_chars: int = DEFAULT_MAX_CHARS,
+    max_chars: Optional[int] = None,
     aux_model: Optional[str] = None,
+    model: Optional[str] = None,
+    heuristicas: Optional[str] = None,
+    cache: Optional[CacheChunks] = None,
 ) -> List[TextoChunk]:
-    """Divide o texto em chunks, respeitando limites informados pelo LLM para não quebrar dispositivos."""
+    """Divide o texto em chunks, respeitando limites informados pelo LLM para não quebrar dispositivos.
+
+    Sem `max_chars` explícito, o limite vem do orçamento de tokens do modelo `model`
+    (ou `aux_model`), descontado o prompt fixo de estruturação. Com `cache`, limites já
+    detectados para o mesmo trecho são reaproveitados.
+    """
+    if max_chars is None:
+        max_chars = calcular_max_chars(registro, model=model or aux_model, heuristicas=heuristicas)
     if len(texto_bruto) <= max_chars:
         return [TextoChunk(indice=0, inicio=0, fim=len(texto_bruto), texto=texto_bruto)]
 
@@ -73,6 +111,7 @@ def gerar_chunks(
             registro,
             offset_inicial=inicio,
             model=aux_model,
+            cache=cache,
         )
 
         if limite_relativo is None:
@@ -0,0 +1,215 @@
+"""Parser determinístico para atos de estrutura simples (Art./§/inciso/alínea), usado antes do LLM."""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from .dispositivos import _classificar_dispositivo
+
+METODO = "deterministico"
+# Incrementar sempre que as regras abaixo mudarem: atos já estruturados serão reprocessados.
+VERSAO = "2"
+
+# Confiança mínima para dispensar o LLM.
+CONFIANCA_MINIMA_PADRAO = 0.9
+# Atos maiores que isso costumam ter tabelas, alterações e remissões que pedem o LLM.
+MAX_CHARS_PADRAO = 20000
+
+# Rank hierárquico: um dispositivo é filho do último dispositivo aberto com rank menor.
+RANK_TIPO = {
+    "parte": 0,
+    "livro": 1,
+    "titulo": 2,
+    "capitulo": 3,
+    "secao": 4,
+    "subsecao": 5,
+    "artigo": 6,
+    "paragrafo": 7,
+    "paragrafo_unico": 7,
+    "inciso": 8,
+    "alinea": 9,
+    "item": 10,
+}
+
+TOPO_RE = re.compile(
+    r"^(?P<rotulo>(?:PARTE|LIVRO|T[ÍI]TULO|CAP[ÍI]TULO|SUBSE[ÇC][ÃA]O|SE[ÇC][ÃA]O)\s+"
+    r"(?:[IVXLCDM]+|[ÚU]NIC[OA]))\b\s*[-–—.]?\s*(?P<texto>.*)$",
+    re.IGNORECASE,
+)
+ARTIGO_RE = re.compile(r"^(?P<rotulo>Art\.?\s*\d+(?:\s*[º°o])?(?:-[A-Z])?)\.?\s*[-–—]?\s*(?P<texto>.*)$")
+PARAGRAFO_RE = re.compile(r"^(?P<rotulo>§\s*\d+\s*[º°]?)\.?\s*[-–—]?\s*(?P<texto>.*)$")
+PARAGRAFO_UNICO_RE = re.compile(r"^(?P<rotulo>Par[áa]grafo\s+[úu]nico)\.?\s*[-–—.:]?\s*(?P<texto>.*)$", re.IGNORECASE)
+INCISO_RE = re.compile(r"^(?P<rotulo>[IVXLCDM]+)\s*[-–—]\s*(?P<texto>.*)$")
+ALINEA_RE = re.compile(r"^(?P<rotulo>[a-z]\))\s*(?P<texto>.*)$")
+ITEM_RE = re.compile(r"^(?P<rotulo>\d+\))\s*(?P<texto>.*)$")
+
+PADROES_DISPOSITIVO = (TOPO_RE, ARTIGO_RE, PARAGRAFO_RE, PARAGRAFO_UNICO_RE, INCISO_RE, ALINEA_RE, ITEM_RE)
+
+ANEXO_RE = re.compile(r"^ANEXO(?:\s+(?:[IVXLCDM]+|\d+|[ÚU]NICO))?\b", re.IGNORECASE)
+# "Anexo" só abre um anexo como título: linha em caixa alta ou só com o rótulo ("Anexo Único").
+ANEXO_ISOLADO_RE = re.compile(r"^ANEXO(?:\s+(?:[IVXLCDM]+|\d+|[ÚU]NICO))?\s*[-–—.:]?\s*$", re.IGNORECASE)
+FECHO_RE = re.compile(r"^(PAL[ÁA]CIO|GABINETE|SALA\s+DAS\s+SESS[ÕO]ES|Goi[âa]nia,)", re.IGNORECASE)
+PREAMBULO_FIM_RE = re.compile(r"\b(DECRETA|RESOLVE|PROMULGA|SANCIONO|ESTABELECE)\s*:\s*$", re.IGNORECASE)
+
+# Marcadores de alteração de outros atos: exigem `tipo: "alteracao"` e aninhamento de citações.
+ALTERACAO_RE = re.compile(
+    r"passa(?:m)?\s+a\s+vigorar|com\s+a\s+seguinte\s+reda[çc][ãa]o|fica(?:m)?\s+acrescid|"
+    r"nova\s+reda[çc][ãa]o|acrescido\s+d[oa]s?\s+seguinte",
+    re.IGNORECASE,
+)
+CITACAO_RE = re.compile(r'^[“"‘\']')
+TABELA_RE = re.compile(r"\t|\|")
+
+
+@dataclass
+class ResultadoDeterministico:
+    """Estrutura produzida localmente e a confiança de que reproduz a saída do LLM."""
+
+    estrutura: Dict
+    confianca: float
+    motivos: List[str] = field(default_factory=list)
+
+
+def _casar_dispositivo(linha: str) -> Optional[Tuple[str, str]]:
+    for padrao in PADROES_DISPOSITIVO:
+        match = padrao.match(linha)
+        if match:
+            return match.group("rotulo").strip(), match.group("texto").strip()
+    return None
+
+
+def _titulo_anexo(linha: str) -> bool:
+    return bool(ANEXO_RE.match(linha)) and (linha.isupper() or bool(ANEXO_ISOLADO_RE.match(linha)))
+
+
+def _numero_artigo(rotulo: str) -> Optional[int]:
+    match = re.search(r"\d+", rotulo)
+    if not match or "-" in rotulo:
+        return None
+    return int(match.group(0))
+
+
+def parsear(texto_bruto: str, registro: Dict, *, max_chars: int = MAX_CHARS_PADRAO) -> ResultadoDeterministico:
+    """Gera dispositivos/anexos no mesmo formato da saída do LLM e estima a confiança do resultado."""
+    motivos: List[str] = []
+    vazio = {"fonte": {}, "dispositivos": [], "anexos": [], "relacoes": []}
+
+    if len(texto_bruto) > max_chars:
+        return ResultadoDeterministico(vazio, 0.0, [f"texto com {len(texto_bruto)} caracteres (> {max_chars})"])
+    if ALTERACAO_RE.search(texto_bruto):
+        return ResultadoDeterministico(vazio, 0.0, ["ato altera outros textos normativos"])
+
+    linhas = [linha.strip() for linha in texto_bruto.splitlines()]
+    linhas = [linha for linha in linhas if linha]
+
+    raiz: List[Dict] = []
+    pilha: List[Tuple[int, Dict]] = []
+    anexos: List[Dict] = []
+    cabecalho: List[str] = []
+    anexo_atual: Optional[Dict] = None
+    topo_pendente: Optional[Dict] = None
+    encerrado = False
+    linhas_continuacao = 0
+    linhas_dispositivo = 0
+    linhas_descartadas = 0
+    numeros_artigo: List[int] = []
+
+    for linha in linhas:
+        if _titulo_anexo(linha):
+            anexo_atual = {"titulo": linha, "texto": ""}
+            anexos.append(anexo_atual)
+            continue
+        if anexo_atual is not None and pilha and numeros_artigo:
+            # O próximo artigo da sequência depois do "anexo": era linha do corpo, não título.
+            artigo = ARTIGO_RE.match(linha)
+            if artigo and _numero_artigo(artigo.group("rotulo")) == numeros_artigo[-1] + 1:
+                anexos.remove(anexo_atual)
+                atual = pilha[-1][1]
+                for continuacao in filter(None, [anexo_atual["titulo"], *anexo_atual["texto"].split("\n")]):
+                    atual["texto"] = f"{atual['texto']}\n{continuacao}" if atual["texto"] else continuacao
+                    linhas_continuacao += 1
+                motivos.append(f"anexo seguido de artigo: {anexo_atual['titulo'][:60]!r}")
+                anexo_atual = None
+        if anexo_atual is not None:
+            anexo_atual["texto"] = f"{anexo_atual['texto']}\n{linha}" if anexo_atual["texto"] else linha
+            continue
+        if encerrado:
+            linhas_descartadas += 1
+            continue
+        if pilha and FECHO_RE.match(linha):
+            encerrado = True
+            continue
+
+        casado = _casar_dispositivo(linha)
+        if casado is not None and not pilha:
+            # O corpo só começa em um artigo ou agrupador; antes disso é cabeçalho/preâmbulo.
+            tipo_inicial, _ = _classificar_dispositivo(casado[0])
+            if RANK_TIPO.get(tipo_inicial, RANK_TIPO["item"]) > RANK_TIPO["artigo"]:
+                casado = None
+        if casado is None:
+            if not pilha:
+                cabecalho.append(linha)
+                continue
+            if topo_pendente is not None and not topo_pendente["texto"]:
+                # Em títulos/capítulos o nome costuma vir na linha seguinte ao rótulo.
+                topo_pendente["texto"] = linha
+                topo_pendente = None
+                continue
+            if CITACAO_RE.match(linha) or TABELA_RE.search(linha):
+                motivos.append(f"linha fora do padrão: {linha[:60]!r}")
+            atual = pilha[-1][1]
+            atual["texto"] = f"{atual['texto']}\n{linha}" if atual["texto"] else linha
+            linhas_continuacao += 1
+            continue
+
+        rotulo, texto = casado
+        tipo, _ = _classificar_dispositivo(rotulo)
+        rank = RANK_TIPO.get(tipo)
+        if rank is None:
+            motivos.append(f"rótulo não classificado: {rotulo!r}")
+            rank = RANK_TIPO["item"]
+        if tipo == "artigo":
+            numero = _numero_artigo(rotulo)
+            if numero is not None:
+                numeros_artigo.append(numero)
+
+        no: Dict = {"rotulo": rotulo, "texto": texto, "filhos": []}
+        while pilha and pilha[-1][0] >= rank:
+            pilha.pop()
+        if pilha:
+            pilha[-1][1]["filhos"].append(no)
+        else:
+            if rank > RANK_TIPO["artigo"]:
+                motivos.append(f"{rotulo!r} sem artigo que o contenha")
+            raiz.append(no)
+        pilha.append((rank, no))
+        topo_pendente = no if rank < RANK_TIPO["artigo"] else None
+        linhas_dispositivo += 1
+
+    fonte: Dict = {}
+    if cabecalho:
+        if not registro.get("titulo"):
+            fonte["titulo"] = cabecalho[0]
+        ementa = [linha for linha in cabecalho[1:] if not PREAMBULO_FIM_RE.search(linha)]
+        if ementa and not registro.get("ementa"):
+            fonte["ementa"] = ementa[0]
+    estrutura = {"fonte": fonte, "dispositivos": raiz, "anexos": anexos, "relacoes": []}
+
+    if not numeros_artigo:
+        return ResultadoDeterministico(estrutura, 0.0, motivos + ["nenhum artigo identificado"])
+    confianca = 1.0 - 0.15 * len(motivos)
+    esperado = list(range(1, len(numeros_artigo) + 1))
+    if numeros_artigo != esperado:
+        motivos.append(f"numeração de artigos irregular: {numeros_artigo[:10]}")
+        confianca -= 0.5
+    total_corpo = linhas_dispositivo + linhas_continuacao
+    if total_corpo and linhas_continuacao / total_corpo > 0.3:
+        motivos.append(f"{linhas_continuacao} de {total_corpo} linhas sem rótulo de dispositivo")
+        confianca -= 0.3
+    if linhas_descartadas > 8:
+        motivos.append(f"{linhas_descartadas} linhas após o fecho sem anexo identificado")
+        confianca -= 0.2
+
+    return ResultadoDeterministico(estrutura, max(0.0, min(1.0, confianca)), motivos)
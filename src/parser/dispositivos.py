@@ -0,0 +1,176 @@
+"""Classificação de rótulos e atribuição de ids LexML aos dispositivos estruturados."""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+
+def _normalizar_rotulo(rotulo: str) -> str:
+    texto = (rotulo or "").replace("º", "").replace("°", "")
+    if texto.isascii():
+        return texto.strip()
+    texto = unicodedata.normalize("NFKD", texto)
+    # Remove acentos preservando "§", que não tem equivalente ASCII e identifica parágrafos.
+    texto = "".join(ch for ch in texto if ord(ch) < 128 or ch == "§")
+    return texto.strip()
+
+
+ROMAN_NUMERAL_RE = re.compile(r"^(M{0,4}(CM|CD|D?C{0,3})(XC|XL|L?X{0,3})(IX|IV|V?I{0,3}))$", re.IGNORECASE)
+
+# Despacho único, na ordem de precedência das regras: a primeira alternativa que casar define o tipo.
+# Alternativas `*_ext` cobrem a forma por extenso ("Parágrafo 2", "Inciso IV", "Alínea b", "Item 3");
+# as que começam com `.*?` reproduzem buscas em qualquer posição do rótulo.
+DISPOSITIVO_RE = re.compile(
+    r"(?:"
+    r"TITULO\s+(?P<titulo>[IVXLCDM]+)"
+    r"|LIVRO\s+(?P<livro>[IVXLCDM]+)"
+    r"|PARTE\s+(?P<parte>[IVXLCDM]+)"
+    r"|CAPITULO\s+(?P<capitulo>UNICO|[IVXLCDM]+)"
+    r"|SECAO\s+(?P<secao>UNICA|[IVXLCDM]+)"
+    r"|SUBSECAO\s+(?P<subsecao>UNICA|[IVXLCDM]+)"
+    r"|.*?ART\.?\s*(?P<artigo>\d+[A-Z]?)"
+    r"|(?P<paragrafo_unico_ext>PARAGRAFO(?=.*UNICO))"
+    r"|(?=PARAGRAFO).*?PARAGRAFO\s+(?P<paragrafo_ext>\d+)"
+    r"|(?=§).*?§\s*(?P<paragrafo>\d+)"
+    r"|(?P<paragrafo_unico>§(?=.*UNICO))"
+    r"|(?=INCISO).*?INCISO\s+(?P<inciso_ext>[IVXLCDM]+)"
+    r"|(?P<inciso>(?=[IVXLCDM])M{0,4}(?:CM|CD|D?C{0,3})(?:XC|XL|L?X{0,3})(?:IX|IV|V?I{0,3}))(?![IVXLCDM])"
+    r"|(?=ALINEA).*?ALINEA\s+(?P<alinea_ext>[A-Z])"
+    r"|(?P<alinea>(?-i:[a-z]))\)"
+    r"|(?=ITEM).*?ITEM\s+(?P<item_ext>\d+)"
+    r"|(?P<item>\d+)\)"
+    r")",
+    re.IGNORECASE | re.DOTALL,
+)
+
+_TIPO_POR_GRUPO = {
+    nome: nome[: -len("_ext")] if nome.endswith("_ext") else nome for nome in DISPOSITIVO_RE.groupindex
+}
+_SEM_VALOR = {"paragrafo_unico"}
+
+# Rótulos se repetem muito ("Art. 1º", "I", "a)", "Parágrafo único"); o limite só protege a memória.
+MAX_ROTULOS_MEMORIZADOS = 8192
+
+
+@lru_cache(maxsize=MAX_ROTULOS_MEMORIZADOS)
+def _classificar_dispositivo(rotulo: str) -> Tuple[str, Optional[str]]:
+    """Tipo LexML e valor (número/letra) do rótulo; `dispositivo_auxiliar` quando não reconhecido."""
+    texto = _normalizar_rotulo(rotulo)
+    if not texto:
+        return "dispositivo_auxiliar", None
+    match = DISPOSITIVO_RE.match(texto)
+    if match is None:
+        return "dispositivo_auxiliar", None
+    grupo = match.lastgroup
+    tipo = _TIPO_POR_GRUPO[grupo]
+    if tipo in _SEM_VALOR:
+        return tipo, None
+    return tipo, match.group(grupo).lower()
+
+
+PREFIXOS = {
+    "titulo": "tit",
+    "livro": "liv",
+    "parte": "par",
+    "capitulo": "cap",
+    "secao": "sec",
+    "subsecao": "subsec",
+    "artigo": "art",
+    "paragrafo": "p",
+    "paragrafo_unico": "pu",
+    "inciso": "inc",
+    "alinea": "ali",
+    "item": "item",
+}
+
+
+def _montar_id_lexml(
+    tipo: str,
+    valor: Optional[str],
+    contador: int,
+    idx: int,
+    parent_id: Optional[str],
+) -> str:
+    if tipo == "artigo":
+        return f"art{valor or contador}"
+    base = parent_id or f"disp{idx}"
+    if tipo == "paragrafo":
+        return f"{base}p{valor or contador}"
+    if tipo == "paragrafo_unico":
+        return f"{base}pu"
+    if tipo == "inciso":
+        return f"{base}inc{(valor or str(contador)).lower()}"
+    if tipo == "alinea":
+        return f"{base}ali{(valor or str(contador)).lower()}"
+    if tipo == "item":
+        return f"{base}item{valor or contador}"
+    if tipo in PREFIXOS:
+        sufixo = (valor or str(contador)).lower()
+        if parent_id is None:
+            return f"{PREFIXOS[tipo]}{sufixo}"
+        return f"{base}{PREFIXOS[tipo]}{sufixo}"
+    return f"{parent_id or 'disp'}_{idx}"
+
+
+def _atribuir_ids_lexml(dispositivos: List[Dict]) -> None:
+    """Preenche `id_lexml` e `tipo` em toda a árvore, nível a nível com pilha explícita.
+
+    Os contadores são por lista de irmãos, então a ordem de visita entre níveis não altera os ids.
+    """
+    pilha: List[Tuple[List[Dict], Optional[str]]] = [(dispositivos, None)]
+    while pilha:
+        nodes, parent_id = pilha.pop()
+        nivel_contadores: Dict[str, int] = {}
+        for idx, node in enumerate(nodes, start=1):
+            tipo, valor = _classificar_dispositivo(node.get("rotulo", ""))
+            nivel_contadores[tipo] = nivel_contadores.get(tipo, 0) + 1
+            current_id = _montar_id_lexml(tipo, valor, nivel_contadores[tipo], idx, parent_id)
+
+            node["id_lexml"] = current_id
+            node["tipo"] = tipo
+
+            filhos = node.get("filhos")
+            if isinstance(filhos, list) and filhos:
+                pilha.append((filhos, current_id))
+
+
+
+_PARTES_CITACAO_RE = re.compile(r"\s*(?:,|;|\be\b|\bdo\b|\bda\b)\s*", re.IGNORECASE)
+# Mais estrito que `DISPOSITIVO_RE`: a parte inteira precisa ser o dispositivo ("Lei" não é inciso L).
+_PARTE_CITACAO_RE = re.compile(
+    r"art(?:igo)?\.?\s*(?P<artigo>\d+(?-i:[A-Z])?)\s*[º°o]?"
+    r"|(?:§|par[áa]grafo)\s*(?P<paragrafo>\d+)\s*[º°o]?"
+    r"|(?P<paragrafo_unico>par[áa]grafo\s+[úu]nico)"
+    r"|(?:inciso\s+)?(?P<inciso>(?-i:[IVXLCDM]+))"
+    r"|(?:al[íi]nea\s+)?[\"“]?(?P<alinea>(?-i:[a-z]))[\"”]?\)?"
+    r"|item\s+(?P<item>\d+)"
+    r"|(?P<caput>caput)",
+    re.IGNORECASE,
+)
+
+
+def id_lexml_de_citacao(citacao: Optional[str]) -> Optional[str]:
+    """`id_lexml` do dispositivo citado ("Art. 2º, § 1º, inciso II" → "art2p1incii"), pelas mesmas regras
+    de `_atribuir_ids_lexml`.
+
+    None se a citação não começa num artigo; a leitura para na primeira parte não reconhecida
+    ("art. 2º da Lei nº ..." → "art2").
+    """
+    id_lexml: Optional[str] = None
+    for parte in _PARTES_CITACAO_RE.split(citacao or ""):
+        if not parte:
+            continue
+        match = _PARTE_CITACAO_RE.fullmatch(parte.strip())
+        if match is None:
+            break
+        tipo = match.lastgroup
+        if tipo == "caput":
+            continue
+        if id_lexml is None and tipo != "artigo":
+            return None
+        valor = match.group(tipo)
+        id_lexml = _montar_id_lexml(tipo, None if tipo in _SEM_VALOR else valor.lower(), 1, 1, id_lexml)
+    return id_lexml
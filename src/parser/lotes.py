@@ -0,0 +1,69 @@
+"""Empacotamento de atos curtos em lotes enviados ao LLM numa única requisição."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from ..utils import llm as llm_utils
+from ..utils import tokens as tokens_utils
+
+METODO = "llm_lote"
+
+# Só atos curtos entram em lote: acima disso o prompt fixo já é amortizado por um ato só.
+MAX_CHARS_ATO_PADRAO = 2000
+# Limite de atos por requisição, para que uma resposta ruim não invalide muitos atos de uma vez.
+MAX_DOCS_PADRAO = 10
+
+
+@dataclass
+class Lote:
+    """Atos (registro, texto bruto) que compartilham uma requisição ao LLM."""
+
+    itens: List[Tuple[Dict, str]] = field(default_factory=list)
+    chars: int = 0
+
+
+def elegivel(texto_bruto: str, *, max_chars_ato: int = MAX_CHARS_ATO_PADRAO) -> bool:
+    return len(texto_bruto) <= max_chars_ato
+
+
+def capacidade_chars(*, model: Optional[str] = None, heuristicas: Optional[str] = None) -> int:
+    """Caracteres de documentos que cabem num lote, pelo mesmo orçamento de tokens dos chunks."""
+    perfil = tokens_utils.obter_perfil(model)
+    prompt_fixo = llm_utils.estimar_tokens_prompt_lote(heuristicas, model=model)
+    return tokens_utils.calcular_max_chars(perfil, tokens_prompt_fixo=prompt_fixo)
+
+
+def empacotar(
+    itens: List[Tuple[Dict, str]],
+    *,
+    model: Optional[str] = None,
+    heuristicas: Optional[str] = None,
+    max_docs: int = MAX_DOCS_PADRAO,
+) -> List[Lote]:
+    """Distribui os atos em lotes (first-fit decrescente) respeitando orçamento e `max_docs`.
+
+    A ordem original é preservada dentro de cada lote; lotes de um único ato também são
+    devolvidos e podem ser enviados pelo caminho individual.
+    """
+    capacidade = capacidade_chars(model=model, heuristicas=heuristicas)
+    custos = [len(texto) + llm_utils.chars_documento_lote(registro) for registro, texto in itens]
+    ordem = sorted(range(len(itens)), key=lambda indice: custos[indice], reverse=True)
+
+    lotes: List[Lote] = []
+    indices_por_lote: List[List[int]] = []
+    for indice in ordem:
+        custo = custos[indice]
+        for posicao, lote in enumerate(lotes):
+            if len(indices_por_lote[posicao]) < max_docs and lote.chars + custo <= capacidade:
+                indices_por_lote[posicao].append(indice)
+                lote.chars += custo
+                break
+        else:
+            lotes.append(Lote(chars=custo))
+            indices_por_lote.append([indice])
+
+    for lote, indices in zip(lotes, indices_por_lote):
+        lote.itens = [itens[indice] for indice in sorted(indices)]
+    return lotes
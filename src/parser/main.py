@@ -1,25 +1,36 @@
-"""CLI para parsing de atos usando exclusivamente o LLM."""
+"""CLI para parsing de atos: parser determinístico para atos simples e LLM para os demais."""
 
 from __future__ import annotations
 
 import argparse
-import hashlib
 import json
 import logging
-import re
-import unicodedata
+import uuid
 from datetime import datetime
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
+from ..utils import artefato
 from ..utils import db as db_utils
 from ..utils import llm as llm_utils
 from ..utils import storage as storage_utils
-from . import chunking
+from ..utils import telemetria
+from ..utils import tokens as tokens_utils
+from . import chunking, deterministico, lotes
+from . import receita as receita_utils
+from .cache_chunks import TIPO_ESTRUTURA, TIPO_LIMITE, CacheChunks
+from .dispositivos import (  # noqa: F401 - reexportados para scripts/depuração
+    PREFIXOS,
+    ROMAN_NUMERAL_RE,
+    _atribuir_ids_lexml,
+    _classificar_dispositivo,
+    _normalizar_rotulo,
+)
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 LLM_HEURISTICS_INFO = (
-    "Parser heurístico desativado por ora. Gere a estrutura LexML completa apenas com o LLM."
+    "Atos simples são estruturados por um parser determinístico antes do LLM; os que chegam até aqui "
+    "tiveram baixa confiança nele (alterações, tabelas, numeração irregular). Gere a estrutura LexML completa."
 )
 
 
@@ -27,6 +38,12 @@ def _now_iso() -> str:
     return datetime.utcnow().isoformat()
 
 
+def _sem_fonte(resultado: Dict) -> Dict:
+    """Resultado sem `fonte`: o cache é indexado pelo texto, e atos com texto idêntico não podem
+    herdar a URN e o título do primeiro (`_normalizar_llm_result` só completa `fonte` com setdefault)."""
+    return {chave: valor for chave, valor in resultado.items() if chave != "fonte"}
+
+
 def _normalizar_llm_result(bruto: Dict, registro: Dict, texto_bruto: str) -> Dict:
     """Garante campos mínimos (fonte, anexos, metadados) na saída do LLM."""
     resultado = dict(bruto)
@@ -91,154 +108,288 @@ def _resumir_dispositivos(dispositivos: List[Dict], *, max_itens: Optional[int]
     return linhas
 
 
-def _normalizar_rotulo(rotulo: str) -> str:
-    texto = (rotulo or "").replace("º", "").replace("°", "")
-    texto = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
-    return texto.strip()
-
+def _estruturar_com_llm(
+    texto: str,
+    registro: Dict,
+    args: argparse.Namespace,
+    cache: Optional[CacheChunks] = None,
+) -> Dict:
+    """Divide o texto em chunks, envia cada um ao LLM e combina as respostas (sem normalizar).
+
+    Chunks já estruturados (mesmo texto, modelo e versão do prompt) vêm do `cache`. Se um chunk
+    falhar, os seguintes ainda são processados e memorizados antes de a falha ser propagada.
+    """
+    urn = registro["urn_lexml"]
+    logging.info("Preparando chunking para %s.", urn)
+    try:
+        chunks = chunking.gerar_chunks(
+            texto,
+            registro,
+            aux_model=args.llm_model,
+            model=args.llm_model,
+            heuristicas=LLM_HEURISTICS_INFO,
+            cache=cache,
+        )
+    except Exception:  # noqa: BLE001
+        logging.exception("Falha ao planejar chunking para %s.", urn)
+        raise
+
+    chunk_total = len(chunks)
+    chunk_resultados: List[Dict] = []
+    primeira_falha: Optional[Exception] = None
+    logging.info("URN %s – processará %s chunk%s.", urn, chunk_total, "" if chunk_total == 1 else "s")
+    if cache is not None:
+        cache.carregar(TIPO_ESTRUTURA, [chunk.texto for chunk in chunks])
+
+    for chunk in chunks:
+        chunk_info = chunking.montar_chunk_info(chunk, chunk_total)
+        memorizado = cache.obter(TIPO_ESTRUTURA, chunk.texto) if cache is not None else None
+        if memorizado is not None:
+            logging.info("URN %s – chunk %s/%s reaproveitado do cache.", urn, chunk.indice + 1, chunk_total)
+            chunk_resultados.append(_sem_fonte(memorizado))
+            continue
+        logging.info(
+            "URN %s – enviando chunk %s/%s ao LLM (tamanho %s caracteres).",
+            urn,
+            chunk.indice + 1,
+            chunk_total,
+            len(chunk.texto),
+        )
+        try:
+            bruto_llm = llm_utils.gerar_estrutura_llm(
+                chunk.texto,
+                registro,
+                heuristicas=LLM_HEURISTICS_INFO,
+                model=args.llm_model,
+                chunk_info=chunk_info,
+                structured_output=args.structured_output or None,
+            )
+        except llm_utils.LLMNotConfigured:
+            raise
+        except Exception as exc:  # noqa: BLE001
+            logging.exception(
+                "Falha ao executar o LLM para %s (chunk %s/%s).",
+                urn,
+                chunk.indice + 1,
+                chunk_total,
+            )
+            if cache is None:
+                raise
+            primeira_falha = primeira_falha or exc
+            continue
+        if cache is not None:
+            cache.gravar(TIPO_ESTRUTURA, chunk.texto, _sem_fonte(bruto_llm))
+        chunk_resultados.append(bruto_llm)
 
-ROMAN_NUMERAL_RE = re.compile(r"^(M{0,4}(CM|CD|D?C{0,3})(XC|XL|L?X{0,3})(IX|IV|V?I{0,3}))$", re.IGNORECASE)
+    if primeira_falha is not None:
+        raise primeira_falha
+    return chunking.combinar_resultados(chunk_resultados)
 
 
-def _classificar_dispositivo(rotulo: str) -> Tuple[str, Optional[str]]:
-    texto = _normalizar_rotulo(rotulo)
-    upper = texto.upper()
+def _marcar_falha(origem_id: str, urn: str, args: argparse.Namespace) -> None:
+    if args.reprocessar:
+        logging.warning("URN %s – reprocessamento falhou; o JSON anterior foi mantido.", urn)
+        return
+    if not args.dry_run:
+        db_utils.atualizar_parsing_falha(origem_id, urn, timestamp_iso=_now_iso())
+
+
+def _finalizar(
+    origem_id: str,
+    registro: Dict,
+    texto: str,
+    bruto: Dict,
+    parser_info: Dict,
+    args: argparse.Namespace,
+    receitas: Dict[str, receita_utils.Receita],
+) -> bool:
+    """Normaliza, exibe (dry-run) ou salva o JSON estruturado. Retorna True se o ato foi processado."""
+    urn = registro["urn_lexml"]
+    receita = receita_utils.receita_para(parser_info["metodo"], receitas)
+    receita_detalhes = receita.detalhes(parser_info["metodo"])
+    hash_texto = receita_utils.hash_texto(texto)
+    resultado_llm = _normalizar_llm_result(bruto, registro, texto)
+    resultado_llm["parser"] = {**parser_info, "receita": receita_detalhes, "hash_texto_bruto": hash_texto}
+    logging.info(
+        "URN %s – %s retornou %s dispositivos e %s anexos.",
+        urn,
+        "Parser determinístico" if parser_info["metodo"] == deterministico.METODO else "LLM",
+        len(resultado_llm.get("dispositivos", [])),
+        len(resultado_llm.get("anexos", [])),
+    )
 
-    if not texto:
-        return "dispositivo_auxiliar", None
+    if args.dry_run:
+        print(f"\n=== Texto bruto ({urn}) ===\n{texto}\n")
+        print(f"--- Dispositivos {parser_info['metodo']} ({urn}) ---")
+        for linha in _resumir_dispositivos(resultado_llm.get("dispositivos", []), max_itens=None):
+            print(linha)
+        print("--- fim ---\n")
+        return True
+
+    compacto = args.formato_json == "compacto"
+    if compacto:
+        artefato.compactar(resultado_llm, texto, offsets=args.offsets_texto)
+    conteudo = artefato.serializar(resultado_llm, compacto=compacto)
+    hash_json = artefato.hash_conteudo(conteudo)
+
+    try:
+        caminho_json = storage_utils.upload_parser_json(urn, conteudo)
+        db_utils.atualizar_parsing_sucesso(
+            origem_id,
+            urn,
+            caminho=caminho_json,
+            hash_json=hash_json,
+            timestamp_iso=_now_iso(),
+            hash_texto_bruto=hash_texto,
+            receita=receita.chave,
+            receita_detalhes=receita_detalhes,
+        )
+        return True
+    except Exception as exc:  # noqa: BLE001
+        logging.exception("Falha ao salvar JSON estruturado de %s: %s", urn, exc)
+        db_utils.atualizar_parsing_falha(origem_id, urn, timestamp_iso=_now_iso())
+        return False
+
+
+def _processar_lotes(
+    origem_id: str,
+    pendentes: List[Tuple[Dict, str]],
+    args: argparse.Namespace,
+    receitas: Dict[str, receita_utils.Receita],
+    cache: Optional[CacheChunks] = None,
+) -> int:
+    """Envia atos curtos em lotes; os que faltarem na resposta voltam ao caminho individual."""
+    processados = 0
+    if cache is not None:
+        cache.carregar(TIPO_ESTRUTURA, [texto for _, texto in pendentes])
+        restantes: List[Tuple[Dict, str]] = []
+        for registro, texto in pendentes:
+            memorizado = cache.obter(TIPO_ESTRUTURA, texto)
+            if memorizado is None:
+                restantes.append((registro, texto))
+                continue
+            logging.info("URN %s – estrutura reaproveitada do cache.", registro["urn_lexml"])
+            if _finalizar(origem_id, registro, texto, _sem_fonte(memorizado), {"metodo": "llm"}, args, receitas):
+                processados += 1
+        pendentes = restantes
+        if not pendentes:
+            return processados
+
+    grupos = lotes.empacotar(
+        pendentes,
+        model=args.llm_model,
+        heuristicas=LLM_HEURISTICS_INFO,
+        max_docs=args.batch_max_docs,
+    )
+    logging.info("%s ato(s) curto(s) agrupados em %s lote(s).", len(pendentes), len(grupos))
 
-    padrao_valor = None
+    concluidos: Set[str] = set()
+    try:
+        for numero, lote in enumerate(grupos, start=1):
+            resultados: Dict[str, Dict] = {}
+            if len(lote.itens) > 1:
+                logging.info(
+                    "Enviando lote %s/%s ao LLM (%s atos, %s caracteres).",
+                    numero,
+                    len(grupos),
+                    len(lote.itens),
+                    lote.chars,
+                )
+                try:
+                    resultados = llm_utils.gerar_estrutura_lote(
+                        lote.itens,
+                        heuristicas=LLM_HEURISTICS_INFO,
+                        model=args.llm_model,
+                    )
+                except llm_utils.LLMNotConfigured:
+                    raise
+                except Exception:  # noqa: BLE001
+                    logging.exception("Falha ao executar o LLM para o lote %s/%s.", numero, len(grupos))
+                if len(resultados) < len(lote.itens):
+                    logging.warning(
+                        "Lote %s/%s: %s de %s atos sem resposta válida; reprocessando individualmente.",
+                        numero,
+                        len(grupos),
+                        len(lote.itens) - len(resultados),
+                        len(lote.itens),
+                    )
 
-    mapa_topo = (
-        ("titulo", re.compile(r"^TITULO\s+([IVXLCDM]+)", re.IGNORECASE)),
-        ("livro", re.compile(r"^LIVRO\s+([IVXLCDM]+)", re.IGNORECASE)),
-        ("parte", re.compile(r"^PARTE\s+([IVXLCDM]+)", re.IGNORECASE)),
-        ("capitulo", re.compile(r"^CAPITULO\s+(UNICO|[IVXLCDM]+)", re.IGNORECASE)),
-        ("secao", re.compile(r"^SECAO\s+(UNICA|[IVXLCDM]+)", re.IGNORECASE)),
-        ("subsecao", re.compile(r"^SUBSECAO\s+(UNICA|[IVXLCDM]+)", re.IGNORECASE)),
+            for registro, texto in lote.itens:
+                urn = registro["urn_lexml"]
+                bruto = resultados.get(urn)
+                parser_info: Dict = {"metodo": lotes.METODO, "atos_no_lote": len(lote.itens)}
+                if bruto is not None and cache is not None:
+                    cache.gravar(TIPO_ESTRUTURA, texto, _sem_fonte(bruto))
+                if bruto is None:
+                    parser_info = {"metodo": "llm"}
+                    try:
+                        bruto = _estruturar_com_llm(texto, registro, args, cache)
+                    except llm_utils.LLMNotConfigured:
+                        raise
+                    except Exception:  # noqa: BLE001
+                        _marcar_falha(origem_id, urn, args)
+                        concluidos.add(urn)
+                        continue
+                if _finalizar(origem_id, registro, texto, bruto, parser_info, args, receitas):
+                    processados += 1
+                concluidos.add(urn)
+    except llm_utils.LLMNotConfigured:
+        # Como no caminho individual: o que ficou sem estrutura é marcado como falha antes de interromper.
+        for registro, _ in pendentes:
+            if registro["urn_lexml"] not in concluidos:
+                _marcar_falha(origem_id, registro["urn_lexml"], args)
+        raise
+    return processados
+
+
+def _selecionar_reprocessamento(
+    origem_id: str,
+    urns: Optional[List[str]],
+    args: argparse.Namespace,
+    receitas: Dict[str, receita_utils.Receita],
+) -> List[Dict]:
+    """Atos estruturados cujo texto bruto ou receita mudou desde o último parsing."""
+    candidatos = db_utils.fetch_para_reparsing(origem_id, urns=urns, year=args.year)
+    selecionados: List[Dict] = []
+    motivos: Dict[str, int] = {}
+    for registro in candidatos:
+        motivo = receita_utils.motivo_reprocessamento(
+            registro,
+            receitas,
+            incluir_sem_receita=args.reprocessar_sem_receita,
+        )
+        if motivo is None:
+            continue
+        logging.debug("URN %s – reprocessar: %s.", registro["urn_lexml"], motivo)
+        motivos[motivo] = motivos.get(motivo, 0) + 1
+        selecionados.append(registro)
+    if args.limit and not urns:
+        selecionados = selecionados[: args.limit]
+    logging.info(
+        "Reprocessamento na origem %s: %s de %s ato(s) estruturado(s) mudaram (%s).",
+        origem_id,
+        len(selecionados),
+        len(candidatos),
+        ", ".join(f"{motivo}: {total}" for motivo, total in sorted(motivos.items())) or "nenhuma mudança",
     )
-    for tipo, padrao in mapa_topo:
-        match = padrao.match(texto)
-        if match:
-            valor = match.group(1).lower()
-            valor = valor.replace("º", "").replace("°", "")
-            valor = valor.replace("unica", "unica")
-            return tipo, valor
-
-    artigo = re.search(r"ART\.?\s*(\d+[A-Z]?)", upper)
-    if artigo:
-        valor = artigo.group(1).lower().replace("º", "")
-        return "artigo", valor
-
-    if upper.startswith("PARAGRAFO"):
-        if "UNICO" in upper:
-            return "paragrafo_unico", None
-        match = re.search(r"PARAGRAFO\s+(\d+)", upper)
-        if match:
-            return "paragrafo", match.group(1)
-
-    if texto.startswith("§"):
-        match = re.search(r"§\s*(\d+)", texto)
-        if match:
-            return "paragrafo", match.group(1)
-        if "UNICO" in upper:
-            return "paragrafo_unico", None
-
-    if upper.startswith("INCISO"):
-        match = re.search(r"INCISO\s+([IVXLCDM]+)", upper)
-        if match:
-            return "inciso", match.group(1).lower()
-
-    inciso_romano = re.match(r"^([IVXLCDM]+)", upper)
-    if inciso_romano and ROMAN_NUMERAL_RE.match(inciso_romano.group(1)):
-        return "inciso", inciso_romano.group(1).lower()
-
-    if upper.startswith("ALINEA"):
-        match = re.search(r"ALINEA\s+([A-Z])", upper)
-        if match:
-            return "alinea", match.group(1).lower()
-
-    alinea_letra = re.match(r"^([a-z])\)", texto)
-    if alinea_letra:
-        return "alinea", alinea_letra.group(1).lower()
-
-    if upper.startswith("ITEM"):
-        match = re.search(r"ITEM\s+(\d+)", upper)
-        if match:
-            return "item", match.group(1)
-
-    item_numerico = re.match(r"^(\d+)\)", texto)
-    if item_numerico:
-        return "item", item_numerico.group(1)
-
-    return "dispositivo_auxiliar", None
-
-
-PREFIXOS = {
-    "titulo": "tit",
-    "livro": "liv",
-    "parte": "par",
-    "capitulo": "cap",
-    "secao": "sec",
-    "subsecao": "subsec",
-    "artigo": "art",
-    "paragrafo": "p",
-    "paragrafo_unico": "pu",
-    "inciso": "inc",
-    "alinea": "ali",
-    "item": "item",
-}
-
-
-def _atribuir_ids_lexml(dispositivos: List[Dict]) -> None:
-    def rec(nodes: List[Dict], parent_id: Optional[str] = None) -> None:
-        nivel_contadores: Dict[str, int] = {}
-        for idx, node in enumerate(nodes, start=1):
-            rotulo = node.get("rotulo", "")
-            tipo, valor = _classificar_dispositivo(rotulo)
-            nivel_contadores[tipo] = nivel_contadores.get(tipo, 0) + 1
-
-            if tipo == "artigo":
-                sufixo = valor or str(nivel_contadores[tipo])
-                current_id = f"art{sufixo}"
-            elif tipo == "paragrafo":
-                sufixo = valor or str(nivel_contadores[tipo])
-                base = parent_id or f"disp{idx}"
-                current_id = f"{base}p{sufixo}"
-            elif tipo == "paragrafo_unico":
-                base = parent_id or f"disp{idx}"
-                current_id = f"{base}pu"
-            elif tipo == "inciso":
-                sufixo = (valor or str(nivel_contadores[tipo])).lower()
-                base = parent_id or f"disp{idx}"
-                current_id = f"{base}inc{sufixo}"
-            elif tipo == "alinea":
-                sufixo = (valor or str(nivel_contadores[tipo])).lower()
-                base = parent_id or f"disp{idx}"
-                current_id = f"{base}ali{sufixo}"
-            elif tipo == "item":
-                sufixo = valor or str(nivel_contadores[tipo])
-                base = parent_id or f"disp{idx}"
-                current_id = f"{base}item{sufixo}"
-            elif tipo in PREFIXOS and parent_id is None:
-                sufixo = (valor or str(nivel_contadores[tipo])).lower()
-                current_id = f"{PREFIXOS[tipo]}{sufixo}"
-            elif tipo in PREFIXOS:
-                sufixo = (valor or str(nivel_contadores[tipo])).lower()
-                base = parent_id or f"disp{idx}"
-                current_id = f"{base}{PREFIXOS[tipo]}{sufixo}"
-            else:
-                base = parent_id or "disp"
-                current_id = f"{base}_{idx}"
-
-            node["id_lexml"] = current_id
-            node["tipo"] = tipo
+    return selecionados
 
-            filhos = node.get("filhos")
-            if isinstance(filhos, list) and filhos:
-                rec(filhos, current_id)
 
-    rec(dispositivos)
+def _registrar_telemetria(execucao_id: str, origem_id: str, args: argparse.Namespace) -> None:
+    """Resume as chamadas ao LLM da origem no log e grava os agregados por URN/chunk."""
+    chamadas = telemetria.consumir()
+    if not chamadas:
+        return
+    resumo = telemetria.formatar_resumo(telemetria.resumir(chamadas))
+    logging.info("Telemetria do LLM (origem %s):\n%s", origem_id, resumo)
+    if args.dry_run:
+        return
+    try:
+        db_utils.registrar_telemetria_llm(
+            telemetria.agregar(chamadas, execucao_id=execucao_id, fonte_origem_id=origem_id)
+        )
+    except Exception as exc:  # noqa: BLE001
+        logging.warning("Não foi possível gravar a telemetria do LLM: %s", exc)
 
 
 def main(argv: Optional[Iterable[str]] = None) -> None:
@@ -253,9 +404,78 @@ def main(argv: Optional[Iterable[str]] = None) -> None:
     parser.add_argument("--year", type=int, help="Ano (YYYY) para filtrar `data_legislacao`.")
     parser.add_argument("--dry-run", action="store_true", help="Executa sem salvar JSON nem atualizar o banco.")
     parser.add_argument("--llm-model", help="Modelo Gemini a ser utilizado (opcional).")
+    parser.add_argument(
+        "--structured-output",
+        action="store_true",
+        help="Solicita JSON restrito ao esquema do parser (fallback automático para extração por regex).",
+    )
+    parser.add_argument(
+        "--no-fast-path",
+        action="store_true",
+        help="Envia todos os atos ao LLM, sem tentar antes o parser determinístico.",
+    )
+    parser.add_argument(
+        "--fast-path-min-confidence",
+        type=float,
+        default=deterministico.CONFIANCA_MINIMA_PADRAO,
+        help="Confiança mínima (0–1) para aceitar o parser determinístico sem chamar o LLM.",
+    )
+    parser.add_argument(
+        "--reprocessar",
+        action="store_true",
+        help="Reprocessa atos já estruturados cujo texto bruto ou receita (prompt, modelo, regras) mudou.",
+    )
+    parser.add_argument(
+        "--reprocessar-sem-receita",
+        action="store_true",
+        help="Com --reprocessar, inclui atos estruturados antes do registro de receitas.",
+    )
+    parser.add_argument(
+        "--sem-cache-chunks",
+        action="store_true",
+        help="Não reaproveita nem grava resultados do LLM por chunk (tabela parser_chunk_cache).",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Agrupa atos curtos que precisam do LLM em uma única requisição por lote.",
+    )
+    parser.add_argument(
+        "--batch-max-chars",
+        type=int,
+        default=lotes.MAX_CHARS_ATO_PADRAO,
+        help="Tamanho máximo (caracteres) de um ato para entrar em lote.",
+    )
+    parser.add_argument(
+        "--batch-max-docs",
+        type=int,
+        default=lotes.MAX_DOCS_PADRAO,
+        help="Quantidade máxima de atos por lote.",
+    )
+    parser.add_argument(
+        "--formato-json",
+        choices=("compacto", "legado"),
+        default="compacto",
+        help="Formato do JSON salvo: compacto (sem indentação, texto bruto só por hash) ou legado.",
+    )
+    parser.add_argument(
+        "--offsets-texto",
+        action="store_true",
+        help="No formato compacto, grava o texto dos dispositivos como offsets no texto bruto quando possível.",
+    )
 
     args = parser.parse_args(argv)
 
+    execucao_id = str(uuid.uuid4())
+    receitas = receita_utils.receitas_atuais(model=args.llm_model, heuristicas=LLM_HEURISTICS_INFO)
+    cache: Optional[CacheChunks] = None
+    if not args.sem_cache_chunks:
+        modelo = llm_utils.resolver_modelo(args.llm_model)
+        cache = CacheChunks(
+            versoes={TIPO_ESTRUTURA: receitas["llm"].versao, TIPO_LIMITE: llm_utils.VERSAO_PROMPT_LIMITE},
+            modelos={TIPO_ESTRUTURA: modelo, TIPO_LIMITE: modelo},
+            gravar=not args.dry_run,
+        )
     origens = db_utils.fetch_origens(args.origin_id)
     if not origens:
         logging.warning("Nenhuma origem ativa encontrada para os critérios fornecidos.")
@@ -264,12 +484,15 @@ def main(argv: Optional[Iterable[str]] = None) -> None:
     for origem in origens:
         origem_id = str(origem["id"])
         urns_filtradas = list(dict.fromkeys(args.urn)) if args.urn else None
-        registros = db_utils.fetch_para_parsing(
-            origem_id,
-            args.limit,
-            urns=urns_filtradas,
-            year=args.year,
-        )
+        if args.reprocessar:
+            registros = _selecionar_reprocessamento(origem_id, urns_filtradas, args, receitas)
+        else:
+            registros = db_utils.fetch_para_parsing(
+                origem_id,
+                args.limit,
+                urns=urns_filtradas,
+                year=args.year,
+            )
         if not registros:
             if urns_filtradas:
                 logging.info(
@@ -297,118 +520,71 @@ def main(argv: Optional[Iterable[str]] = None) -> None:
             )
 
         processados = 0
+        pendentes_lote: List[Tuple[Dict, str]] = []
         for registro in registros:
             urn = registro["urn_lexml"]
             caminho_texto = registro.get("caminho_texto_bruto")
             if not caminho_texto:
                 logging.warning("Registro %s sem caminho de texto bruto. Marcando como falha.", urn)
-                if not args.dry_run:
-                    db_utils.atualizar_parsing_falha(origem_id, urn, timestamp_iso=_now_iso())
+                _marcar_falha(origem_id, urn, args)
                 continue
 
             try:
                 texto = storage_utils.download_text(caminho_texto)
             except Exception as exc:  # noqa: BLE001
                 logging.exception("Falha ao baixar texto bruto de %s: %s", urn, exc)
-                if not args.dry_run:
-                    db_utils.atualizar_parsing_falha(origem_id, urn, timestamp_iso=_now_iso())
-                continue
-
-            logging.info("Preparando chunking para %s.", urn)
-            try:
-                chunks = chunking.gerar_chunks(
-                    texto,
-                    registro,
-                    aux_model=args.llm_model,
-                )
-            except Exception as exc:  # noqa: BLE001
-                logging.exception("Falha ao planejar chunking para %s.", urn)
-                if not args.dry_run:
-                    db_utils.atualizar_parsing_falha(origem_id, urn, timestamp_iso=_now_iso())
+                _marcar_falha(origem_id, urn, args)
                 continue
 
-            chunk_total = len(chunks)
-            chunk_resultados: List[Dict] = []
-            falha_chunk = False
-
-            logging.info("URN %s – processará %s chunk%s.", urn, chunk_total, "" if chunk_total == 1 else "s")
-
-            for chunk in chunks:
-                chunk_info = chunking.montar_chunk_info(chunk, chunk_total)
-                logging.info(
-                    "URN %s – enviando chunk %s/%s ao LLM (tamanho %s caracteres).",
-                    urn,
-                    chunk.indice + 1,
-                    chunk_total,
-                    len(chunk.texto),
-                )
-                try:
-                    bruto_llm = llm_utils.gerar_estrutura_llm(
-                        chunk.texto,
-                        registro,
-                        heuristicas=LLM_HEURISTICS_INFO,
-                        model=args.llm_model,
-                        chunk_info=chunk_info,
+            bruto: Optional[Dict] = None
+            parser_info: Dict = {"metodo": "llm"}
+            if not args.no_fast_path:
+                rapido = deterministico.parsear(texto, registro)
+                if rapido.confianca >= args.fast_path_min_confidence:
+                    bruto = rapido.estrutura
+                    parser_info = {"metodo": deterministico.METODO, "confianca": round(rapido.confianca, 3)}
+                    logging.info(
+                        "URN %s – parser determinístico aceito (confiança %.2f); LLM dispensado.",
+                        urn,
+                        rapido.confianca,
                     )
-                except llm_utils.LLMNotConfigured as exc:
-                    logging.error("LLM não configurado (%s). Interrompendo execução.", exc)
-                    if not args.dry_run:
-                        db_utils.atualizar_parsing_falha(origem_id, urn, timestamp_iso=_now_iso())
-                    return
-                except Exception as exc:  # noqa: BLE001
-                    logging.exception(
-                        "Falha ao executar o LLM para %s (chunk %s/%s).",
+                else:
+                    logging.info(
+                        "URN %s – parser determinístico com confiança %.2f (%s); usando LLM.",
                         urn,
-                        chunk.indice + 1,
-                        chunk_total,
+                        rapido.confianca,
+                        "; ".join(rapido.motivos[:3]) or "sem motivo registrado",
                     )
-                    if not args.dry_run:
-                        db_utils.atualizar_parsing_falha(origem_id, urn, timestamp_iso=_now_iso())
-                    falha_chunk = True
-                    break
-
-                chunk_resultados.append(bruto_llm)
 
-            if falha_chunk:
+            if bruto is None and args.batch and lotes.elegivel(texto, max_chars_ato=args.batch_max_chars):
+                pendentes_lote.append((registro, texto))
                 continue
 
-            bruto_combined = chunking.combinar_resultados(chunk_resultados)
-            resultado_llm = _normalizar_llm_result(bruto_combined, registro, texto)
-            logging.info(
-                "URN %s – LLM retornou %s dispositivos e %s anexos (%s chunk%s).",
-                urn,
-                len(resultado_llm.get("dispositivos", [])),
-                len(resultado_llm.get("anexos", [])),
-                chunk_total,
-                "" if chunk_total == 1 else "s",
-            )
+            if bruto is None:
+                try:
+                    bruto = _estruturar_com_llm(texto, registro, args, cache)
+                except llm_utils.LLMNotConfigured as exc:
+                    logging.error("LLM não configurado (%s). Interrompendo execução.", exc)
+                    _marcar_falha(origem_id, urn, args)
+                    return
+                except Exception:  # noqa: BLE001
+                    _marcar_falha(origem_id, urn, args)
+                    continue
 
-            if args.dry_run:
-                print(f"\n=== Texto bruto ({urn}) ===\n{texto}\n")
-                print(f"--- Dispositivos LLM ({urn}) ---")
-                for linha in _resumir_dispositivos(resultado_llm.get("dispositivos", []), max_itens=None):
-                    print(linha)
-                print("--- fim ---\n")
+            if _finalizar(origem_id, registro, texto, bruto, parser_info, args, receitas):
                 processados += 1
-                continue
-
-            json_str = json.dumps(resultado_llm, ensure_ascii=False, indent=2)
-            hash_json = hashlib.sha256(json_str.encode("utf-8")).hexdigest()
 
+        if pendentes_lote:
             try:
-                caminho_json = storage_utils.upload_parser_json(urn, json_str)
-                db_utils.atualizar_parsing_sucesso(
-                    origem_id,
-                    urn,
-                    caminho=caminho_json,
-                    hash_json=hash_json,
-                    timestamp_iso=_now_iso(),
-                )
-                processados += 1
-            except Exception as exc:  # noqa: BLE001
-                logging.exception("Falha ao salvar JSON estruturado de %s: %s", urn, exc)
-                db_utils.atualizar_parsing_falha(origem_id, urn, timestamp_iso=_now_iso())
-
+                processados += _processar_lotes(origem_id, pendentes_lote, args, receitas, cache)
+            except llm_utils.LLMNotConfigured as exc:
+                logging.error("LLM não configurado (%s). Interrompendo execução.", exc)
+                return
+
+        tokens_utils.salvar_calibracao()
+        _registrar_telemetria(execucao_id, origem_id, args)
+        if cache is not None and (cache.acertos or cache.faltas):
+            logging.info("Cache de chunks (acumulado): %s acerto(s), %s falta(s).", cache.acertos, cache.faltas)
         logging.info(
             "Parsing concluído para origem %s: %s itens %sprocessados.",
             origem_id,
@@ -0,0 +1,86 @@
+"""Receita de parsing (texto, método, prompt e modelo) registrada junto de cada JSON estruturado.
+
+Com ela o modo `--reprocessar` do parser seleciona apenas os atos cujo texto bruto ou receita
+mudou desde o último parsing bem-sucedido.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+
+from ..utils import llm as llm_utils
+from . import deterministico
+
+# Métodos que compartilham a mesma receita (o lote usa as mesmas instruções do prompt individual).
+FAMILIA_METODO = {
+    "llm": "llm",
+    "llm_lote": "llm",
+    deterministico.METODO: deterministico.METODO,
+}
+
+
+@dataclass(frozen=True)
+class Receita:
+    familia: str
+    versao: str
+    modelo: Optional[str] = None
+
+    @property
+    def chave(self) -> str:
+        conteudo = json.dumps(asdict(self), sort_keys=True)
+        return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()[:16]
+
+    def detalhes(self, metodo: str) -> Dict:
+        return {**asdict(self), "metodo": metodo}
+
+
+def hash_texto(texto: str) -> str:
+    """Mesmo hash gravado pelo crawler em `fonte_documento.hash_texto_bruto`."""
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def receitas_atuais(*, model: Optional[str], heuristicas: Optional[str]) -> Dict[str, Receita]:
+    """Receita vigente por família de método para a configuração desta execução."""
+    return {
+        "llm": Receita("llm", llm_utils.versao_prompt(heuristicas), llm_utils.resolver_modelo(model)),
+        deterministico.METODO: Receita(deterministico.METODO, deterministico.VERSAO),
+    }
+
+
+def receita_para(metodo: str, atuais: Dict[str, Receita]) -> Receita:
+    return atuais[FAMILIA_METODO.get(metodo, "llm")]
+
+
+def motivo_reprocessamento(
+    registro: Dict,
+    atuais: Dict[str, Receita],
+    *,
+    incluir_sem_receita: bool = False,
+) -> Optional[str]:
+    """Por que o ato precisa de novo parsing, ou None se o JSON atual ainda corresponde ao texto e à receita."""
+    hash_parser = registro.get("parser_hash_texto_bruto")
+    chave_parser = registro.get("parser_receita")
+    if not hash_parser or not chave_parser:
+        return "sem receita registrada" if incluir_sem_receita else None
+
+    hash_atual = registro.get("hash_texto_bruto")
+    if hash_atual and hash_atual != hash_parser:
+        return "texto bruto alterado"
+
+    detalhes = registro.get("parser_receita_detalhes") or {}
+    if isinstance(detalhes, str):
+        try:
+            detalhes = json.loads(detalhes)
+        except json.JSONDecodeError:
+            detalhes = {}
+    metodo = detalhes.get("metodo") or "llm"
+    atual = receita_para(metodo, atuais)
+    if atual.chave != chave_parser:
+        anterior = detalhes.get("modelo"), detalhes.get("versao")
+        if anterior[0] != atual.modelo and atual.modelo:
+            return f"modelo alterado ({anterior[0]} → {atual.modelo})"
+        return f"receita {metodo} alterada ({anterior[1]} → {atual.versao})"
+    return None
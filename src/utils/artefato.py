@@ -0,0 +1,308 @@
+"""Formato do JSON estruturado salvo pelo parser (`textos_estruturados`) e lido pelo loader.
+
+O formato legado (1) repete o texto bruto inteiro em `texto_bruto` e é indentado. O formato
+compacto (2) é serializado sem espaços, referencia o texto bruto apenas por `texto_bruto_hash`
+(o arquivo continua em `textos_brutos`) e, opcionalmente, troca o `texto` de cada dispositivo por
+`texto_offsets: [inicio, fim]` quando o trecho aparece literalmente no texto bruto. O loader
+reconstrói os textos com `expandir`, conferindo o hash do texto bruto baixado.
+
+No formato compacto os metadados vêm antes de `dispositivos`, e `anexos`/`relacoes` por último:
+`ler_em_fluxo` entrega o cabeçalho e depois um dispositivo de primeiro nível por vez, sem
+carregar o arquivo inteiro.
+
+Usa `orjson` quando instalado; caso contrário, a biblioteca padrão.
+"""
+
+from __future__ import annotations
+
+import codecs
+import hashlib
+import json
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - biblioteca opcional
+    orjson = None  # type: ignore[assignment]
+
+FORMATO_LEGADO = 1
+FORMATO_COMPACTO = 2
+
+# Abaixo disso o par de offsets não compensa: o texto fica embutido.
+MIN_CHARS_OFFSET = 24
+
+CHAVE_DISPOSITIVOS = "dispositivos"
+# Gravadas no fim do artefato compacto, depois dos metadados que o loader precisa antes de inserir.
+CHAVES_FINAIS = (CHAVE_DISPOSITIVOS, "anexos", "relacoes")
+# Mudam a cada execução do parser sem mudar o que o loader grava (data de geração, método,
+# receita, tamanho do lote): ficam fora de `hash_conteudo`.
+CHAVES_VOLATEIS = ("gerado_em", "parser")
+
+_ESPACOS_RE = re.compile(r"[ \t\r\n]*")
+_ESTRUTURA_RE = re.compile(r'["{}\[\]]')
+_FIM_STRING_RE = re.compile(r'["\\]')
+_FIM_ESCALAR_RE = re.compile(r"[^,\]}\s]*")
+
+
+class TextoBrutoDivergente(ValueError):
+    """O texto bruto disponível não é o que gerou os offsets do artefato."""
+
+
+def serializar(estrutura: Dict, *, compacto: bool = True) -> bytes:
+    if not compacto:
+        return json.dumps(estrutura, ensure_ascii=False, indent=2).encode("utf-8")
+    if orjson is not None:
+        return orjson.dumps(estrutura)
+    return json.dumps(estrutura, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def desserializar(conteudo: Union[bytes, str]) -> Any:
+    """Decodifica o artefato (`orjson.JSONDecodeError` é subclasse de `json.JSONDecodeError`)."""
+    if orjson is not None:
+        return orjson.loads(conteudo)
+    if isinstance(conteudo, bytes):
+        conteudo = conteudo.decode("utf-8")
+    return json.loads(conteudo)
+
+
+def _nos(dispositivos: List[Dict]):
+    """Todos os dispositivos em pré-ordem, sem recursão."""
+    pilha = list(reversed(dispositivos))
+    while pilha:
+        no = pilha.pop()
+        if not isinstance(no, dict):
+            continue
+        yield no
+        filhos = no.get("filhos")
+        if isinstance(filhos, list):
+            pilha.extend(reversed(filhos))
+
+
+def compactar(resultado: Dict, texto_bruto: str, *, offsets: bool = False) -> Dict:
+    """Converte a saída normalizada do parser para o formato compacto (altera `resultado`)."""
+    resultado.pop("texto_bruto", None)
+    resultado["formato"] = FORMATO_COMPACTO
+    resultado["texto_bruto_hash"] = hashlib.sha256(texto_bruto.encode("utf-8")).hexdigest()
+    if not offsets:
+        return resultado
+
+    cursor = 0
+    for no in _nos(resultado.get("dispositivos") or []):
+        texto = no.get("texto")
+        if not isinstance(texto, str) or len(texto) < MIN_CHARS_OFFSET:
+            continue
+        # Dispositivos vêm na ordem do texto: busca a partir do último encontrado e, se o LLM
+        # reordenou algo, recomeça do início.
+        inicio = texto_bruto.find(texto, cursor)
+        if inicio < 0:
+            inicio = texto_bruto.find(texto)
+        if inicio < 0:
+            continue
+        cursor = inicio + len(texto)
+        del no["texto"]
+        no["texto_offsets"] = [inicio, cursor]
+        resultado["texto_em_offsets"] = True
+    return _ordenar_chaves(resultado)
+
+
+def _ordenar_chaves(resultado: Dict) -> Dict:
+    for chave in CHAVES_FINAIS:
+        if chave in resultado:
+            resultado[chave] = resultado.pop(chave)
+    return resultado
+
+
+def usa_offsets(estrutura: Dict) -> bool:
+    if estrutura.get("texto_em_offsets"):
+        return True
+    return any("texto_offsets" in no for no in _nos(estrutura.get(CHAVE_DISPOSITIVOS) or []))
+
+
+def verificar_texto_bruto(cabecalho: Dict, texto_bruto: Optional[str]) -> None:
+    if texto_bruto is None:
+        raise TextoBrutoDivergente("Artefato usa offsets, mas o texto bruto não foi informado.")
+    esperado = cabecalho.get("texto_bruto_hash")
+    atual = hashlib.sha256(texto_bruto.encode("utf-8")).hexdigest()
+    if esperado and esperado != atual:
+        raise TextoBrutoDivergente(f"Hash do texto bruto {atual} difere do usado pelo parser ({esperado}).")
+
+
+def expandir_no(dispositivo: Dict, texto_bruto: str) -> Dict:
+    """Restaura `texto` de um dispositivo e de seus descendentes (texto bruto já verificado)."""
+    for no in _nos([dispositivo]):
+        limites = no.pop("texto_offsets", None)
+        if limites is not None:
+            inicio, fim = limites
+            no["texto"] = texto_bruto[inicio:fim]
+    return dispositivo
+
+
+def expandir(estrutura: Dict, texto_bruto: Optional[str] = None) -> Dict:
+    """Restaura `texto` dos dispositivos a partir dos offsets (altera `estrutura`)."""
+    if not usa_offsets(estrutura):
+        return estrutura
+    verificar_texto_bruto(estrutura, texto_bruto)
+    for no in estrutura.get(CHAVE_DISPOSITIVOS) or []:
+        if isinstance(no, dict):
+            expandir_no(no, texto_bruto)
+    return estrutura
+
+
+class _LeitorFluxo:
+    """Varre o JSON em blocos; só o valor em leitura (e o bloco corrente) fica em memória."""
+
+    def __init__(self, blocos: Iterable[bytes]) -> None:
+        self._blocos = iter(blocos)
+        self._decodificador = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self._esgotado = False
+
+    def _erro(self, mensagem: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(mensagem, self.buffer, self.pos)
+
+    def _ler_mais(self) -> bool:
+        """Descarta o trecho consumido e acrescenta o próximo bloco; False no fim do arquivo.
+
+        Posições relativas a `pos` continuam válidas depois da chamada.
+        """
+        while not self._esgotado:
+            bloco = next(self._blocos, None)
+            if bloco is None:
+                self._esgotado = True
+                texto = self._decodificador.decode(b"", final=True)
+            else:
+                texto = self._decodificador.decode(bloco)
+            if texto:
+                self.buffer = self.buffer[self.pos :] + texto
+                self.pos = 0
+                return True
+        return False
+
+    def caractere(self) -> str:
+        """Próximo caractere significativo, sem consumi-lo."""
+        while True:
+            self.pos = _ESPACOS_RE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._ler_mais():
+                raise self._erro("Fim inesperado do JSON")
+
+    def consumir(self, esperado: str) -> None:
+        if self.caractere() != esperado:
+            raise self._erro(f"Esperado {esperado!r}")
+        self.pos += 1
+
+    def _fim_string(self, relativo: int) -> int:
+        """Offset (relativo a `pos`) logo após a aspa que fecha a string iniciada antes de `relativo`."""
+        while True:
+            match = _FIM_STRING_RE.search(self.buffer, self.pos + relativo)
+            if match is None or (match.group() == "\\" and match.end() >= len(self.buffer)):
+                relativo = (len(self.buffer) if match is None else match.start()) - self.pos
+                if not self._ler_mais():
+                    raise self._erro("String não terminada")
+                continue
+            if match.group() == "\\":
+                relativo = match.end() + 1 - self.pos
+                continue
+            return match.end() - self.pos
+
+    def _fim_valor(self) -> int:
+        inicial = self.buffer[self.pos]
+        if inicial == '"':
+            return self._fim_string(1)
+        if inicial not in "{[":
+            while True:
+                fim = _FIM_ESCALAR_RE.match(self.buffer, self.pos).end()
+                if fim < len(self.buffer) or not self._ler_mais():
+                    return fim - self.pos
+        profundidade = 0
+        relativo = 0
+        while True:
+            match = _ESTRUTURA_RE.search(self.buffer, self.pos + relativo)
+            if match is None:
+                relativo = len(self.buffer) - self.pos
+                if not self._ler_mais():
+                    raise self._erro("Objeto ou lista não terminado")
+                continue
+            relativo = match.end() - self.pos
+            simbolo = match.group()
+            if simbolo == '"':
+                relativo = self._fim_string(relativo)
+            elif simbolo in "{[":
+                profundidade += 1
+            else:
+                profundidade -= 1
+                if profundidade == 0:
+                    return relativo
+
+    def valor(self) -> Any:
+        self.caractere()
+        relativo = self._fim_valor()  # pode descartar o trecho consumido e mover `pos`
+        fim = self.pos + relativo
+        trecho = self.buffer[self.pos : fim]
+        self.pos = fim
+        return desserializar(trecho)
+
+    def fim(self) -> None:
+        while True:
+            self.pos = _ESPACOS_RE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                raise self._erro("Conteúdo após o fim do JSON")
+            if not self._ler_mais():
+                return
+
+
+class HashConteudo:
+    """sha256 dos eventos de `ler_em_fluxo`, sem `CHAVES_VOLATEIS`. É o `hash_parser_json` gravado
+    pelo parser e o `hash_json_estruturado` gravado pelo loader: reprocessar um ato sem mudar a
+    estrutura não devolve o ato à fila do loader."""
+
+    def __init__(self) -> None:
+        self._hash = hashlib.sha256()
+
+    def atualizar(self, tipo: str, chave: Optional[str], valor: Any) -> None:
+        if tipo == "campo" and chave in CHAVES_VOLATEIS:
+            return
+        evento = json.dumps([tipo, chave, valor], ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        self._hash.update(evento.encode("utf-8"))
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+def hash_conteudo(conteudo: bytes) -> str:
+    hash_eventos = HashConteudo()
+    for evento in ler_em_fluxo([conteudo]):
+        hash_eventos.atualizar(*evento)
+    return hash_eventos.hexdigest()
+
+
+def ler_em_fluxo(blocos: Iterable[bytes]) -> Iterator[Tuple[str, Optional[str], Any]]:
+    """Eventos `("campo", chave, valor)` para as chaves do objeto e `("dispositivo", None, no)` para
+    cada item de primeiro nível de `dispositivos`, na ordem em que aparecem no arquivo."""
+    leitor = _LeitorFluxo(blocos)
+    leitor.consumir("{")
+    primeira = True
+    while leitor.caractere() != "}":
+        if not primeira:
+            leitor.consumir(",")
+        primeira = False
+        chave = leitor.valor()
+        if not isinstance(chave, str):
+            raise leitor._erro("Chave de objeto inválida")
+        leitor.consumir(":")
+        if chave != CHAVE_DISPOSITIVOS or leitor.caractere() != "[":
+            yield "campo", chave, leitor.valor()
+            continue
+        leitor.consumir("[")
+        primeiro_item = True
+        while leitor.caractere() != "]":
+            if not primeiro_item:
+                leitor.consumir(",")
+            primeiro_item = False
+            yield "dispositivo", None, leitor.valor()
+        leitor.consumir("]")
+    leitor.consumir("}")
+    leitor.fim()
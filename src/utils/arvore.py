@@ -0,0 +1,187 @@
+"""Representação compacta (arrays paralelos em pré-ordem) da árvore de dispositivos de um ato.
+
+O JSON do parser aninha `dispositivos[].filhos[]` em dicts, o que custa centenas de bytes por nó
+e exige recursão para percorrer. `ArvoreDispositivos` guarda cada nó como um índice em pré-ordem:
+
+- `pai`, `profundidade`, `ordem` (posição entre irmãos, 1-based), `fim` (índice após o último
+  descendente) e `tipo` (código em `TIPOS_DISPOSITIVO`) em `array`s;
+- todos os textos concatenados em um único `str`, com `inicio_texto`/`fim_texto`;
+- rótulos internados e `id_lexml` em listas; demais chaves (relações, versões, atributos e
+  tipos fora de `TIPOS_DISPOSITIVO`) só para os nós que as têm, em `extras`.
+
+Todas as travessias são iterativas: códigos consolidados profundos não esbarram no limite de
+recursão do Python.
+"""
+
+from __future__ import annotations
+
+import sys
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+TIPOS_DISPOSITIVO: Tuple[str, ...] = (
+    "parte",
+    "livro",
+    "titulo",
+    "capitulo",
+    "secao",
+    "subsecao",
+    "artigo",
+    "paragrafo",
+    "paragrafo_unico",
+    "inciso",
+    "alinea",
+    "item",
+    "dispositivo_auxiliar",
+)
+CODIGO_TIPO = {tipo: codigo for codigo, tipo in enumerate(TIPOS_DISPOSITIVO)}
+SEM_TIPO = 255
+
+_CHAVES_FIXAS = {"rotulo", "texto", "filhos", "id_lexml", "tipo"}
+
+
+class ArvoreDispositivos:
+    """Árvore de dispositivos em arrays paralelos; o índice de cada nó é sua posição em pré-ordem."""
+
+    __slots__ = (
+        "pai",
+        "profundidade",
+        "ordem",
+        "fim",
+        "tipo",
+        "inicio_texto",
+        "fim_texto",
+        "rotulos",
+        "ids_lexml",
+        "extras",
+        "_textos",
+    )
+
+    def __init__(self) -> None:
+        self.pai = array("i")
+        self.profundidade = array("H")
+        self.ordem = array("I")
+        self.fim = array("I")
+        self.tipo = array("B")
+        self.inicio_texto = array("Q")
+        self.fim_texto = array("Q")
+        self.rotulos: List[Optional[str]] = []
+        self.ids_lexml: List[Optional[str]] = []
+        self.extras: Dict[int, Dict[str, Any]] = {}
+        self._textos = ""
+
+    def __len__(self) -> int:
+        return len(self.pai)
+
+    @classmethod
+    def de_json(cls, dispositivos: List[Dict]) -> "ArvoreDispositivos":
+        """Converte `dispositivos[].filhos[]` sem recursão (pilha explícita, pré-ordem)."""
+        arvore = cls()
+        partes: List[str] = []
+        deslocamento = 0
+        # Pilha de (nó, índice do pai, profundidade, ordem entre irmãos), desempilhada em pré-ordem.
+        pilha: List[Tuple[Any, int, int, int]] = [
+            (no, -1, 0, ordem) for ordem, no in reversed(list(enumerate(dispositivos or [], start=1)))
+        ]
+        abertos: List[int] = []
+        while pilha:
+            no, pai, profundidade, ordem = pilha.pop()
+            if not isinstance(no, dict):
+                continue
+            while abertos and arvore.profundidade[abertos[-1]] >= profundidade:
+                arvore.fim[abertos.pop()] = len(arvore)
+            indice = len(arvore)
+            texto = no.get("texto") or ""
+            if not isinstance(texto, str):
+                texto = str(texto)
+            rotulo = no.get("rotulo")
+            tipo = no.get("tipo")
+
+            arvore.pai.append(pai)
+            arvore.profundidade.append(profundidade)
+            arvore.ordem.append(ordem)
+            arvore.fim.append(indice + 1)
+            arvore.tipo.append(CODIGO_TIPO.get(tipo, SEM_TIPO) if isinstance(tipo, str) else SEM_TIPO)
+            arvore.inicio_texto.append(deslocamento)
+            deslocamento += len(texto)
+            arvore.fim_texto.append(deslocamento)
+            partes.append(texto)
+            arvore.rotulos.append(sys.intern(rotulo) if isinstance(rotulo, str) else rotulo)
+            arvore.ids_lexml.append(no.get("id_lexml"))
+            extras = {chave: valor for chave, valor in no.items() if chave not in _CHAVES_FIXAS}
+            if tipo is not None and arvore.tipo[-1] == SEM_TIPO:
+                extras["tipo"] = tipo
+            if extras:
+                arvore.extras[indice] = extras
+            abertos.append(indice)
+
+            filhos = no.get("filhos")
+            if isinstance(filhos, list) and filhos:
+                for ordem_filho in range(len(filhos), 0, -1):
+                    pilha.append((filhos[ordem_filho - 1], indice, profundidade + 1, ordem_filho))
+        while abertos:
+            arvore.fim[abertos.pop()] = len(arvore)
+        arvore._textos = "".join(partes)
+        return arvore
+
+    def texto(self, indice: int) -> str:
+        return self._textos[self.inicio_texto[indice] : self.fim_texto[indice]]
+
+    def nome_tipo(self, indice: int) -> Optional[str]:
+        codigo = self.tipo[indice]
+        return TIPOS_DISPOSITIVO[codigo] if codigo != SEM_TIPO else None
+
+    def filhos(self, indice: int) -> Iterator[int]:
+        """Índices dos filhos diretos, pulando cada subárvore pelo array `fim`."""
+        atual = indice + 1
+        while atual < self.fim[indice]:
+            yield atual
+            atual = self.fim[atual]
+
+    def raizes(self) -> Iterator[int]:
+        atual = 0
+        while atual < len(self):
+            yield atual
+            atual = self.fim[atual]
+
+    def no_json(self, indice: int) -> Dict[str, Any]:
+        """Dict do nó no formato do parser, sem `filhos`."""
+        no: Dict[str, Any] = {"rotulo": self.rotulos[indice], "texto": self.texto(indice)}
+        if self.ids_lexml[indice] is not None:
+            no["id_lexml"] = self.ids_lexml[indice]
+        tipo = self.nome_tipo(indice)
+        if tipo is not None:
+            no["tipo"] = tipo
+        no.update(self.extras.get(indice, {}))
+        return no
+
+    def para_json(self) -> List[Dict]:
+        """Reconstrói `dispositivos[].filhos[]` iterativamente (nós vêm em pré-ordem)."""
+        raiz: List[Dict] = []
+        listas: List[List[Dict]] = []
+        for indice in range(len(self)):
+            no = self.no_json(indice)
+            no["filhos"] = []
+            pai = self.pai[indice]
+            (raiz if pai < 0 else listas[pai]).append(no)
+            listas.append(no["filhos"])
+        return raiz
+
+    def tamanho_bytes(self) -> int:
+        """Memória aproximada da representação (arrays, texto, rótulos e ids; extras não incluídos)."""
+        total = sum(
+            campo.itemsize * len(campo)
+            for campo in (
+                self.pai,
+                self.profundidade,
+                self.ordem,
+                self.fim,
+                self.tipo,
+                self.inicio_texto,
+                self.fim_texto,
+            )
+        )
+        total += sys.getsizeof(self._textos) + sys.getsizeof(self.rotulos) + sys.getsizeof(self.ids_lexml)
+        total += sum(sys.getsizeof(rotulo) for rotulo in set(self.rotulos) if rotulo is not None)
+        total += sum(sys.getsizeof(id_lexml) for id_lexml in self.ids_lexml if id_lexml is not None)
+        return total
@@ -18,8 +18,8 @@ class MissingSupabaseConfig(RuntimeError):
     """Configuração obrigatória do Supabase não encontrada."""
 
 
-@lru_cache(maxsize=1)
-def get_supabase_client() -> Client:
+def criar_supabase_client() -> Client:
+    """Cliente novo, com conexões HTTP próprias; use `get_supabase_client` para o compartilhado."""
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
     if not url or not key:
@@ -29,6 +29,11 @@ def get_supabase_client() -> Client:
     return create_client(url, key)
 
 
+@lru_cache(maxsize=1)
+def get_supabase_client() -> Client:
+    return criar_supabase_client()
+
+
 def fetch_origens(origin_ids: Optional[List[str]] = None) -> List[dict]:
     client = get_supabase_client()
     query = client.table("fonte_origem").select("*").eq("status", "ativo")
@@ -128,6 +133,37 @@ def registrar_sugestao_llm(
     client.table("llm_parser_sugestao").insert(payload).execute()
 
 
+def registrar_telemetria_llm(linhas: List[dict]) -> None:
+    if not linhas:
+        return
+    client = get_supabase_client()
+    chunk_size = 500
+    for offset in range(0, len(linhas), chunk_size):
+        client.table("llm_telemetria").insert(linhas[offset : offset + chunk_size]).execute()
+
+
+def buscar_cache_chunks(chaves: List[str]) -> List[dict]:
+    if not chaves:
+        return []
+    client = get_supabase_client()
+    resultados: List[dict] = []
+    chunk_size = 100
+    for offset in range(0, len(chaves), chunk_size):
+        response = (
+            client.table("parser_chunk_cache")
+            .select("chave,resultado")
+            .in_("chave", chaves[offset : offset + chunk_size])
+            .execute()
+        )
+        resultados.extend(response.data or [])
+    return resultados
+
+
+def gravar_cache_chunk(payload: dict) -> None:
+    client = get_supabase_client()
+    client.table("parser_chunk_cache").upsert(payload, on_conflict="chave").execute()
+
+
 def fetch_para_parsing(
     fonte_origem_id: str,
     limit: Optional[int] = None,
@@ -156,6 +192,42 @@ def fetch_para_parsing(
     return response.data or []
 
 
+def fetch_para_reparsing(
+    fonte_origem_id: str,
+    *,
+    urns: Optional[List[str]] = None,
+    year: Optional[int] = None,
+    page_size: int = 1000,
+) -> List[dict]:
+    """Documentos já estruturados, com os hashes e a receita do último parsing, para o modo de reprocessamento."""
+    client = get_supabase_client()
+    colunas = (
+        "id,fonte_origem_id,urn_lexml,tipo_ato,titulo,ementa,data_legislacao,data_publicacao_diario,"
+        "orgao_publicador,url_fonte,metadados_brutos,caminho_texto_bruto,hash_texto_bruto,"
+        "parser_hash_texto_bruto,parser_receita,parser_receita_detalhes"
+    )
+    resultados: List[dict] = []
+    offset = 0
+    while True:
+        query = (
+            client.table("fonte_documento")
+            .select(colunas)
+            .eq("fonte_origem_id", fonte_origem_id)
+            .eq("status_parsing", "processado")
+            .not_.is_("caminho_texto_bruto", "null")
+            .order("id")
+        )
+        if urns:
+            query = query.in_("urn_lexml", urns)
+        if year:
+            query = query.gte("data_legislacao", f"{year:04d}-01-01").lte("data_legislacao", f"{year:04d}-12-31")
+        pagina = query.range(offset, offset + page_size - 1).execute().data or []
+        resultados.extend(pagina)
+        if len(pagina) < page_size:
+            return resultados
+        offset += page_size
+
+
 def atualizar_parsing_sucesso(
     fonte_origem_id: str,
     urn_lexml: str,
@@ -163,11 +235,14 @@ def atualizar_parsing_sucesso(
     caminho: str,
     hash_json: str,
     timestamp_iso: str,
+    hash_texto_bruto: Optional[str] = None,
+    receita: Optional[str] = None,
+    receita_detalhes: Optional[dict] = None,
 ) -> None:
     client = get_supabase_client()
     row = (
         client.table("fonte_documento")
-        .select("id,status_normalizacao,caminho_texto_bruto")
+        .select("id,status_normalizacao,caminho_texto_bruto,hash_parser_json")
         .eq("fonte_origem_id", fonte_origem_id)
         .eq("urn_lexml", urn_lexml)
         .limit(1)
@@ -176,20 +251,26 @@ def atualizar_parsing_sucesso(
     if not row:
         return
     registro = row[0]
-    novo_status = resolve_status(
+    status_normalizacao = registro.get("status_normalizacao")
+    payload = {
+        "status_parsing": "processado",
+        "parsing_executado_em": timestamp_iso,
+        "caminho_parser_json": caminho,
+        "hash_parser_json": hash_json,
+        "parser_hash_texto_bruto": hash_texto_bruto,
+        "parser_receita": receita,
+        "parser_receita_detalhes": receita_detalhes,
+    }
+    # Um JSON novo para ato já normalizado precisa voltar à fila do loader.
+    if status_normalizacao == "processado" and registro.get("hash_parser_json") != hash_json:
+        status_normalizacao = "pendente"
+        payload["status_normalizacao"] = status_normalizacao
+    payload["status"] = resolve_status(
         caminho_texto_bruto=registro.get("caminho_texto_bruto"),
         status_parsing="processado",
-        status_normalizacao=registro.get("status_normalizacao"),
+        status_normalizacao=status_normalizacao,
     )
-    client.table("fonte_documento").update(
-        {
-            "status_parsing": "processado",
-            "parsing_executado_em": timestamp_iso,
-            "caminho_parser_json": caminho,
-            "hash_parser_json": hash_json,
-            "status": novo_status,
-        }
-    ).eq("id", registro["id"]).execute()
+    client.table("fonte_documento").update(payload).eq("id", registro["id"]).execute()
 
 
 def atualizar_parsing_falha(fonte_origem_id: str, urn_lexml: str, *, timestamp_iso: str) -> None:
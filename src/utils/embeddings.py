@@ -0,0 +1,153 @@
+"""Embedders intercambiáveis (hashing offline, sentence-transformers local) para os dispositivos.
+
+Todos devolvem vetores normalizados (norma 1) de `DIMENSAO` posições, a dimensão da coluna
+`embedding_texto.embedding` (migração 015). O `modelo` de cada embedder é gravado junto do vetor:
+trocar de embedder gera embeddings novos sem misturar espaços vetoriais.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import re
+import threading
+import unicodedata
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Sequence
+
+EMBEDDER_ENV = "ATLAS_EMBEDDER"
+MODELO_LOCAL_ENV = "ATLAS_EMBEDDING_MODELO"
+DIMENSAO = 384
+MODELO_LOCAL_PADRAO = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class EmbedderNaoConfigurado(RuntimeError):
+    """Disparado quando o embedder pedido não pode ser carregado."""
+
+
+def vetor_pgvector(vetor: Sequence[float]) -> str:
+    """Literal aceito pelo pgvector via PostgREST (`[0.1,-0.2,...]`), com 6 dígitos significativos."""
+    return "[" + ",".join(f"{valor:.6g}" for valor in vetor) + "]"
+
+
+def _sem_acentos(texto: str) -> str:
+    if texto.isascii():
+        return texto
+    return "".join(ch for ch in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(ch))
+
+
+class Embedder(ABC):
+    """Interface mínima: vetores para uma lista de textos, na mesma ordem."""
+
+    nome = "base"
+    modelo = "base"
+    dimensao = DIMENSAO
+
+    @abstractmethod
+    def embutir(self, textos: Sequence[str]) -> List[List[float]]:
+        """Um vetor normalizado de `dimensao` posições por texto."""
+
+
+class HashingEmbedder(Embedder):
+    """Feature hashing de palavras e bigramas (minúsculas, sem acento), com sinal e tf sublinear.
+
+    Determinístico, sem dependências nem download de modelo: captura sobreposição lexical, não
+    sinônimos. Serve para uso offline, testes e benchmarks.
+    """
+
+    nome = "hashing"
+
+    def __init__(self, dimensao: int = DIMENSAO) -> None:
+        self.dimensao = dimensao
+        self.modelo = f"hashing-v1-{dimensao}"
+
+    def _vetor(self, texto: str) -> List[float]:
+        tokens = _TOKEN_RE.findall(_sem_acentos(texto.lower()))
+        contagem: Dict[str, int] = {}
+        for posicao, token in enumerate(tokens):
+            contagem[token] = contagem.get(token, 0) + 1
+            if posicao:
+                bigrama = f"{tokens[posicao - 1]} {token}"
+                contagem[bigrama] = contagem.get(bigrama, 0) + 1
+        vetor = [0.0] * self.dimensao
+        for termo, frequencia in contagem.items():
+            valor = int.from_bytes(hashlib.blake2b(termo.encode("utf-8"), digest_size=8).digest(), "little")
+            sinal = 1.0 if valor & 1 else -1.0
+            vetor[(valor >> 1) % self.dimensao] += sinal * (1.0 + math.log(frequencia))
+        norma = math.sqrt(sum(valor * valor for valor in vetor))
+        if norma:
+            vetor = [valor / norma for valor in vetor]
+        return vetor
+
+    def embutir(self, textos: Sequence[str]) -> List[List[float]]:
+        return [self._vetor(texto or "") for texto in textos]
+
+
+class SentenceTransformerEmbedder(Embedder):
+    """Modelo local (CPU ou GPU) do sentence-transformers; por padrão um MiniLM multilíngue de 384 dimensões."""
+
+    nome = "sentence-transformers"
+
+    def __init__(self, modelo: Optional[str] = None, *, tamanho_lote: int = 64) -> None:
+        # Importado aqui: o pacote carrega torch, caro demais para quem só usa o embedder de hashing.
+        try:
+            from sentence_transformers import SentenceTransformer  # type: ignore
+        except ImportError as exc:  # pragma: no cover - biblioteca opcional
+            raise EmbedderNaoConfigurado(
+                "Pacote sentence-transformers não disponível. Instale para usar o embedder local."
+            ) from exc
+        self.modelo = modelo or os.getenv(MODELO_LOCAL_ENV, MODELO_LOCAL_PADRAO)
+        self.tamanho_lote = tamanho_lote
+        self._modelo = SentenceTransformer(self.modelo)
+        self.dimensao = int(self._modelo.get_sentence_embedding_dimension())
+        if self.dimensao != DIMENSAO:
+            raise EmbedderNaoConfigurado(
+                f"O modelo {self.modelo} gera vetores de {self.dimensao} dimensões; a coluna espera {DIMENSAO}."
+            )
+
+    def embutir(self, textos: Sequence[str]) -> List[List[float]]:
+        vetores = self._modelo.encode(
+            list(textos),
+            batch_size=self.tamanho_lote,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return vetores.tolist()
+
+
+EMBEDDERS: Dict[str, Callable[[], Embedder]] = {
+    "hashing": HashingEmbedder,
+    "sentence-transformers": SentenceTransformerEmbedder,
+}
+
+_embedder_atual: Optional[Embedder] = None
+_embedder_lock = threading.Lock()
+
+
+def registrar_embedder(nome: str, fabrica: Callable[[], Embedder]) -> None:
+    EMBEDDERS[nome] = fabrica
+
+
+def definir_embedder(embedder: Optional[Embedder]) -> None:
+    """Substitui o embedder do processo (None volta a resolver pelo ambiente)."""
+    global _embedder_atual
+    with _embedder_lock:
+        _embedder_atual = embedder
+
+
+def obter_embedder(nome: Optional[str] = None) -> Embedder:
+    """Embedder do processo, criado na primeira chamada conforme `nome` ou ATLAS_EMBEDDER (padrão: hashing)."""
+    global _embedder_atual
+    with _embedder_lock:
+        if _embedder_atual is not None and (nome is None or _embedder_atual.nome == nome):
+            return _embedder_atual
+        nome = (nome or os.getenv(EMBEDDER_ENV) or "hashing").strip().lower()
+        fabrica = EMBEDDERS.get(nome)
+        if fabrica is None:
+            raise EmbedderNaoConfigurado(f"Embedder desconhecido: {nome!r} (opções: {', '.join(sorted(EMBEDDERS))}).")
+        _embedder_atual = fabrica()
+        return _embedder_atual
@@ -0,0 +1,68 @@
+"""Recuperação do maior prefixo válido de respostas JSON truncadas pelo LLM."""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+_FECHAMENTO = {"{": "}", "[": "]"}
+
+
+@dataclass
+class JsonReparado:
+    """Prefixo decodificado e quantidade de contêineres que estavam abertos no ponto de corte."""
+
+    payload: Any
+    abertos: int
+    corte: int
+
+
+def _pontos_de_corte(texto: str, inicio: int) -> List[tuple[int, str]]:
+    """Posições logo após o fechamento de um objeto/array, com os fechamentos pendentes."""
+    pilha: List[str] = []
+    cortes: List[tuple[int, str]] = []
+    em_string = False
+    escape = False
+
+    for pos in range(inicio, len(texto)):
+        ch = texto[pos]
+        if em_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                em_string = False
+            continue
+        if ch == '"':
+            em_string = True
+        elif ch in _FECHAMENTO:
+            pilha.append(_FECHAMENTO[ch])
+        elif ch in "}]":
+            if not pilha or pilha[-1] != ch:
+                break
+            pilha.pop()
+            if not pilha:
+                # JSON completo: não há o que reparar.
+                return [(pos + 1, "")]
+            cortes.append((pos + 1, "".join(reversed(pilha))))
+    return cortes
+
+
+def reparar_json_truncado(texto: str) -> Optional[JsonReparado]:
+    """Fecha arrays/objetos abertos após o último valor completo e decodifica o resultado.
+
+    Retorna None quando nenhum prefixo do primeiro bloco JSON pode ser recuperado.
+    """
+    inicio = texto.find("{")
+    if inicio < 0:
+        return None
+    for corte, fechamento in reversed(_pontos_de_corte(texto, inicio)):
+        candidato = texto[inicio:corte] + fechamento
+        try:
+            payload = json.loads(candidato, strict=False)
+        except json.JSONDecodeError:
+            continue
+        return JsonReparado(payload=payload, abertos=len(fechamento), corte=corte)
+    return None
@@ -1,54 +1,44 @@
-"""Integração com LLMs (Gemini) para parsing assistido."""
+"""Integração com LLMs para parsing assistido (provedor configurável, Gemini por padrão)."""
 
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
 import os
 import re
-from dataclasses import dataclass
-from typing import Any, Dict, Optional
-import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
 
 from dotenv import load_dotenv
 
-load_dotenv()
-
-try:
-    import google.generativeai as genai  # type: ignore
-except ImportError:  # pragma: no cover - biblioteca opcional
-    genai = None
+from . import json_repair
+from . import llm_schema
+from . import telemetria
+from . import tokens as tokens_utils
+from .llm_providers import (  # noqa: F401
+    LLMNotConfigured,
+    LLMProvider,
+    RespostaLLM,
+    SaidaEstruturadaNaoSuportada,
+    obter_provider,
+    resolver_modelo,
+)
 
-
-class LLMNotConfigured(RuntimeError):
-    """Disparado quando as credenciais/SDK do LLM não estão disponíveis."""
+load_dotenv()
 
 
 JSON_BLOCK_REGEX = re.compile(r"\{[\s\S]*\}")
 
+# Incrementar ao alterar o prompt de `detectar_limite_dispositivo` (invalida o cache de limites).
+VERSAO_PROMPT_LIMITE = "1"
 
-@dataclass
-class LLMConfig:
-    api_key: str
-    model: str
+# Quantas vezes pedimos a continuação de uma resposta truncada antes de refazer a chamada inteira.
+MAX_CONTINUACOES = 3
 
 
-def _get_config(model: Optional[str] = None) -> LLMConfig:
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise LLMNotConfigured("Defina GEMINI_API_KEY para utilizar o parser assistido por LLM.")
-    resolved_model = model or os.getenv("GEMINI_MODEL", "gemini-1.5-pro")
-    return LLMConfig(api_key=api_key, model=resolved_model)
-
-
-def _build_prompt(
-    texto_bruto: str,
-    registro: Dict[str, Any],
-    heuristicas: Optional[str],
-    *,
-    chunk_info: Optional[Dict[str, Any]] = None,
-) -> str:
-    fonte = {
+def _metadados_prompt(registro: Dict[str, Any]) -> Dict[str, Any]:
+    return {
         "urn_lexml": registro.get("urn_lexml"),
         "tipo_ato": registro.get("tipo_ato"),
         "ementa": registro.get("ementa"),
@@ -56,16 +46,11 @@ def _build_prompt(
         "data_publicacao_diario": registro.get("data_publicacao_diario"),
         "orgao_publicador": registro.get("orgao_publicador"),
     }
-    chunk_context = ""
-    if chunk_info:
-        chunk_context = f"""
-Informações sobre o trecho:
-- Este é o chunk {chunk_info.get("indice", 0) + 1} de {chunk_info.get("total", 1)}.
-- O trecho cobre os caracteres de índice {chunk_info.get("offset_inicio", 0)} até {chunk_info.get("offset_fim", 0)} do texto original.
-- Retorne apenas os dispositivos completamente contidos neste trecho. Não reproduza dispositivos parcialmente iniciados em um chunk anterior ou posterior.
-"""
 
-    prompt = f"""
+
+def _instrucoes_estrutura(contexto: str, heuristicas: Optional[str]) -> str:
+    """Formato esperado e regras de estruturação, comuns ao prompt individual e ao de lote."""
+    return f"""
 Você é um parser jurídico. Analise o texto bruto de um ato normativo e produza um JSON com o seguinte formato:
 {{
   "fonte": {{
@@ -155,7 +140,7 @@ Você é um parser jurídico. Analise o texto bruto de um ato normativo e produz
 }}
 
 Regras importantes:
-{chunk_context}
+{contexto}
 - Preserve o texto integral de cada dispositivo exatamente como aparece.
 - Identifique artigos, parágrafos, incisos, alíneas, itens, parágrafo único, Partes, Livros, Títulos, Capítulos, Seções e Subseções.
 - Represente a hierarquia desses elementos aninhando-os no array "filhos" com a mesma ordem do texto original.
@@ -172,6 +157,31 @@ Regras importantes:
 
 Heurísticas atuais do parser determinístico:
 {heuristicas or "(heurísticas não fornecidas)"}
+"""
+
+
+def _build_prompt(
+    texto_bruto: str,
+    registro: Dict[str, Any],
+    heuristicas: Optional[str],
+    *,
+    chunk_info: Optional[Dict[str, Any]] = None,
+    contexto_extra: Optional[str] = None,
+) -> str:
+    fonte = _metadados_prompt(registro)
+    chunk_context = ""
+    if chunk_info:
+        chunk_context = f"""
+Informações sobre o trecho:
+- Este é o chunk {chunk_info.get("indice", 0) + 1} de {chunk_info.get("total", 1)}.
+- O trecho cobre os caracteres de índice {chunk_info.get("offset_inicio", 0)} até {chunk_info.get("offset_fim", 0)} do texto original.
+- Retorne apenas os dispositivos completamente contidos neste trecho. Não reproduza dispositivos parcialmente iniciados em um chunk anterior ou posterior.
+"""
+    if contexto_extra:
+        chunk_context = f"{chunk_context}\n{contexto_extra.strip()}\n"
+
+    prompt = f"""
+{_instrucoes_estrutura(chunk_context, heuristicas).rstrip()}
 
 Metadados do ato: {json.dumps(fonte, ensure_ascii=False)}
 
@@ -181,6 +191,74 @@ Texto:
     return prompt.strip()
 
 
+def versao_prompt(heuristicas: Optional[str]) -> str:
+    """Impressão digital das instruções e do esquema de estruturação; muda a cada ajuste no prompt."""
+    base = _instrucoes_estrutura("", heuristicas) + json.dumps(llm_schema.SCHEMA_ESTRUTURA, sort_keys=True)
+    return hashlib.sha256(base.encode("utf-8")).hexdigest()[:16]
+
+
+def estimar_tokens_prompt_fixo(
+    registro: Dict[str, Any],
+    heuristicas: Optional[str],
+    *,
+    model: Optional[str] = None,
+) -> int:
+    """Tokens consumidos pelo prompt de estruturação sem o texto do ato (esquema, regras, metadados)."""
+    chunk_info = {"indice": 0, "total": 1, "offset_inicio": 0, "offset_fim": 0}
+    prompt_vazio = _build_prompt("", registro, heuristicas, chunk_info=chunk_info)
+    return tokens_utils.estimar_tokens(prompt_vazio, tokens_utils.obter_perfil(model))
+
+
+def _registrar_uso_tokens(resposta: RespostaLLM, prompt: str, texto_bruto: str) -> None:
+    tokens_utils.registrar_uso(
+        resposta.modelo,
+        prompt_chars=len(prompt),
+        prompt_tokens=resposta.prompt_tokens,
+        texto_chars=len(texto_bruto),
+        saida_tokens=resposta.saida_tokens,
+        truncado=resposta.truncada,
+    )
+
+
+def _gerar(
+    provider: LLMProvider,
+    prompt: str,
+    *,
+    modelo: str,
+    chamada: telemetria.ChamadaLLM,
+    texto_bruto: str = "",
+    generation_config: Optional[Dict[str, Any]] = None,
+    calibrar: bool = True,
+) -> RespostaLLM:
+    """Chama o provedor, calibra tokens e preenche a telemetria da chamada (tempo, tokens, resultado).
+
+    `calibrar=False` para prompts cuja saída não é a estrutura do texto (limites, revisão).
+    """
+    inicio = time.perf_counter()
+    try:
+        resposta = provider.gerar(prompt, model=modelo, generation_config=generation_config)
+    finally:
+        chamada.latencia_ms += (time.perf_counter() - inicio) * 1000
+    perfil = tokens_utils.obter_perfil(modelo)
+    chamada.provedor = provider.nome
+    chamada.prompt_chars = len(prompt)
+    chamada.texto_bytes = len(texto_bruto.encode("utf-8"))
+    chamada.prompt_tokens = resposta.prompt_tokens or tokens_utils.estimar_tokens(prompt, perfil)
+    chamada.saida_tokens = resposta.saida_tokens or tokens_utils.estimar_tokens(resposta.texto or "", perfil)
+    chamada.tokens_estimados = not (resposta.prompt_tokens and resposta.saida_tokens)
+    if resposta.texto is None:
+        chamada.resultado = "vazia"
+    elif resposta.truncada:
+        chamada.resultado = "truncada"
+    if calibrar:
+        _registrar_uso_tokens(resposta, prompt, texto_bruto)
+    return resposta
+
+
+def _chunk_indice(chunk_info: Optional[Dict[str, Any]]) -> Optional[int]:
+    return int(chunk_info.get("indice", 0)) if chunk_info else None
+
+
 def _extract_first_json_block(text: str) -> str:
     match = JSON_BLOCK_REGEX.search(text)
     if not match:
@@ -190,6 +268,241 @@ def _extract_first_json_block(text: str) -> str:
     return bloco_limpo
 
 
+def _structured_output_ativo(structured_output: Optional[bool]) -> bool:
+    if structured_output is not None:
+        return structured_output
+    return os.getenv("GEMINI_STRUCTURED_OUTPUT", "").strip().lower() in {"1", "true", "sim", "yes"}
+
+
+def _config_structured_output() -> Dict[str, Any]:
+    return {
+        "response_mime_type": "application/json",
+        "response_schema": llm_schema.SCHEMA_ESTRUTURA,
+    }
+
+
+def _interpretar_resposta_estruturada(texto_resposta: str) -> Dict[str, Any]:
+    """Decodifica a resposta do modo estruturado, recorrendo à extração por regex se necessário."""
+    try:
+        payload = json.loads(texto_resposta)
+    except json.JSONDecodeError:
+        payload = json.loads(_extract_first_json_block(texto_resposta))
+    erros = llm_schema.validar_estrutura(payload)
+    if erros:
+        raise ValueError(f"JSON fora do esquema esperado: {'; '.join(erros[:5])}")
+    return payload
+
+
+def _chave_rotulo(rotulo: Any) -> str:
+    return re.sub(r"\s+", " ", str(rotulo or "")).strip().lower()
+
+
+def _ultimo_dispositivo(dispositivos: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """Percorre o caminho mais à direita da árvore: (ancestrais, último dispositivo).
+
+    Os ancestrais foram fechados pelo reparo; o último pode ter sido também (ver `_ultimo_incompleto`)."""
+    ancestrais: List[Dict[str, Any]] = []
+    atual: Optional[Dict[str, Any]] = None
+    nivel = dispositivos
+    while isinstance(nivel, list) and nivel and isinstance(nivel[-1], dict):
+        if atual is not None:
+            ancestrais.append(atual)
+        atual = nivel[-1]
+        nivel = atual.get("filhos")
+    return ancestrais, atual
+
+
+def _ultimo_incompleto(abertos: int, ancestrais: List[Dict[str, Any]]) -> bool:
+    """Se o reparo também fechou o último dispositivo (cortado em `relacoes`, `atributos` etc. antes
+    de `filhos`). Contêineres até ele: raiz, `dispositivos` e, por ancestral, o objeto e `filhos`."""
+    return abertos >= 2 * len(ancestrais) + 3
+
+
+def _secao_interrompida(payload: Dict[str, Any]) -> Optional[str]:
+    chaves = [chave for chave in payload if chave in ("dispositivos", "anexos", "relacoes")]
+    return chaves[-1] if chaves else None
+
+
+def _localizar_offset(texto_bruto: str, item: Optional[Dict[str, Any]]) -> Optional[int]:
+    """Offset do início do último item no texto, para reenviar apenas o restante.
+
+    None quando o texto do item não é encontrado: reenviar o texto inteiro pedindo só o que vem
+    depois do item duplicaria ou perderia dispositivos."""
+    if not item:
+        return 0
+    trecho = (item.get("texto") or "").strip()[:80]
+    if not trecho:
+        return None
+    pos = texto_bruto.find(trecho)
+    if pos < 0:
+        return None
+    rotulo = (item.get("rotulo") or item.get("titulo") or "").strip()
+    inicio_rotulo = texto_bruto.rfind(rotulo, max(0, pos - 200), pos) if rotulo else -1
+    return inicio_rotulo if inicio_rotulo >= 0 else pos
+
+
+def _instrucao_continuacao(
+    secao: str,
+    ancestrais: List[Dict[str, Any]],
+    ultimo: Optional[Dict[str, Any]],
+    *,
+    incompleto: bool = False,
+) -> str:
+    rotulo_ultimo = (ultimo or {}).get("rotulo") or (ultimo or {}).get("titulo") or "(início)"
+    linhas = ["Continuação de resposta interrompida:"]
+    if incompleto:
+        linhas += [
+            f"- A resposta anterior foi cortada na seção \"{secao}\" dentro do item \"{rotulo_ultimo}\".",
+            "- O texto abaixo começa nesse item. Repita-o (mesmo rótulo e texto) com seus \"filhos\" e "
+            "retorne também os itens posteriores a ele.",
+        ]
+    else:
+        linhas += [
+            f"- A resposta anterior foi cortada na seção \"{secao}\" após o item \"{rotulo_ultimo}\".",
+            "- O texto abaixo começa nesse item. NÃO o repita; retorne apenas os itens posteriores a ele.",
+        ]
+    if secao == "dispositivos" and ancestrais:
+        caminho = " > ".join(str(no.get("rotulo") or "") for no in ancestrais)
+        linhas.append(
+            f"- \"{rotulo_ultimo}\" está aninhado em: {caminho}. Para continuar dentro dessa hierarquia, "
+            "repita esses dispositivos ancestrais (mesmo rótulo e texto) contendo em \"filhos\" apenas os novos itens."
+        )
+    elif secao == "anexos":
+        linhas.append("- Todos os dispositivos já foram retornados: devolva \"dispositivos\" vazio e apenas os anexos restantes.")
+    elif secao == "relacoes":
+        linhas.append("- Dispositivos e anexos já foram retornados: devolva apenas as relações de nível raiz restantes.")
+    return "\n".join(linhas)
+
+
+def _mesclar_dispositivos(existentes: List[Dict[str, Any]], novos: List[Dict[str, Any]]) -> None:
+    """Anexa `novos` à árvore, fundindo ancestrais repetidos ao longo do caminho mais à direita."""
+    novos = [no for no in novos if isinstance(no, dict)]
+    if existentes and novos and isinstance(existentes[-1], dict):
+        ultimo, primeiro = existentes[-1], novos[0]
+        chave = _chave_rotulo(primeiro.get("rotulo"))
+        if chave and chave == _chave_rotulo(ultimo.get("rotulo")):
+            if not isinstance(ultimo.get("filhos"), list):
+                ultimo["filhos"] = []
+            _mesclar_dispositivos(ultimo["filhos"], primeiro.get("filhos") or [])
+            for lista in ("relacoes", "versoes"):
+                adicionais = primeiro.get(lista) or []
+                if adicionais:
+                    if not isinstance(ultimo.get(lista), list):
+                        ultimo[lista] = []
+                    # Um item cortado é repetido inteiro na continuação, com o que já tinha vindo.
+                    ultimo[lista].extend(item for item in adicionais if item not in ultimo[lista])
+            novos = novos[1:]
+    existentes.extend(novos)
+
+
+def _mesclar_continuacao(resultado: Dict[str, Any], parcial: Dict[str, Any]) -> None:
+    if not isinstance(resultado.get("dispositivos"), list):
+        resultado["dispositivos"] = []
+    _mesclar_dispositivos(resultado["dispositivos"], parcial.get("dispositivos") or [])
+    for chave in ("anexos", "relacoes"):
+        adicionais = parcial.get(chave) or []
+        if adicionais:
+            if not isinstance(resultado.get(chave), list):
+                resultado[chave] = []
+            resultado[chave].extend(adicionais)
+    if not resultado.get("fonte") and parcial.get("fonte"):
+        resultado["fonte"] = parcial["fonte"]
+
+
+def _continuar_resposta_truncada(
+    modelo: str,
+    reparado: json_repair.JsonReparado,
+    texto_bruto: str,
+    registro: Dict[str, Any],
+    *,
+    heuristicas: Optional[str],
+    chunk_info: Optional[Dict[str, Any]],
+) -> Optional[Dict[str, Any]]:
+    """Pede ao modelo apenas o que faltou após o último item completo e funde as partes."""
+    resultado = reparado.payload
+    if not isinstance(resultado, dict):
+        return None
+    abertos = reparado.abertos
+
+    for continuacao in range(1, MAX_CONTINUACOES + 1):
+        secao = _secao_interrompida(resultado)
+        if secao is None:
+            return None
+        incompleto = False
+        if secao == "dispositivos":
+            ancestrais, ultimo = _ultimo_dispositivo(resultado.get("dispositivos") or [])
+            incompleto = ultimo is not None and _ultimo_incompleto(abertos, ancestrais)
+        else:
+            itens = resultado.get(secao) or []
+            ancestrais, ultimo = [], itens[-1] if itens and isinstance(itens[-1], dict) else None
+        offset = _localizar_offset(texto_bruto, ultimo) if secao != "relacoes" else 0
+        if offset is None:
+            logging.warning(
+                "Resposta truncada para URN %s: %r não encontrado no texto; continuação abandonada.",
+                registro.get("urn_lexml"),
+                (ultimo or {}).get("rotulo") or (ultimo or {}).get("titulo"),
+            )
+            return None
+
+        info = dict(chunk_info or {"indice": 0, "total": 1, "offset_inicio": 0, "offset_fim": len(texto_bruto)})
+        info["offset_inicio"] = int(info.get("offset_inicio", 0)) + offset
+        prompt = _build_prompt(
+            texto_bruto[offset:],
+            registro,
+            heuristicas,
+            chunk_info=info,
+            contexto_extra=_instrucao_continuacao(secao, ancestrais, ultimo, incompleto=incompleto),
+        )
+        logging.info(
+            "Resposta truncada para URN %s: solicitando continuação %s/%s a partir de %r (offset %s).",
+            registro.get("urn_lexml"),
+            continuacao,
+            MAX_CONTINUACOES,
+            (ultimo or {}).get("rotulo") or (ultimo or {}).get("titulo"),
+            offset,
+        )
+        with telemetria.medir(
+            "continuacao",
+            modelo=modelo,
+            urn_lexml=registro.get("urn_lexml"),
+            chunk_indice=_chunk_indice(chunk_info),
+            tentativa=continuacao,
+        ) as chamada:
+            resposta = _gerar(
+                obter_provider(),
+                prompt,
+                modelo=modelo,
+                chamada=chamada,
+                texto_bruto=texto_bruto[offset:],
+            )
+            if resposta.texto is None:
+                return None
+            texto_resposta = resposta.texto
+
+            try:
+                parcial = json.loads(_extract_first_json_block(texto_resposta))
+                completo = True
+            except (ValueError, json.JSONDecodeError):
+                reparo = json_repair.reparar_json_truncado(texto_resposta)
+                if reparo is None or not isinstance(reparo.payload, dict):
+                    chamada.resultado = "json_invalido"
+                    return None
+                parcial = reparo.payload
+                abertos = reparo.abertos
+                completo = False
+
+        _mesclar_continuacao(resultado, parcial)
+        if completo:
+            return resultado
+
+    logging.warning(
+        "Resposta de %s continuou truncada após %s continuações.",
+        registro.get("urn_lexml"),
+        MAX_CONTINUACOES,
+    )
+    return None
+
+
 def gerar_estrutura_llm(
     texto_bruto: str,
     registro: Dict[str, Any],
@@ -198,41 +511,88 @@ def gerar_estrutura_llm(
     model: Optional[str] = None,
     chunk_info: Optional[Dict[str, Any]] = None,
     max_attempts: int = 2,
+    structured_output: Optional[bool] = None,
 ) -> Dict[str, Any]:
-    """Gera JSON estruturado usando Gemini. Levanta LLMNotConfigured se indisponível."""
-    if genai is None:
-        raise LLMNotConfigured("Pacote google-generativeai não disponível. Instale para usar o LLM.")
-
-    config = _get_config(model)
-    genai.configure(api_key=config.api_key)
+    """Gera JSON estruturado com o provedor de LLM configurado. Levanta LLMNotConfigured se indisponível.
+
+    Com `structured_output` (ou GEMINI_STRUCTURED_OUTPUT=1) o provedor recebe o esquema de
+    `llm_schema` e a resposta é validada; se o modelo não aceitar o esquema
+    (`SaidaEstruturadaNaoSuportada`), a chamada segue pelo caminho tradicional de extração por regex.
+    """
+    provider = obter_provider()
+    modelo = resolver_modelo(model)
     prompt = _build_prompt(texto_bruto, registro, heuristicas, chunk_info=chunk_info)
 
-    modelo = genai.GenerativeModel(config.model)
     last_error: Optional[Exception] = None
     last_output: Optional[str] = None
+    usar_estruturado = _structured_output_ativo(structured_output)
 
     for attempt in range(1, max_attempts + 1):
-        resposta = modelo.generate_content(prompt)  # type: ignore[no-untyped-call]
-        if not resposta.candidates:
-            last_error = RuntimeError("Resposta vazia do LLM.")
-            continue
-
-        texto_resposta = resposta.candidates[0].content.parts[0].text  # type: ignore[attr-defined]
-        try:
-            json_str = _extract_first_json_block(texto_resposta)
-            last_output = json_str
-            return json.loads(json_str)
-        except (ValueError, json.JSONDecodeError) as exc:
-            last_error = exc
-            logging.warning(
-                "LLM retornou JSON inválido (tentativa %s/%s) para URN %s: %s",
-                attempt,
-                max_attempts,
-                registro.get("urn_lexml"),
-                exc,
-            )
-            if attempt == max_attempts:
-                break
+        with telemetria.medir(
+            "estrutura",
+            modelo=modelo,
+            urn_lexml=registro.get("urn_lexml"),
+            chunk_indice=_chunk_indice(chunk_info),
+            tentativa=attempt,
+        ) as chamada:
+            if usar_estruturado:
+                try:
+                    resposta = _gerar(
+                        provider,
+                        prompt,
+                        modelo=modelo,
+                        chamada=chamada,
+                        texto_bruto=texto_bruto,
+                        generation_config=_config_structured_output(),
+                    )
+                except SaidaEstruturadaNaoSuportada as exc:
+                    # Só a recusa do esquema desliga o modo; timeouts, 429 e 5xx seguem como nas demais chamadas.
+                    logging.warning(
+                        "Modelo %s recusou saída estruturada (%s). Usando extração por regex.",
+                        modelo,
+                        exc,
+                    )
+                    usar_estruturado = False
+                    resposta = _gerar(provider, prompt, modelo=modelo, chamada=chamada, texto_bruto=texto_bruto)
+            else:
+                resposta = _gerar(provider, prompt, modelo=modelo, chamada=chamada, texto_bruto=texto_bruto)
+            if resposta.texto is None:
+                last_error = RuntimeError("Resposta vazia do LLM.")
+                continue
+
+            texto_resposta = resposta.texto
+            try:
+                if usar_estruturado:
+                    last_output = texto_resposta
+                    return _interpretar_resposta_estruturada(texto_resposta)
+                json_str = _extract_first_json_block(texto_resposta)
+                last_output = json_str
+                return json.loads(json_str)
+            except (ValueError, json.JSONDecodeError) as exc:
+                last_error = exc
+                if chamada.resultado == "ok":
+                    chamada.resultado = "json_invalido"
+                reparado = json_repair.reparar_json_truncado(texto_resposta)
+                if reparado is not None and reparado.abertos:
+                    recuperado = _continuar_resposta_truncada(
+                        modelo,
+                        reparado,
+                        texto_bruto,
+                        registro,
+                        heuristicas=heuristicas,
+                        chunk_info=chunk_info,
+                    )
+                    if recuperado is not None:
+                        return recuperado
+                logging.warning(
+                    "LLM retornou JSON inválido (tentativa %s/%s) para URN %s: %s",
+                    attempt,
+                    max_attempts,
+                    registro.get("urn_lexml"),
+                    exc,
+                )
+                if attempt == max_attempts:
+                    break
 
     if last_error is None:
         raise RuntimeError("Falha desconhecida ao gerar estrutura com o LLM.")
@@ -243,6 +603,103 @@ def gerar_estrutura_llm(
     raise last_error
 
 
+CONTEXTO_LOTE = """
+- Esta requisição contém VÁRIOS atos independentes, cada um delimitado por <<<DOCUMENTO urn="...">>> e <<<FIM DOCUMENTO>>>.
+- Estruture cada ato separadamente no formato acima, sem misturar dispositivos, anexos ou relações entre atos.
+- Responda com um único objeto {"documentos": [...]}, com um item por ato na mesma ordem, cada um contendo "urn_lexml" (exatamente como no delimitador), "fonte", "dispositivos", "anexos" e "relacoes".
+"""
+
+
+def _build_prompt_lote(itens: List[Tuple[Dict[str, Any], str]], heuristicas: Optional[str]) -> str:
+    blocos = []
+    for registro, texto_bruto in itens:
+        fonte = _metadados_prompt(registro)
+        blocos.append(
+            f"""<<<DOCUMENTO urn="{registro.get("urn_lexml")}">>>
+Metadados do ato: {json.dumps(fonte, ensure_ascii=False)}
+
+Texto:
+\"\"\"{texto_bruto}\"\"\"
+<<<FIM DOCUMENTO>>>"""
+        )
+    prompt = f"""
+{_instrucoes_estrutura(CONTEXTO_LOTE, heuristicas).rstrip()}
+
+{chr(10).join(blocos)}
+"""
+    return prompt.strip()
+
+
+def estimar_tokens_prompt_lote(heuristicas: Optional[str], *, model: Optional[str] = None) -> int:
+    """Tokens fixos do prompt de lote (instruções e regras), sem os documentos."""
+    return tokens_utils.estimar_tokens(_build_prompt_lote([], heuristicas), tokens_utils.obter_perfil(model))
+
+
+def chars_documento_lote(registro: Dict[str, Any]) -> int:
+    """Caracteres de delimitadores e metadados que cada ato acrescenta ao prompt de lote (sem o texto)."""
+    return len(_build_prompt_lote([(registro, "")], None)) - len(_build_prompt_lote([], None))
+
+
+def _documentos_lote(payload: Any, completo: bool) -> List[Dict[str, Any]]:
+    documentos = payload.get("documentos") if isinstance(payload, dict) else None
+    if not isinstance(documentos, list):
+        return []
+    documentos = [doc for doc in documentos if isinstance(doc, dict)]
+    # Numa resposta truncada o último documento pode ter sido fechado pelo reparo: descartamos.
+    return documentos if completo else documentos[:-1]
+
+
+def gerar_estrutura_lote(
+    itens: List[Tuple[Dict[str, Any], str]],
+    *,
+    heuristicas: Optional[str] = None,
+    model: Optional[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Estrutura vários atos curtos numa única chamada ao LLM.
+
+    Retorna um dicionário `urn_lexml -> estrutura` apenas com os documentos recebidos completos e
+    válidos segundo `llm_schema`; os ausentes devem ser reprocessados individualmente pelo chamador.
+    """
+    if not itens:
+        return {}
+    modelo = resolver_modelo(model)
+    prompt = _build_prompt_lote(itens, heuristicas)
+    texto_total = "".join(texto for _, texto in itens)
+
+    with telemetria.medir("estrutura_lote", modelo=modelo) as chamada:
+        resposta = _gerar(obter_provider(), prompt, modelo=modelo, chamada=chamada, texto_bruto=texto_total)
+        if resposta.texto is None:
+            logging.warning("Resposta vazia do LLM para lote de %s atos.", len(itens))
+            return {}
+
+        try:
+            documentos = _documentos_lote(json.loads(_extract_first_json_block(resposta.texto)), True)
+        except (ValueError, json.JSONDecodeError) as exc:
+            chamada.resultado = "json_invalido"
+            reparado = json_repair.reparar_json_truncado(resposta.texto)
+            documentos = _documentos_lote(reparado.payload, False) if reparado is not None else []
+            logging.warning(
+                "JSON inválido para lote de %s atos (%s); %s documento(s) recuperado(s).",
+                len(itens),
+                exc,
+                len(documentos),
+            )
+
+    esperadas = {registro.get("urn_lexml") for registro, _ in itens}
+    resultados: Dict[str, Dict[str, Any]] = {}
+    for documento in documentos:
+        urn = documento.pop("urn_lexml", None)
+        if urn not in esperadas or urn in resultados:
+            logging.warning("Documento do lote com URN inesperada ou repetida: %r", urn)
+            continue
+        erros = llm_schema.validar_estrutura(documento)
+        if erros:
+            logging.warning("Documento %s do lote fora do esquema: %s", urn, "; ".join(erros[:5]))
+            continue
+        resultados[urn] = documento
+    return resultados
+
+
 def detectar_limite_dispositivo(
     trecho: str,
     registro: Dict[str, Any],
@@ -252,11 +709,8 @@ def detectar_limite_dispositivo(
     max_attempts: int = 2,
 ) -> Optional[int]:
     """Retorna o índice (0-based, relativo ao trecho) do fim do último dispositivo completo."""
-    if genai is None:
-        raise LLMNotConfigured("Pacote google-generativeai não disponível. Instale para usar o LLM.")
-
-    config = _get_config(model)
-    genai.configure(api_key=config.api_key)
+    provider = obter_provider()
+    modelo = resolver_modelo(model)
 
     prompt = f"""
 Analise o trecho abaixo, extraído de um ato normativo goiano. O trecho inicia na posição {offset_inicial} do texto integral.
@@ -272,29 +726,36 @@ Trecho:
 \"\"\"{trecho}\"\"\"
 """
 
-    modelo = genai.GenerativeModel(config.model)
     ultima_mensagem: Optional[str] = None
 
     for attempt in range(1, max_attempts + 1):
-        resposta = modelo.generate_content(prompt)  # type: ignore[no-untyped-call]
-        if not resposta.candidates:
-            continue
-
-        texto_resposta = resposta.candidates[0].content.parts[0].text  # type: ignore[attr-defined]
-        ultima_mensagem = texto_resposta
-        try:
-            bloco = _extract_first_json_block(texto_resposta)
-            payload = json.loads(bloco)
-        except json.JSONDecodeError:
-            continue
-
-        status = payload.get("status")
-        if status == "ok":
-            indice = payload.get("indice_final")
-            if isinstance(indice, int):
-                return indice
-        elif status == "sem_limite":
-            return None
+        with telemetria.medir(
+            "limite",
+            modelo=modelo,
+            urn_lexml=registro.get("urn_lexml"),
+            tentativa=attempt,
+        ) as chamada:
+            resposta = _gerar(provider, prompt, modelo=modelo, chamada=chamada, texto_bruto=trecho, calibrar=False)
+            if resposta.texto is None:
+                continue
+
+            texto_resposta = resposta.texto
+            ultima_mensagem = texto_resposta
+            try:
+                bloco = _extract_first_json_block(texto_resposta)
+                payload = json.loads(bloco)
+            except json.JSONDecodeError:
+                chamada.resultado = "json_invalido"
+                continue
+
+            status = payload.get("status")
+            if status == "ok":
+                indice = payload.get("indice_final")
+                if isinstance(indice, int):
+                    return indice
+            elif status == "sem_limite":
+                return None
+            chamada.resultado = "fora_do_esquema"
 
     if ultima_mensagem:
         logging.debug(
@@ -315,11 +776,8 @@ def gerar_revisao_regex(
     model: Optional[str] = None,
 ) -> str:
     """Solicita ao LLM sugestões de aprimoramento com base nas divergências."""
-    if genai is None:
-        raise LLMNotConfigured("Pacote google-generativeai não disponível. Instale para usar o LLM.")
-
-    config = _get_config(model)
-    genai.configure(api_key=config.api_key)
+    provider = obter_provider()
+    modelo = resolver_modelo(model)
 
     prompt = f"""
 Você atua como revisor do parser determinístico. Receba o texto bruto de um ato normativo, a saída do parser heurístico (A)
@@ -343,8 +801,8 @@ Saída LLM (B):
 Responda em português. Liste as divergências e sugestões objetivas.
 """
 
-    modelo = genai.GenerativeModel(config.model)
-    resposta = modelo.generate_content(prompt)  # type: ignore[no-untyped-call]
-    if not resposta.candidates:
+    with telemetria.medir("revisao", modelo=modelo) as chamada:
+        resposta = _gerar(provider, prompt, modelo=modelo, chamada=chamada, texto_bruto=texto_bruto, calibrar=False)
+    if resposta.texto is None:
         raise RuntimeError("Resposta vazia do LLM na revisão.")
-    return resposta.candidates[0].content.parts[0].text  # type: ignore[attr-defined]
+    return resposta.texto
@@ -0,0 +1,295 @@
+"""Provedores de LLM intercambiáveis (Gemini, stub offline) usados por `src.utils.llm`."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import google.generativeai as genai  # type: ignore
+except ImportError:  # pragma: no cover - biblioteca opcional
+    genai = None
+
+PROVIDER_ENV = "ATLAS_LLM_PROVIDER"
+STUB_DIR_ENV = "ATLAS_LLM_STUB_DIR"
+STUB_LATENCIA_ENV = "ATLAS_LLM_STUB_LATENCIA_MS"
+GRAVAR_DIR_ENV = "ATLAS_LLM_GRAVAR_DIR"
+MODELO_PADRAO = "gemini-1.5-pro"
+
+
+class LLMNotConfigured(RuntimeError):
+    """Disparado quando as credenciais/SDK do LLM não estão disponíveis."""
+
+
+class SaidaEstruturadaNaoSuportada(RuntimeError):
+    """O modelo ou o SDK recusou `response_schema`/`response_mime_type`; falhas transitórias não viram esta."""
+
+
+@dataclass
+class RespostaLLM:
+    """Resposta normalizada de qualquer provedor."""
+
+    texto: Optional[str]
+    modelo: str
+    finish_reason: Optional[str] = None
+    prompt_tokens: Optional[int] = None
+    saida_tokens: Optional[int] = None
+
+    @property
+    def truncada(self) -> bool:
+        return "MAX_TOKENS" in (self.finish_reason or "")
+
+
+def resolver_modelo(model: Optional[str] = None) -> str:
+    return model or os.getenv("GEMINI_MODEL", MODELO_PADRAO)
+
+
+def chave_prompt(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+class LLMProvider(ABC):
+    """Interface mínima: gerar texto a partir de um prompt."""
+
+    nome = "base"
+
+    @abstractmethod
+    def gerar(
+        self,
+        prompt: str,
+        *,
+        model: str,
+        generation_config: Optional[Dict[str, Any]] = None,
+    ) -> RespostaLLM:
+        """Resposta do modelo `model` para `prompt`; `generation_config` é repassado ao SDK."""
+
+
+_ESQUEMA_RE = re.compile(r"response_?schema|response_?mime_?type|\bschema\b", re.IGNORECASE)
+
+
+def _esquema_recusado(exc: Exception) -> bool:
+    """Erro de configuração que cita o esquema: validação do SDK ou 400 da API (não 429/5xx/timeout)."""
+    if not _ESQUEMA_RE.search(str(exc)):
+        return False
+    return isinstance(exc, (TypeError, ValueError)) or getattr(exc, "code", None) == 400
+
+
+class GeminiProvider(LLMProvider):
+    """Cliente Gemini reaproveitado pelo processo: `configure` uma vez e um `GenerativeModel` por modelo."""
+
+    nome = "gemini"
+
+    def __init__(self) -> None:
+        if genai is None:
+            raise LLMNotConfigured("Pacote google-generativeai não disponível. Instale para usar o LLM.")
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise LLMNotConfigured("Defina GEMINI_API_KEY para utilizar o parser assistido por LLM.")
+        genai.configure(api_key=api_key)
+        self._modelos: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _modelo(self, nome: str) -> Any:
+        with self._lock:
+            modelo = self._modelos.get(nome)
+            if modelo is None:
+                modelo = genai.GenerativeModel(nome)
+                self._modelos[nome] = modelo
+            return modelo
+
+    def gerar(
+        self,
+        prompt: str,
+        *,
+        model: str,
+        generation_config: Optional[Dict[str, Any]] = None,
+    ) -> RespostaLLM:
+        modelo = self._modelo(model)
+        if generation_config:
+            try:
+                resposta = modelo.generate_content(prompt, generation_config=generation_config)  # type: ignore[no-untyped-call]
+            except Exception as exc:  # noqa: BLE001
+                if _esquema_recusado(exc):
+                    raise SaidaEstruturadaNaoSuportada(str(exc)) from exc
+                raise
+        else:
+            resposta = modelo.generate_content(prompt)  # type: ignore[no-untyped-call]
+
+        texto = None
+        finish_reason = None
+        if resposta.candidates:
+            candidato = resposta.candidates[0]
+            motivo = getattr(candidato, "finish_reason", None)
+            finish_reason = str(getattr(motivo, "name", motivo)) if motivo is not None else None
+            try:
+                texto = candidato.content.parts[0].text  # type: ignore[attr-defined]
+            except (AttributeError, IndexError):
+                texto = None
+        uso = getattr(resposta, "usage_metadata", None)
+        return RespostaLLM(
+            texto=texto,
+            modelo=model,
+            finish_reason=finish_reason,
+            prompt_tokens=getattr(uso, "prompt_token_count", None),
+            saida_tokens=getattr(uso, "candidates_token_count", None),
+        )
+
+
+_ARTIGO_LINHA_RE = re.compile(r"^\s*Art\.?\s*\d+")
+_TEXTO_PROMPT_RE = re.compile(r'Texto:\s*"""(?P<texto>[\s\S]*)"""\s*$')
+_DOCUMENTO_LOTE_RE = re.compile(
+    r'<<<DOCUMENTO urn="(?P<urn>[^"]*)">>>\s*Metadados do ato:[^\n]*\s*Texto:\s*"""(?P<texto>[\s\S]*?)"""\s*<<<FIM DOCUMENTO>>>'
+)
+
+
+class StubProvider(LLMProvider):
+    """Provedor determinístico e offline para testes e benchmarks de vazão.
+
+    Reproduz respostas gravadas em `ATLAS_LLM_STUB_DIR` (arquivos `<sha256 do prompt>.json`)
+    e, na falta delas, sintetiza uma resposta plausível a partir do próprio prompt.
+    """
+
+    nome = "stub"
+
+    def __init__(self, diretorio: Optional[Path] = None, *, latencia_ms: Optional[float] = None) -> None:
+        dir_env = os.getenv(STUB_DIR_ENV)
+        self.diretorio = diretorio or (Path(dir_env) if dir_env else None)
+        if latencia_ms is None:
+            latencia_ms = float(os.getenv(STUB_LATENCIA_ENV, "0") or 0)
+        self.latencia_ms = latencia_ms
+
+    def _gravacao(self, chave: str) -> Optional[Dict[str, Any]]:
+        if not self.diretorio:
+            return None
+        caminho = self.diretorio / f"{chave}.json"
+        if not caminho.exists():
+            return None
+        return json.loads(caminho.read_text(encoding="utf-8"))
+
+    @staticmethod
+    def _sintetizar_estrutura(texto: str) -> Dict[str, Any]:
+        dispositivos = []
+        for linha in (linha.strip() for linha in texto.splitlines()):
+            if not linha:
+                continue
+            if _ARTIGO_LINHA_RE.match(linha) or not dispositivos:
+                rotulo = linha.split(" ", 2)
+                dispositivos.append(
+                    {
+                        "rotulo": " ".join(rotulo[:2]) if _ARTIGO_LINHA_RE.match(linha) else None,
+                        "texto": linha,
+                        "filhos": [],
+                    }
+                )
+            else:
+                dispositivos[-1]["texto"] += f"\n{linha}"
+        return {"fonte": {}, "dispositivos": dispositivos, "anexos": [], "relacoes": []}
+
+    def _sintetizar(self, prompt: str) -> str:
+        if '"indice_final"' in prompt:
+            return json.dumps({"status": "sem_limite"})
+        documentos = [
+            {"urn_lexml": match.group("urn"), **self._sintetizar_estrutura(match.group("texto"))}
+            for match in _DOCUMENTO_LOTE_RE.finditer(prompt)
+        ]
+        if documentos:
+            return json.dumps({"documentos": documentos}, ensure_ascii=False)
+        match = _TEXTO_PROMPT_RE.search(prompt)
+        if match:
+            return json.dumps(self._sintetizar_estrutura(match.group("texto")), ensure_ascii=False)
+        return "Nenhuma divergência relevante identificada (resposta sintética do stub)."
+
+    def gerar(
+        self,
+        prompt: str,
+        *,
+        model: str,
+        generation_config: Optional[Dict[str, Any]] = None,
+    ) -> RespostaLLM:
+        gravado = self._gravacao(chave_prompt(prompt))
+        if gravado is not None:
+            resposta = RespostaLLM(**{**gravado, "modelo": model})
+        else:
+            texto = self._sintetizar(prompt)
+            resposta = RespostaLLM(
+                texto=texto,
+                modelo=model,
+                finish_reason="STOP",
+                prompt_tokens=len(prompt) // 4,
+                saida_tokens=len(texto) // 4,
+            )
+        if self.latencia_ms:
+            time.sleep(self.latencia_ms / 1000)
+        return resposta
+
+
+class GravadorProvider(LLMProvider):
+    """Encaminha ao provedor real e grava cada resposta para reprodução posterior pelo stub."""
+
+    def __init__(self, interno: LLMProvider, diretorio: Path) -> None:
+        self.interno = interno
+        self.diretorio = diretorio
+        self.nome = f"{interno.nome}+gravador"
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+
+    def gerar(
+        self,
+        prompt: str,
+        *,
+        model: str,
+        generation_config: Optional[Dict[str, Any]] = None,
+    ) -> RespostaLLM:
+        resposta = self.interno.gerar(prompt, model=model, generation_config=generation_config)
+        caminho = self.diretorio / f"{chave_prompt(prompt)}.json"
+        try:
+            caminho.write_text(json.dumps(asdict(resposta), ensure_ascii=False), encoding="utf-8")
+        except OSError as exc:
+            logging.warning("Não foi possível gravar resposta do LLM em %s: %s", caminho, exc)
+        return resposta
+
+
+PROVIDERS: Dict[str, Callable[[], LLMProvider]] = {
+    "gemini": GeminiProvider,
+    "stub": StubProvider,
+}
+
+_provider_atual: Optional[LLMProvider] = None
+_provider_lock = threading.Lock()
+
+
+def registrar_provider(nome: str, fabrica: Callable[[], LLMProvider]) -> None:
+    PROVIDERS[nome] = fabrica
+
+
+def definir_provider(provider: Optional[LLMProvider]) -> None:
+    """Substitui o provedor do processo (None volta a resolver pelo ambiente)."""
+    global _provider_atual
+    with _provider_lock:
+        _provider_atual = provider
+
+
+def obter_provider() -> LLMProvider:
+    """Provedor do processo, criado na primeira chamada conforme ATLAS_LLM_PROVIDER (padrão: gemini)."""
+    global _provider_atual
+    with _provider_lock:
+        if _provider_atual is not None:
+            return _provider_atual
+        nome = (os.getenv(PROVIDER_ENV) or "gemini").strip().lower()
+        fabrica = PROVIDERS.get(nome)
+        if fabrica is None:
+            raise LLMNotConfigured(f"Provedor de LLM desconhecido: {nome!r} (opções: {', '.join(sorted(PROVIDERS))}).")
+        provider = fabrica()
+        diretorio_gravacao = os.getenv(GRAVAR_DIR_ENV)
+        if diretorio_gravacao:
+            provider = GravadorProvider(provider, Path(diretorio_gravacao))
+        _provider_atual = provider
+        return provider
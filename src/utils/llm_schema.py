@@ -0,0 +1,150 @@
+"""Esquema JSON da saída estruturada do parser e validador pré-compilado."""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional
+
+TIPOS_RELACAO = ["altera", "revoga", "regulamenta", "consolida", "remete_a", "cita"]
+
+# O response_schema do Gemini não aceita referências recursivas; `filhos` é desenrolado até esta profundidade.
+PROFUNDIDADE_MAX = 8
+
+_STRING = {"type": "string"}
+_STRING_NULL = {"type": "string", "nullable": True}
+
+SCHEMA_ALVO = {
+    "type": "object",
+    "nullable": True,
+    "properties": {
+        "urn": _STRING_NULL,
+        "tipo_ato": _STRING_NULL,
+        "numero": _STRING_NULL,
+        "data": _STRING_NULL,
+        "dispositivo": _STRING_NULL,
+    },
+}
+
+SCHEMA_RELACAO = {
+    "type": "object",
+    "properties": {
+        "tipo": {"type": "string", "enum": TIPOS_RELACAO},
+        "alvo": SCHEMA_ALVO,
+        "descricao": _STRING_NULL,
+        "dispositivo_origem_rotulo": _STRING_NULL,
+    },
+    "required": ["tipo"],
+}
+
+SCHEMA_VERSAO = {
+    "type": "object",
+    "properties": {
+        "texto": _STRING_NULL,
+        "vigencia_inicio": _STRING_NULL,
+        "vigencia_fim": _STRING_NULL,
+        "origem_alteracao": _STRING_NULL,
+        "status_vigencia": _STRING_NULL,
+    },
+}
+
+SCHEMA_ANEXO = {
+    "type": "object",
+    "properties": {
+        "titulo": _STRING_NULL,
+        "texto": _STRING,
+    },
+    "required": ["texto"],
+}
+
+SCHEMA_FONTE = {
+    "type": "object",
+    "properties": {
+        "urn_lexml": _STRING_NULL,
+        "tipo_ato": _STRING_NULL,
+        "titulo": _STRING_NULL,
+        "ementa": _STRING_NULL,
+        "situacao_vigencia": _STRING_NULL,
+    },
+}
+
+
+def _schema_dispositivo(profundidade: int) -> Dict[str, Any]:
+    propriedades: Dict[str, Any] = {
+        "rotulo": _STRING_NULL,
+        "texto": _STRING,
+        "tipo": _STRING_NULL,
+        "relacoes": {"type": "array", "items": SCHEMA_RELACAO},
+        "versoes": {"type": "array", "items": SCHEMA_VERSAO},
+    }
+    if profundidade > 1:
+        propriedades["filhos"] = {"type": "array", "items": _schema_dispositivo(profundidade - 1)}
+    return {"type": "object", "properties": propriedades, "required": ["texto"]}
+
+
+SCHEMA_ESTRUTURA = {
+    "type": "object",
+    "properties": {
+        "fonte": SCHEMA_FONTE,
+        "dispositivos": {"type": "array", "items": _schema_dispositivo(PROFUNDIDADE_MAX)},
+        "anexos": {"type": "array", "items": SCHEMA_ANEXO},
+        "relacoes": {"type": "array", "items": SCHEMA_RELACAO},
+    },
+    "required": ["dispositivos"],
+}
+
+
+Validador = Callable[[Any, str, List[str]], None]
+
+_TIPOS_PY = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+}
+
+
+def _compilar(schema: Dict[str, Any]) -> Validador:
+    """Transforma o esquema em uma cadeia de closures, evitando reinterpretá-lo a cada validação."""
+    tipo = schema.get("type")
+    tipo_py = _TIPOS_PY.get(tipo) if tipo else None
+    nullable = bool(schema.get("nullable"))
+    enum = frozenset(schema["enum"]) if schema.get("enum") else None
+    obrigatorios = tuple(schema.get("required") or ())
+    propriedades = {
+        chave: _compilar(sub) for chave, sub in (schema.get("properties") or {}).items()
+    }
+    itens = _compilar(schema["items"]) if "items" in schema else None
+
+    def validar(valor: Any, caminho: str, erros: List[str]) -> None:
+        if valor is None:
+            if not nullable:
+                erros.append(f"{caminho}: valor nulo não permitido")
+            return
+        if tipo_py is not None and (not isinstance(valor, tipo_py) or isinstance(valor, bool) and tipo != "boolean"):
+            erros.append(f"{caminho}: esperado {tipo}, recebido {type(valor).__name__}")
+            return
+        if enum is not None and valor not in enum:
+            erros.append(f"{caminho}: valor {valor!r} fora de {sorted(enum)}")
+        if propriedades or obrigatorios:
+            for chave in obrigatorios:
+                if chave not in valor:
+                    erros.append(f"{caminho}.{chave}: campo obrigatório ausente")
+            for chave, sub in propriedades.items():
+                if chave in valor:
+                    sub(valor[chave], f"{caminho}.{chave}", erros)
+        if itens is not None:
+            for indice, item in enumerate(valor):
+                itens(item, f"{caminho}[{indice}]", erros)
+
+    return validar
+
+
+_validador_estrutura = _compilar(SCHEMA_ESTRUTURA)
+
+
+def validar_estrutura(payload: Any, *, max_erros: Optional[int] = 20) -> List[str]:
+    """Retorna a lista de violações do esquema (vazia quando o payload é válido)."""
+    erros: List[str] = []
+    _validador_estrutura(payload, "$", erros)
+    return erros if max_erros is None else erros[:max_erros]
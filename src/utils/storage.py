@@ -6,8 +6,10 @@ import os
 import time
 from pathlib import PurePosixPath
 import unicodedata
-from typing import Optional
+from typing import Iterator, Optional, Union
+from urllib.parse import quote
 
+import requests
 from dotenv import load_dotenv
 from supabase import Client, create_client
 
@@ -70,11 +72,30 @@ def _split_bucket_path(path: str):
     return bucket, key
 
 
-def download_text(path: str) -> str:
+def download_bytes(path: str) -> bytes:
     client = _get_client()
     bucket, key = _split_bucket_path(path)
-    data = client.storage.from_(bucket).download(key)
-    return data.decode("utf-8")
+    return client.storage.from_(bucket).download(key)
+
+
+def download_stream(path: str, *, tamanho_bloco: int = 256 * 1024) -> Iterator[bytes]:
+    """Baixa o objeto em blocos (GET autenticado na API de storage), sem manter o arquivo inteiro."""
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if not url or not key:
+        raise RuntimeError("SUPABASE_URL e SUPABASE_SERVICE_ROLE_KEY são obrigatórios")
+    bucket, chave = _split_bucket_path(path)
+    endpoint = f"{url.rstrip('/')}/storage/v1/object/{bucket}/{quote(chave)}"
+    headers = {"Authorization": f"Bearer {key}", "apikey": key}
+    with requests.get(endpoint, headers=headers, stream=True, timeout=60) as resposta:
+        resposta.raise_for_status()
+        for bloco in resposta.iter_content(chunk_size=tamanho_bloco):
+            if bloco:
+                yield bloco
+
+
+def download_text(path: str) -> str:
+    return download_bytes(path).decode("utf-8")
 
 
 def build_parser_json_path(urn: str) -> str:
@@ -84,14 +105,14 @@ def build_parser_json_path(urn: str) -> str:
     return f"{BUCKET_PARSER_JSON}/{chave}.json"
 
 
-def upload_parser_json(urn: str, content: str) -> str:
+def upload_parser_json(urn: str, content: Union[bytes, str]) -> str:
     client = _get_client()
     path = build_parser_json_path(urn)
     relative_path = path[len(BUCKET_PARSER_JSON) + 1 :]
     bucket = client.storage.from_(BUCKET_PARSER_JSON)
     bucket.upload(
         relative_path,
-        content.encode("utf-8"),
+        content.encode("utf-8") if isinstance(content, str) else content,
         file_options={"content-type": "application/json", "upsert": "true"},
     )
     return path
@@ -0,0 +1,254 @@
+"""Telemetria das chamadas ao LLM: latência, tokens, tentativas e custo por URN/chunk.
+
+Cada chamada ao provedor gera um `ChamadaLLM`, mantido em memória até ser consumido pelo parser
+(resumo e agregados por execução) e, se `ATLAS_TELEMETRIA_ARQUIVO` estiver definido, gravado
+como uma linha JSON nesse arquivo. Para relatórios sobre o arquivo:
+
+    python -m src.utils.telemetria caminho/telemetria.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import math
+import os
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+ARQUIVO_ENV = "ATLAS_TELEMETRIA_ARQUIVO"
+
+# Preço público (USD por milhão de tokens: entrada, saída) usado só para estimar custo relativo.
+PRECOS_USD_POR_MILHAO: Dict[str, Tuple[float, float]] = {
+    "gemini-1.5-pro": (1.25, 5.00),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-2.5-flash": (0.30, 2.50),
+}
+
+RESULTADOS_FALHA = {"erro", "vazia", "json_invalido", "fora_do_esquema"}
+
+
+@dataclass
+class ChamadaLLM:
+    """Uma chamada ao provedor; `resultado` é ajustado pelo chamador após interpretar a resposta."""
+
+    operacao: str
+    modelo: str
+    urn_lexml: Optional[str] = None
+    chunk_indice: Optional[int] = None
+    tentativa: int = 1
+    provedor: Optional[str] = None
+    latencia_ms: float = 0.0
+    prompt_chars: int = 0
+    texto_bytes: int = 0
+    prompt_tokens: int = 0
+    saida_tokens: int = 0
+    tokens_estimados: bool = False
+    resultado: str = "ok"
+    erro: Optional[str] = None
+    custo_usd: float = 0.0
+    momento: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+
+
+_chamadas: List[ChamadaLLM] = []
+_lock = threading.Lock()
+
+
+def _preco(modelo: str) -> Tuple[float, float]:
+    nome = modelo.split("/")[-1]
+    for chave in sorted(PRECOS_USD_POR_MILHAO, key=len, reverse=True):
+        if nome.startswith(chave):
+            return PRECOS_USD_POR_MILHAO[chave]
+    return 0.0, 0.0
+
+
+def custo_estimado(modelo: str, prompt_tokens: int, saida_tokens: int) -> float:
+    preco_entrada, preco_saida = _preco(modelo)
+    return (prompt_tokens * preco_entrada + saida_tokens * preco_saida) / 1_000_000
+
+
+def _gravar_linha(chamada: ChamadaLLM) -> None:
+    caminho = os.getenv(ARQUIVO_ENV)
+    if not caminho:
+        return
+    try:
+        destino = Path(caminho)
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        with destino.open("a", encoding="utf-8") as arquivo:
+            arquivo.write(json.dumps(asdict(chamada), ensure_ascii=False) + "\n")
+    except OSError as exc:
+        logging.warning("Não foi possível gravar telemetria do LLM em %s: %s", caminho, exc)
+
+
+def registrar(chamada: ChamadaLLM) -> None:
+    chamada.custo_usd = round(custo_estimado(chamada.modelo, chamada.prompt_tokens, chamada.saida_tokens), 6)
+    with _lock:
+        _chamadas.append(chamada)
+        _gravar_linha(chamada)
+
+
+@contextmanager
+def medir(
+    operacao: str,
+    *,
+    modelo: str,
+    urn_lexml: Optional[str] = None,
+    chunk_indice: Optional[int] = None,
+    tentativa: int = 1,
+) -> Iterator[ChamadaLLM]:
+    """Registra a chamada ao sair do bloco; exceções marcam o resultado como `erro` e são propagadas."""
+    chamada = ChamadaLLM(
+        operacao=operacao,
+        modelo=modelo,
+        urn_lexml=urn_lexml,
+        chunk_indice=chunk_indice,
+        tentativa=tentativa,
+    )
+    try:
+        yield chamada
+    except Exception as exc:
+        chamada.resultado = "erro"
+        chamada.erro = f"{type(exc).__name__}: {exc}"[:300]
+        raise
+    finally:
+        registrar(chamada)
+
+
+def consumir() -> List[ChamadaLLM]:
+    """Retorna e esvazia as chamadas acumuladas em memória."""
+    with _lock:
+        chamadas = list(_chamadas)
+        _chamadas.clear()
+    return chamadas
+
+
+def _percentil(valores: List[float], p: float) -> float:
+    """Percentil pelo método nearest-rank (valores já ordenados)."""
+    if not valores:
+        return 0.0
+    posicao = max(0, math.ceil(p / 100 * len(valores)) - 1)
+    return valores[min(posicao, len(valores) - 1)]
+
+
+def resumir(chamadas: Iterable[ChamadaLLM]) -> Dict[str, Dict]:
+    """Resumo por `operacao/modelo`: chamadas, falhas, p50/p95 de latência, tokens por KB e custo."""
+    grupos: Dict[str, List[ChamadaLLM]] = defaultdict(list)
+    for chamada in chamadas:
+        grupos[f"{chamada.operacao}/{chamada.modelo}"].append(chamada)
+
+    resumo: Dict[str, Dict] = {}
+    for chave, itens in sorted(grupos.items()):
+        latencias = sorted(item.latencia_ms for item in itens)
+        kb_entrada = sum(item.texto_bytes for item in itens) / 1024
+        prompt_tokens = sum(item.prompt_tokens for item in itens)
+        saida_tokens = sum(item.saida_tokens for item in itens)
+        resumo[chave] = {
+            "chamadas": len(itens),
+            "falhas": sum(1 for item in itens if item.resultado in RESULTADOS_FALHA),
+            "retentativas": sum(1 for item in itens if item.tentativa > 1),
+            "latencia_p50_ms": round(_percentil(latencias, 50), 1),
+            "latencia_p95_ms": round(_percentil(latencias, 95), 1),
+            "prompt_tokens": prompt_tokens,
+            "saida_tokens": saida_tokens,
+            "prompt_tokens_por_kb": round(prompt_tokens / kb_entrada, 1) if kb_entrada else None,
+            "saida_tokens_por_kb": round(saida_tokens / kb_entrada, 1) if kb_entrada else None,
+            "custo_usd": round(sum(item.custo_usd for item in itens), 4),
+        }
+    return resumo
+
+
+def formatar_resumo(resumo: Dict[str, Dict]) -> str:
+    if not resumo:
+        return "Nenhuma chamada ao LLM registrada."
+    linhas = [
+        f"{'operação/modelo':<40} {'chamadas':>8} {'falhas':>6} {'p50 ms':>9} {'p95 ms':>9} "
+        f"{'tok.ent/KB':>10} {'tok.saí/KB':>10} {'USD':>9}"
+    ]
+    for chave, dados in resumo.items():
+        linhas.append(
+            f"{chave:<40} {dados['chamadas']:>8} {dados['falhas']:>6} {dados['latencia_p50_ms']:>9} "
+            f"{dados['latencia_p95_ms']:>9} {dados['prompt_tokens_por_kb'] or '-':>10} "
+            f"{dados['saida_tokens_por_kb'] or '-':>10} {dados['custo_usd']:>9}"
+        )
+    return "\n".join(linhas)
+
+
+def agregar(
+    chamadas: Iterable[ChamadaLLM],
+    *,
+    execucao_id: str,
+    fonte_origem_id: Optional[str] = None,
+) -> List[Dict]:
+    """Linhas para `llm_telemetria`, uma por (URN, chunk, operação, modelo)."""
+    grupos: Dict[Tuple, List[ChamadaLLM]] = defaultdict(list)
+    for chamada in chamadas:
+        grupos[(chamada.urn_lexml, chamada.chunk_indice, chamada.operacao, chamada.modelo)].append(chamada)
+
+    linhas: List[Dict] = []
+    for (urn, chunk_indice, operacao, modelo), itens in grupos.items():
+        linhas.append(
+            {
+                "execucao_id": execucao_id,
+                "fonte_origem_id": fonte_origem_id,
+                "urn_lexml": urn,
+                "chunk_indice": chunk_indice,
+                "operacao": operacao,
+                "modelo": modelo,
+                "chamadas": len(itens),
+                "tentativas_max": max(item.tentativa for item in itens),
+                "falhas": sum(1 for item in itens if item.resultado in RESULTADOS_FALHA),
+                "latencia_ms_total": round(sum(item.latencia_ms for item in itens), 1),
+                "latencia_ms_max": round(max(item.latencia_ms for item in itens), 1),
+                "prompt_tokens": sum(item.prompt_tokens for item in itens),
+                "saida_tokens": sum(item.saida_tokens for item in itens),
+                "tokens_estimados": any(item.tokens_estimados for item in itens),
+                "texto_bytes": sum(item.texto_bytes for item in itens),
+                "custo_usd": round(sum(item.custo_usd for item in itens), 6),
+            }
+        )
+    return linhas
+
+
+def ler_arquivo(caminho: Path) -> List[ChamadaLLM]:
+    nomes = {campo.name for campo in fields(ChamadaLLM)}
+    chamadas: List[ChamadaLLM] = []
+    with caminho.open(encoding="utf-8") as arquivo:
+        for linha in arquivo:
+            linha = linha.strip()
+            if not linha:
+                continue
+            try:
+                dados = json.loads(linha)
+            except json.JSONDecodeError:
+                continue
+            chamadas.append(ChamadaLLM(**{chave: valor for chave, valor in dados.items() if chave in nomes}))
+    return chamadas
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Resumo da telemetria de chamadas ao LLM.")
+    parser.add_argument("arquivo", nargs="?", help=f"Arquivo JSONL (padrão: ${ARQUIVO_ENV}).")
+    parser.add_argument("--urn", help="Filtra as chamadas de uma URN.")
+    parser.add_argument("--json", action="store_true", help="Imprime o resumo em JSON.")
+    args = parser.parse_args(argv)
+
+    caminho = args.arquivo or os.getenv(ARQUIVO_ENV)
+    if not caminho:
+        raise SystemExit(f"Informe o arquivo de telemetria ou defina {ARQUIVO_ENV}.")
+    chamadas = ler_arquivo(Path(caminho))
+    if args.urn:
+        chamadas = [chamada for chamada in chamadas if chamada.urn_lexml == args.urn]
+    resumo = resumir(chamadas)
+    print(json.dumps(resumo, ensure_ascii=False, indent=2) if args.json else formatar_resumo(resumo))
+
+
+if __name__ == "__main__":
+    main()
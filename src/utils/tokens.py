@@ -0,0 +1,157 @@
+"""Estimativa local de tokens e orçamento por modelo para dimensionar chunks do parser."""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import threading
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Dict, Optional
+
+CALIBRACAO_ENV = "ATLAS_CALIBRACAO_TOKENS"
+
+# Peso das novas observações na média móvel exponencial da calibração.
+PESO_OBSERVACAO = 0.3
+
+
+@dataclass(frozen=True)
+class PerfilModelo:
+    """Limites de janela e parâmetros de estimativa de um modelo LLM."""
+
+    nome: str
+    max_input_tokens: int
+    max_output_tokens: int
+    chars_por_token: float = 3.6
+    # Tokens de saída (JSON) gerados por token de texto bruto enviado.
+    fator_saida: float = 2.5
+    # Fração do orçamento de saída reservada para imprevistos (metadados, relações, versões).
+    margem_saida: float = 0.15
+
+
+PERFIL_PADRAO = PerfilModelo(nome="padrao", max_input_tokens=32_000, max_output_tokens=8_192)
+
+PERFIS_MODELO: Dict[str, PerfilModelo] = {
+    "gemini-1.5-pro": PerfilModelo("gemini-1.5-pro", 2_097_152, 8_192),
+    "gemini-1.5-flash": PerfilModelo("gemini-1.5-flash", 1_048_576, 8_192),
+    "gemini-2.0-flash": PerfilModelo("gemini-2.0-flash", 1_048_576, 8_192),
+    "gemini-2.5-pro": PerfilModelo("gemini-2.5-pro", 1_048_576, 65_536),
+    "gemini-2.5-flash": PerfilModelo("gemini-2.5-flash", 1_048_576, 65_536),
+}
+
+_calibracao: Dict[str, Dict[str, float]] = {}
+_calibracao_carregada = False
+_lock = threading.Lock()
+
+
+def _caminho_calibracao() -> Optional[Path]:
+    caminho = os.getenv(CALIBRACAO_ENV)
+    return Path(caminho) if caminho else None
+
+
+def _carregar_calibracao() -> None:
+    global _calibracao_carregada
+    if _calibracao_carregada:
+        return
+    _calibracao_carregada = True
+    caminho = _caminho_calibracao()
+    if not caminho or not caminho.exists():
+        return
+    try:
+        dados = json.loads(caminho.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as exc:
+        logging.warning("Calibração de tokens ignorada (%s): %s", caminho, exc)
+        return
+    if isinstance(dados, dict):
+        _calibracao.update({k: v for k, v in dados.items() if isinstance(v, dict)})
+
+
+def salvar_calibracao() -> None:
+    """Persiste a calibração observada no arquivo indicado por ATLAS_CALIBRACAO_TOKENS."""
+    caminho = _caminho_calibracao()
+    if not caminho:
+        return
+    with _lock:
+        conteudo = json.dumps(_calibracao, ensure_ascii=False, indent=2, sort_keys=True)
+    try:
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        caminho.write_text(conteudo, encoding="utf-8")
+    except OSError as exc:
+        logging.warning("Não foi possível salvar a calibração de tokens em %s: %s", caminho, exc)
+
+
+def _perfil_base(model: Optional[str]) -> PerfilModelo:
+    nome = (model or os.getenv("GEMINI_MODEL") or "gemini-1.5-pro").strip()
+    nome_curto = nome.split("/")[-1]
+    if nome_curto in PERFIS_MODELO:
+        return PERFIS_MODELO[nome_curto]
+    # Variantes com sufixo de versão (ex.: gemini-1.5-pro-002) herdam o perfil da família.
+    for chave in sorted(PERFIS_MODELO, key=len, reverse=True):
+        if nome_curto.startswith(chave):
+            return replace(PERFIS_MODELO[chave], nome=nome_curto)
+    return replace(PERFIL_PADRAO, nome=nome_curto)
+
+
+def obter_perfil(model: Optional[str] = None) -> PerfilModelo:
+    """Retorna o perfil do modelo com a calibração observada aplicada."""
+    perfil = _perfil_base(model)
+    with _lock:
+        _carregar_calibracao()
+        ajuste = dict(_calibracao.get(perfil.nome) or {})
+    campos = {}
+    if ajuste.get("chars_por_token"):
+        campos["chars_por_token"] = float(ajuste["chars_por_token"])
+    if ajuste.get("fator_saida"):
+        campos["fator_saida"] = float(ajuste["fator_saida"])
+    return replace(perfil, **campos) if campos else perfil
+
+
+def estimar_tokens(texto: str, perfil: Optional[PerfilModelo] = None) -> int:
+    """Estimativa local de tokens a partir da razão caracteres/token calibrada."""
+    if not texto:
+        return 0
+    perfil = perfil or obter_perfil()
+    return int(math.ceil(len(texto) / perfil.chars_por_token))
+
+
+def _media_movel(anterior: Optional[float], observado: float) -> float:
+    if not anterior:
+        return observado
+    return anterior * (1 - PESO_OBSERVACAO) + observado * PESO_OBSERVACAO
+
+
+def registrar_uso(
+    model: Optional[str],
+    *,
+    prompt_chars: int,
+    prompt_tokens: Optional[int],
+    texto_chars: int,
+    saida_tokens: Optional[int],
+    truncado: bool = False,
+) -> None:
+    """Atualiza a calibração com a contagem real informada pelo provedor (usage metadata)."""
+    perfil = _perfil_base(model)
+    with _lock:
+        _carregar_calibracao()
+        atual = _calibracao.setdefault(perfil.nome, {})
+        if prompt_tokens and prompt_chars:
+            atual["chars_por_token"] = round(
+                _media_movel(atual.get("chars_por_token"), prompt_chars / prompt_tokens), 4
+            )
+        chars_por_token = atual.get("chars_por_token") or perfil.chars_por_token
+        # Respostas truncadas subestimam a expansão; só calibramos com saídas completas.
+        if saida_tokens and texto_chars and not truncado:
+            texto_tokens = texto_chars / chars_por_token
+            atual["fator_saida"] = round(_media_movel(atual.get("fator_saida"), saida_tokens / texto_tokens), 4)
+        atual["observacoes"] = int(atual.get("observacoes", 0)) + 1
+
+
+def calcular_max_chars(perfil: PerfilModelo, *, tokens_prompt_fixo: int) -> int:
+    """Maior trecho de texto bruto (em caracteres) que cabe nas janelas de entrada e saída."""
+    orcamento_saida = perfil.max_output_tokens * (1 - perfil.margem_saida)
+    tokens_por_saida = orcamento_saida / max(perfil.fator_saida, 0.1)
+    tokens_por_entrada = perfil.max_input_tokens - tokens_prompt_fixo - perfil.max_output_tokens
+    tokens_texto = max(min(tokens_por_saida, tokens_por_entrada), 0)
+    return int(tokens_texto * perfil.chars_por_token)
@@ -0,0 +1,32 @@
+-- Migração 007: Telemetria agregada das chamadas ao LLM por URN e chunk
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.llm_telemetria (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    execucao_id UUID NOT NULL,
+    fonte_origem_id UUID REFERENCES public.fonte_origem(id) ON DELETE SET NULL,
+    urn_lexml VARCHAR(255),
+    chunk_indice INTEGER,
+    operacao TEXT NOT NULL,
+    modelo TEXT NOT NULL,
+    chamadas INTEGER NOT NULL,
+    tentativas_max INTEGER NOT NULL DEFAULT 1,
+    falhas INTEGER NOT NULL DEFAULT 0,
+    latencia_ms_total NUMERIC(14, 1) NOT NULL DEFAULT 0,
+    latencia_ms_max NUMERIC(14, 1) NOT NULL DEFAULT 0,
+    prompt_tokens BIGINT NOT NULL DEFAULT 0,
+    saida_tokens BIGINT NOT NULL DEFAULT 0,
+    tokens_estimados BOOLEAN NOT NULL DEFAULT FALSE,
+    texto_bytes BIGINT NOT NULL DEFAULT 0,
+    custo_usd NUMERIC(12, 6) NOT NULL DEFAULT 0,
+    criado_em TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+COMMENT ON TABLE public.llm_telemetria IS 'Uma linha por (execução, URN, chunk, operação, modelo) do parser; custo estimado por tabela de preços local.';
+
+CREATE INDEX IF NOT EXISTS llm_telemetria_urn_idx ON public.llm_telemetria (urn_lexml, chunk_indice);
+CREATE INDEX IF NOT EXISTS llm_telemetria_execucao_idx ON public.llm_telemetria (execucao_id);
+CREATE INDEX IF NOT EXISTS llm_telemetria_modelo_idx ON public.llm_telemetria (modelo, criado_em DESC);
+
+COMMIT;
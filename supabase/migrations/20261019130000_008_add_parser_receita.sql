@@ -0,0 +1,16 @@
+-- Migração 008: Receita do último parsing (hash do texto, prompt/modelo) para reprocessamento incremental
+
+BEGIN;
+
+ALTER TABLE public.fonte_documento
+    ADD COLUMN IF NOT EXISTS parser_hash_texto_bruto VARCHAR(64),
+    ADD COLUMN IF NOT EXISTS parser_receita VARCHAR(64),
+    ADD COLUMN IF NOT EXISTS parser_receita_detalhes JSONB;
+
+COMMENT ON COLUMN public.fonte_documento.parser_hash_texto_bruto IS 'hash_texto_bruto do texto que gerou caminho_parser_json.';
+COMMENT ON COLUMN public.fonte_documento.parser_receita IS 'Chave da receita (método, versão do prompt/regras, modelo) que gerou caminho_parser_json.';
+
+CREATE INDEX IF NOT EXISTS fonte_documento_parsing_idx
+    ON public.fonte_documento (fonte_origem_id, status_parsing);
+
+COMMIT;
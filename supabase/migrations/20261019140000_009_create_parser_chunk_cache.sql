@@ -0,0 +1,19 @@
+-- Migração 009: Cache de resultados do LLM por chunk (hash do texto + modelo + versão do prompt)
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.parser_chunk_cache (
+    chave VARCHAR(64) PRIMARY KEY,
+    tipo VARCHAR(20) NOT NULL,
+    modelo TEXT,
+    versao_prompt VARCHAR(32),
+    hash_texto VARCHAR(64) NOT NULL,
+    resultado JSONB NOT NULL,
+    criado_em TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+COMMENT ON TABLE public.parser_chunk_cache IS 'Resultados do LLM (estrutura ou limite de chunk) reaproveitados entre execuções do parser.';
+
+CREATE INDEX IF NOT EXISTS parser_chunk_cache_criado_idx ON public.parser_chunk_cache (criado_em);
+
+COMMIT;
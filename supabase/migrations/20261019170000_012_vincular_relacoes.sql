@@ -0,0 +1,251 @@
+-- Migração 012: Vínculo das relações normativas com atos e dispositivos já carregados
+
+BEGIN;
+
+-- ato_alvo_id/dispositivo_alvo_id são preenchidos pelo vinculador (src/loader/vinculos.py) a partir
+-- de urn_alvo (normalizada) e de id_lexml_alvo, o dispositivo citado convertido pelo loader.
+-- vinculo_verificado_em marca as relações já examinadas: só as novas entram na passada incremental.
+ALTER TABLE public.dispositivo_relacao
+    ADD COLUMN IF NOT EXISTS ato_alvo_id UUID REFERENCES public.ato_normativo(id) ON DELETE SET NULL,
+    ADD COLUMN IF NOT EXISTS id_lexml_alvo VARCHAR(255),
+    ADD COLUMN IF NOT EXISTS vinculo_verificado_em TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS dispositivo_relacao_ato_alvo_idx ON public.dispositivo_relacao (ato_alvo_id);
+CREATE INDEX IF NOT EXISTS dispositivo_relacao_urn_alvo_idx ON public.dispositivo_relacao (urn_alvo)
+    WHERE ato_alvo_id IS NULL;
+CREATE INDEX IF NOT EXISTS dispositivo_relacao_pendente_idx ON public.dispositivo_relacao (id)
+    WHERE vinculo_verificado_em IS NULL;
+
+-- Mesma carga da migração 011, agora gravando id_lexml_alvo das relações.
+CREATE OR REPLACE FUNCTION public.carregar_ato_normativo(
+    p_ato JSONB,
+    p_dispositivos JSONB DEFAULT '[]'::jsonb,
+    p_versoes JSONB DEFAULT '[]'::jsonb,
+    p_anexos JSONB DEFAULT '[]'::jsonb,
+    p_relacoes JSONB DEFAULT '[]'::jsonb,
+    p_remover JSONB DEFAULT '[]'::jsonb
+)
+RETURNS UUID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_ato_id UUID;
+BEGIN
+    INSERT INTO public.ato_normativo (
+        fonte_documento_id,
+        urn_lexml,
+        tipo_ato,
+        titulo,
+        ementa,
+        orgao_publicador,
+        data_legislacao,
+        data_publicacao,
+        status_vigencia,
+        hash_texto_bruto,
+        hash_json_estruturado,
+        metadata_extra
+    )
+    SELECT
+        a.fonte_documento_id,
+        a.urn_lexml,
+        a.tipo_ato,
+        a.titulo,
+        a.ementa,
+        a.orgao_publicador,
+        a.data_legislacao,
+        a.data_publicacao,
+        a.status_vigencia,
+        a.hash_texto_bruto,
+        a.hash_json_estruturado,
+        COALESCE(a.metadata_extra, '{}'::jsonb)
+    FROM jsonb_to_record(p_ato) AS a(
+        fonte_documento_id UUID,
+        urn_lexml VARCHAR(255),
+        tipo_ato VARCHAR(80),
+        titulo TEXT,
+        ementa TEXT,
+        orgao_publicador VARCHAR(160),
+        data_legislacao DATE,
+        data_publicacao DATE,
+        status_vigencia VARCHAR(32),
+        hash_texto_bruto VARCHAR(64),
+        hash_json_estruturado VARCHAR(64),
+        metadata_extra JSONB
+    )
+    ON CONFLICT (fonte_documento_id) DO UPDATE SET
+        urn_lexml = EXCLUDED.urn_lexml,
+        tipo_ato = EXCLUDED.tipo_ato,
+        titulo = EXCLUDED.titulo,
+        ementa = EXCLUDED.ementa,
+        orgao_publicador = EXCLUDED.orgao_publicador,
+        data_legislacao = EXCLUDED.data_legislacao,
+        data_publicacao = EXCLUDED.data_publicacao,
+        status_vigencia = EXCLUDED.status_vigencia,
+        hash_texto_bruto = EXCLUDED.hash_texto_bruto,
+        hash_json_estruturado = EXCLUDED.hash_json_estruturado,
+        metadata_extra = EXCLUDED.metadata_extra,
+        atualizado_em = NOW()
+    RETURNING id INTO v_ato_id;
+
+    DELETE FROM public.dispositivo_relacao WHERE ato_id = v_ato_id;
+    DELETE FROM public.anexo WHERE ato_id = v_ato_id;
+
+    -- Upsert antes da remoção: dispositivos mantidos já apontam para o novo pai quando o antigo
+    -- for removido (parent_id tem ON DELETE CASCADE).
+    INSERT INTO public.dispositivo (id, ato_id, parent_id, id_lexml, tipo, rotulo, texto, ordem, atributos, hash_texto)
+    SELECT
+        d.id,
+        v_ato_id,
+        d.parent_id,
+        d.id_lexml,
+        d.tipo::public.tipo_dispositivo,
+        d.rotulo,
+        d.texto,
+        d.ordem,
+        COALESCE(d.atributos, '{}'::jsonb),
+        d.hash_texto
+    FROM jsonb_to_recordset(p_dispositivos) AS d(
+        id UUID,
+        parent_id UUID,
+        id_lexml VARCHAR(255),
+        tipo TEXT,
+        rotulo VARCHAR(160),
+        texto TEXT,
+        ordem INTEGER,
+        atributos JSONB,
+        hash_texto VARCHAR(64)
+    )
+    ON CONFLICT (id) DO UPDATE SET
+        parent_id = EXCLUDED.parent_id,
+        id_lexml = EXCLUDED.id_lexml,
+        tipo = EXCLUDED.tipo,
+        rotulo = EXCLUDED.rotulo,
+        texto = EXCLUDED.texto,
+        ordem = EXCLUDED.ordem,
+        atributos = EXCLUDED.atributos,
+        hash_texto = EXCLUDED.hash_texto,
+        atualizado_em = NOW();
+
+    DELETE FROM public.dispositivo
+    WHERE ato_id = v_ato_id
+      AND id IN (SELECT value::uuid FROM jsonb_array_elements_text(p_remover));
+
+    INSERT INTO public.versao_textual (
+        dispositivo_id,
+        hash_texto,
+        texto,
+        vigencia_inicio,
+        vigencia_fim,
+        origem_alteracao,
+        status_vigencia,
+        anotacoes
+    )
+    SELECT
+        v.dispositivo_id,
+        v.hash_texto,
+        v.texto,
+        v.vigencia_inicio,
+        v.vigencia_fim,
+        v.origem_alteracao,
+        v.status_vigencia,
+        COALESCE(v.anotacoes, '{}'::jsonb)
+    FROM jsonb_to_recordset(p_versoes) AS v(
+        dispositivo_id UUID,
+        hash_texto VARCHAR(64),
+        texto TEXT,
+        vigencia_inicio DATE,
+        vigencia_fim DATE,
+        origem_alteracao VARCHAR(160),
+        status_vigencia VARCHAR(32),
+        anotacoes JSONB
+    )
+    ON CONFLICT (dispositivo_id, hash_texto) DO UPDATE SET
+        texto = EXCLUDED.texto,
+        vigencia_inicio = EXCLUDED.vigencia_inicio,
+        vigencia_fim = EXCLUDED.vigencia_fim,
+        origem_alteracao = EXCLUDED.origem_alteracao,
+        status_vigencia = EXCLUDED.status_vigencia,
+        anotacoes = EXCLUDED.anotacoes
+    WHERE (versao_textual.texto, versao_textual.vigencia_inicio, versao_textual.vigencia_fim,
+           versao_textual.origem_alteracao, versao_textual.status_vigencia, versao_textual.anotacoes)
+        IS DISTINCT FROM
+          (EXCLUDED.texto, EXCLUDED.vigencia_inicio, EXCLUDED.vigencia_fim,
+           EXCLUDED.origem_alteracao, EXCLUDED.status_vigencia, EXCLUDED.anotacoes);
+
+    INSERT INTO public.anexo (ato_id, id_lexml, titulo, texto, ordem, hash_texto)
+    SELECT v_ato_id, x.id_lexml, x.titulo, x.texto, x.ordem, x.hash_texto
+    FROM jsonb_to_recordset(p_anexos) AS x(
+        id_lexml VARCHAR(255),
+        titulo TEXT,
+        texto TEXT,
+        ordem INTEGER,
+        hash_texto VARCHAR(64)
+    );
+
+    INSERT INTO public.dispositivo_relacao (
+        ato_id,
+        dispositivo_origem_id,
+        dispositivo_alvo_id,
+        urn_alvo,
+        id_lexml_alvo,
+        tipo,
+        descricao
+    )
+    SELECT
+        v_ato_id,
+        r.dispositivo_origem_id,
+        r.dispositivo_alvo_id,
+        r.urn_alvo,
+        r.id_lexml_alvo,
+        r.tipo::public.tipo_relacao_normativa,
+        r.descricao
+    FROM jsonb_to_recordset(p_relacoes) AS r(
+        dispositivo_origem_id UUID,
+        dispositivo_alvo_id UUID,
+        urn_alvo VARCHAR(255),
+        id_lexml_alvo VARCHAR(255),
+        tipo TEXT,
+        descricao TEXT
+    );
+
+    RETURN v_ato_id;
+END;
+$$;
+
+COMMENT ON FUNCTION public.carregar_ato_normativo(JSONB, JSONB, JSONB, JSONB, JSONB, JSONB)
+    IS 'Carga transacional e incremental de um ato: upsert dos dispositivos novos/alterados, remoção dos ausentes e substituição de anexos e relações.';
+
+-- Aplica, num único UPDATE, os alvos resolvidos pelo vinculador. Relações sem alvo encontrado também
+-- são enviadas (ids nulos) para ficarem marcadas como verificadas.
+CREATE OR REPLACE FUNCTION public.vincular_relacoes(p_vinculos JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_total INTEGER;
+BEGIN
+    UPDATE public.dispositivo_relacao AS r
+    SET
+        ato_alvo_id = v.ato_alvo_id,
+        dispositivo_alvo_id = COALESCE(v.dispositivo_alvo_id, r.dispositivo_alvo_id),
+        urn_alvo = COALESCE(v.urn_alvo, r.urn_alvo),
+        id_lexml_alvo = COALESCE(r.id_lexml_alvo, v.id_lexml_alvo),
+        vinculo_verificado_em = NOW()
+    FROM jsonb_to_recordset(p_vinculos) AS v(
+        id UUID,
+        ato_alvo_id UUID,
+        dispositivo_alvo_id UUID,
+        urn_alvo VARCHAR(255),
+        id_lexml_alvo VARCHAR(255)
+    )
+    WHERE r.id = v.id;
+
+    GET DIAGNOSTICS v_total = ROW_COUNT;
+    RETURN v_total;
+END;
+$$;
+
+COMMENT ON FUNCTION public.vincular_relacoes(JSONB)
+    IS 'Grava em lote os atos/dispositivos alvo resolvidos para dispositivo_relacao e marca as relações como verificadas.';
+
+COMMIT;
@@ -0,0 +1,114 @@
+-- Migração 013: Texto consolidado de um ato em uma data (índice de intervalos sobre versao_textual)
+
+BEGIN;
+
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+-- Intervalo de vigência de cada versão, com as duas pontas inclusivas (vigencia_fim é o último dia
+-- em vigor); pontas nulas viram intervalo aberto. Fim anterior ao início (dado inconsistente vindo
+-- do LLM) fica com vigencia nula em vez de abortar a gravação: daterange() rejeitaria a linha.
+ALTER TABLE public.versao_textual
+    ADD COLUMN IF NOT EXISTS vigencia DATERANGE
+    GENERATED ALWAYS AS (
+        CASE
+            WHEN vigencia_inicio IS NULL OR vigencia_fim IS NULL OR vigencia_fim >= vigencia_inicio
+                THEN daterange(vigencia_inicio, vigencia_fim, '[]')
+        END
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS versao_textual_vigencia_gist_idx
+    ON public.versao_textual USING GIST (dispositivo_id, vigencia);
+
+-- Dispositivos do ato em vigor na data, com o texto da versão aplicável. Sem versões, o dispositivo
+-- vale com o texto original; com versões e nenhuma cobrindo a data, ele não estava em vigor. Quando
+-- duas versões se sobrepõem (fim de uma = início da seguinte), vence a de início mais recente.
+-- Paginação por chave (`p_apos_ordem`, `p_apos_id`): o PostgREST corta respostas em `max_rows`.
+CREATE OR REPLACE FUNCTION public.texto_consolidado(
+    p_ato_id UUID,
+    p_data DATE,
+    p_apos_ordem INTEGER DEFAULT NULL,
+    p_apos_id UUID DEFAULT NULL,
+    p_limite INTEGER DEFAULT 1000
+)
+RETURNS TABLE (
+    id UUID,
+    parent_id UUID,
+    id_lexml VARCHAR(255),
+    tipo public.tipo_dispositivo,
+    rotulo VARCHAR(160),
+    ordem INTEGER,
+    texto TEXT,
+    versao_id UUID,
+    vigencia_inicio DATE,
+    vigencia_fim DATE,
+    status_vigencia VARCHAR(32)
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        d.id,
+        d.parent_id,
+        d.id_lexml,
+        d.tipo,
+        d.rotulo,
+        d.ordem,
+        COALESCE(v.texto, d.texto),
+        v.id,
+        v.vigencia_inicio,
+        v.vigencia_fim,
+        v.status_vigencia
+    FROM public.dispositivo AS d
+    JOIN public.ato_normativo AS a ON a.id = d.ato_id
+    LEFT JOIN LATERAL (
+        SELECT vt.id, vt.texto, vt.vigencia_inicio, vt.vigencia_fim, vt.status_vigencia
+        FROM public.versao_textual AS vt
+        WHERE vt.dispositivo_id = d.id
+          AND vt.vigencia @> p_data
+        ORDER BY vt.vigencia_inicio DESC NULLS LAST
+        LIMIT 1
+    ) AS v ON TRUE
+    WHERE d.ato_id = p_ato_id
+      AND (p_apos_id IS NULL OR (d.ordem, d.id) > (p_apos_ordem, p_apos_id))
+      AND (a.data_legislacao IS NULL OR a.data_legislacao <= p_data)
+      AND (
+          v.id IS NOT NULL
+          OR NOT EXISTS (SELECT 1 FROM public.versao_textual AS x WHERE x.dispositivo_id = d.id)
+      )
+    ORDER BY d.ordem, d.id
+    LIMIT GREATEST(p_limite, 1);
+$$;
+
+-- Datas em que o texto consolidado do ato pode mudar: entre duas fronteiras consecutivas o
+-- resultado de texto_consolidado é o mesmo (o cliente usa isso como chave de cache).
+CREATE OR REPLACE FUNCTION public.fronteiras_vigencia(p_ato_id UUID)
+RETURNS SETOF DATE
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT DISTINCT fronteira
+    FROM (
+        SELECT a.data_legislacao AS fronteira
+        FROM public.ato_normativo AS a
+        WHERE a.id = p_ato_id
+        UNION ALL
+        SELECT vt.vigencia_inicio
+        FROM public.versao_textual AS vt
+        JOIN public.dispositivo AS d ON d.id = vt.dispositivo_id
+        WHERE d.ato_id = p_ato_id
+        UNION ALL
+        SELECT vt.vigencia_fim + 1
+        FROM public.versao_textual AS vt
+        JOIN public.dispositivo AS d ON d.id = vt.dispositivo_id
+        WHERE d.ato_id = p_ato_id
+    ) AS f
+    WHERE fronteira IS NOT NULL
+    ORDER BY fronteira;
+$$;
+
+COMMENT ON FUNCTION public.texto_consolidado(UUID, DATE, INTEGER, UUID, INTEGER)
+    IS 'Dispositivos de um ato em vigor na data informada, com o texto da versão aplicável.';
+COMMENT ON FUNCTION public.fronteiras_vigencia(UUID)
+    IS 'Datas em que o texto consolidado do ato muda (início de versões, dia seguinte ao fim e data do ato).';
+
+COMMIT;
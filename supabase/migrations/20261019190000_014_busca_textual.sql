@@ -0,0 +1,130 @@
+-- Migração 014: Busca textual em português (tsvector com unaccent + GIN) sobre dispositivos e atos
+
+BEGIN;
+
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- Configuração `portuguese` com unaccent antes do stemmer: "revogação" e "revogacao" viram o mesmo
+-- lexema. to_tsvector(regconfig, text) é imutável, então pode alimentar colunas geradas.
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'portugues_sem_acento') THEN
+        CREATE TEXT SEARCH CONFIGURATION public.portugues_sem_acento (COPY = pg_catalog.portuguese);
+        ALTER TEXT SEARCH CONFIGURATION public.portugues_sem_acento
+            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+    END IF;
+END$$;
+
+-- Colunas geradas: o Postgres recalcula o vetor a cada INSERT/UPDATE da linha, então a carga
+-- incremental do loader (só dispositivos novos ou alterados) mantém o índice em dia sem reindexar.
+ALTER TABLE public.dispositivo
+    ADD COLUMN IF NOT EXISTS busca TSVECTOR
+    GENERATED ALWAYS AS (to_tsvector('public.portugues_sem_acento'::regconfig, COALESCE(texto, ''))) STORED;
+
+ALTER TABLE public.ato_normativo
+    ADD COLUMN IF NOT EXISTS busca TSVECTOR
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('public.portugues_sem_acento'::regconfig, COALESCE(titulo, '')), 'A')
+        || setweight(to_tsvector('public.portugues_sem_acento'::regconfig, COALESCE(ementa, '')), 'B')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS dispositivo_busca_idx ON public.dispositivo USING GIN (busca);
+CREATE INDEX IF NOT EXISTS ato_normativo_busca_idx ON public.ato_normativo USING GIN (busca);
+
+-- Dispositivos que casam com a consulta (sintaxe de websearch: aspas, OR, -termo), ordenados pelo
+-- ts_rank_cd normalizado pelo tamanho do texto, com bônus quando o título/ementa do ato também casa.
+-- Filtros opcionais: prefixo de URN (jurisdição), tipos de ato e de dispositivo, situação de
+-- vigência do ato e data de vigência do dispositivo (mesma regra de texto_consolidado).
+CREATE OR REPLACE FUNCTION public.buscar_dispositivos(
+    p_consulta TEXT,
+    p_limite INTEGER DEFAULT 20,
+    p_jurisdicao TEXT DEFAULT NULL,
+    p_tipos_ato TEXT[] DEFAULT NULL,
+    p_tipos_dispositivo TEXT[] DEFAULT NULL,
+    p_status_vigencia TEXT[] DEFAULT NULL,
+    p_vigente_em DATE DEFAULT NULL
+)
+RETURNS TABLE (
+    dispositivo_id UUID,
+    ato_id UUID,
+    urn_lexml VARCHAR(255),
+    titulo TEXT,
+    tipo_ato VARCHAR(80),
+    status_vigencia VARCHAR(32),
+    id_lexml VARCHAR(255),
+    tipo public.tipo_dispositivo,
+    rotulo VARCHAR(160),
+    trecho TEXT,
+    relevancia REAL
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH consulta AS (
+        SELECT websearch_to_tsquery('public.portugues_sem_acento'::regconfig, p_consulta) AS q
+    ),
+    candidatos AS (
+        SELECT
+            d.id,
+            d.ato_id,
+            d.id_lexml,
+            d.tipo,
+            d.rotulo,
+            d.texto,
+            a.urn_lexml,
+            a.titulo,
+            a.tipo_ato,
+            a.status_vigencia,
+            (ts_rank_cd(d.busca, c.q, 1) + 0.5 * ts_rank_cd(a.busca, c.q, 1))::REAL AS relevancia
+        FROM consulta AS c
+        JOIN public.dispositivo AS d ON d.busca @@ c.q
+        JOIN public.ato_normativo AS a ON a.id = d.ato_id
+        WHERE (p_jurisdicao IS NULL OR a.urn_lexml LIKE p_jurisdicao || '%')
+          -- Tipos sem acento e com "." como separador, por prefixo: `lei` casa `lei.ordinária` e `Lei Complementar`.
+          AND (
+              p_tipos_ato IS NULL
+              OR EXISTS (
+                  SELECT 1 FROM unnest(p_tipos_ato) AS t
+                  WHERE regexp_replace(unaccent(lower(a.tipo_ato)), '[\s_/-]+', '.', 'g') LIKE t || '%'
+              )
+          )
+          AND (p_tipos_dispositivo IS NULL OR d.tipo::TEXT = ANY (p_tipos_dispositivo))
+          AND (p_status_vigencia IS NULL OR a.status_vigencia = ANY (p_status_vigencia))
+          AND (
+              p_vigente_em IS NULL
+              OR NOT EXISTS (SELECT 1 FROM public.versao_textual AS x WHERE x.dispositivo_id = d.id)
+              OR EXISTS (
+                  SELECT 1 FROM public.versao_textual AS vt
+                  WHERE vt.dispositivo_id = d.id AND vt.vigencia @> p_vigente_em
+              )
+          )
+        ORDER BY relevancia DESC
+        LIMIT GREATEST(p_limite, 1)
+    )
+    -- ts_headline é caro: só para os que vão ser devolvidos.
+    SELECT
+        k.id,
+        k.ato_id,
+        k.urn_lexml,
+        k.titulo,
+        k.tipo_ato,
+        k.status_vigencia,
+        k.id_lexml,
+        k.tipo,
+        k.rotulo,
+        ts_headline(
+            'public.portugues_sem_acento'::regconfig,
+            k.texto,
+            c.q,
+            'MaxFragments=2, MaxWords=30, MinWords=10, StartSel=«, StopSel=»'
+        ),
+        k.relevancia
+    FROM candidatos AS k
+    CROSS JOIN consulta AS c
+    ORDER BY k.relevancia DESC;
+$$;
+
+COMMENT ON FUNCTION public.buscar_dispositivos(TEXT, INTEGER, TEXT, TEXT[], TEXT[], TEXT[], DATE)
+    IS 'Busca textual (portuguese + unaccent) em dispositivos, com a URN do ato e filtros de jurisdição, tipo e vigência.';
+
+COMMIT;
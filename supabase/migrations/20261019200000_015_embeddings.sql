@@ -0,0 +1,52 @@
+-- Migração 015: Embeddings dos dispositivos (pgvector + HNSW), um por texto distinto e modelo
+
+BEGIN;
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+-- Chaveado pelo hash do texto e não pelo dispositivo: renormalizar um ato recria ou reaproveita
+-- dispositivos com o mesmo `hash_texto`, e textos repetidos ("Revogado.", fórmulas de vigência) são
+-- embutidos uma vez só. A dimensão é fixa para o índice HNSW; todos os embedders devolvem 384.
+CREATE TABLE IF NOT EXISTS public.embedding_texto (
+    hash_texto VARCHAR(64) NOT NULL,
+    modelo VARCHAR(120) NOT NULL,
+    embedding vector(384) NOT NULL,
+    criado_em TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (hash_texto, modelo)
+);
+
+CREATE INDEX IF NOT EXISTS embedding_texto_hnsw_idx
+    ON public.embedding_texto USING hnsw (embedding vector_cosine_ops)
+    WITH (m = 16, ef_construction = 64);
+
+CREATE INDEX IF NOT EXISTS dispositivo_hash_texto_idx ON public.dispositivo (hash_texto);
+
+-- Textos distintos de dispositivos ainda sem embedding do modelo, em ordem de hash (paginação por
+-- `p_apos`: hashes que falharem não voltam na mesma passada).
+CREATE OR REPLACE FUNCTION public.textos_sem_embedding(
+    p_modelo TEXT,
+    p_apos TEXT DEFAULT NULL,
+    p_limite INTEGER DEFAULT 1000
+)
+RETURNS TABLE (hash_texto VARCHAR(64), texto TEXT)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT DISTINCT ON (d.hash_texto) d.hash_texto, d.texto
+    FROM public.dispositivo AS d
+    WHERE d.hash_texto IS NOT NULL
+      AND (p_apos IS NULL OR d.hash_texto > p_apos)
+      AND NOT EXISTS (
+          SELECT 1 FROM public.embedding_texto AS e
+          WHERE e.hash_texto = d.hash_texto AND e.modelo = p_modelo
+      )
+    ORDER BY d.hash_texto
+    LIMIT GREATEST(p_limite, 1);
+$$;
+
+COMMENT ON TABLE public.embedding_texto
+    IS 'Embedding de cada texto distinto de dispositivo (por hash_texto), por modelo.';
+COMMENT ON FUNCTION public.textos_sem_embedding(TEXT, TEXT, INTEGER)
+    IS 'Textos de dispositivos cujo hash_texto ainda não tem embedding do modelo informado.';
+
+COMMIT;
@@ -0,0 +1,83 @@
+-- Migração 016: Busca vetorial em dispositivos (HNSW sobre embedding_texto) com os filtros da busca textual
+
+BEGIN;
+
+-- Vizinhos mais próximos do vetor da consulta entre os textos do modelo, expandidos para os
+-- dispositivos com esse texto e filtrados como em buscar_dispositivos. O HNSW só entrega os
+-- `p_candidatos` mais próximos antes dos filtros: com filtros muito seletivos, aumente o valor.
+CREATE OR REPLACE FUNCTION public.buscar_dispositivos_vetorial(
+    p_embedding vector(384),
+    p_modelo TEXT,
+    p_limite INTEGER DEFAULT 20,
+    p_candidatos INTEGER DEFAULT 200,
+    p_jurisdicao TEXT DEFAULT NULL,
+    p_tipos_ato TEXT[] DEFAULT NULL,
+    p_tipos_dispositivo TEXT[] DEFAULT NULL,
+    p_status_vigencia TEXT[] DEFAULT NULL,
+    p_vigente_em DATE DEFAULT NULL
+)
+RETURNS TABLE (
+    dispositivo_id UUID,
+    ato_id UUID,
+    urn_lexml VARCHAR(255),
+    titulo TEXT,
+    tipo_ato VARCHAR(80),
+    status_vigencia VARCHAR(32),
+    id_lexml VARCHAR(255),
+    tipo public.tipo_dispositivo,
+    rotulo VARCHAR(160),
+    trecho TEXT,
+    relevancia REAL
+)
+LANGUAGE sql
+STABLE
+SET hnsw.ef_search = 200
+AS $$
+    WITH vizinhos AS (
+        SELECT e.hash_texto, e.embedding <=> p_embedding AS distancia
+        FROM public.embedding_texto AS e
+        WHERE e.modelo = p_modelo
+        ORDER BY e.embedding <=> p_embedding
+        LIMIT GREATEST(p_candidatos, p_limite, 1)
+    )
+    SELECT
+        d.id,
+        d.ato_id,
+        a.urn_lexml,
+        a.titulo,
+        a.tipo_ato,
+        a.status_vigencia,
+        d.id_lexml,
+        d.tipo,
+        d.rotulo,
+        left(d.texto, 300),
+        (1 - v.distancia)::REAL
+    FROM vizinhos AS v
+    JOIN public.dispositivo AS d ON d.hash_texto = v.hash_texto
+    JOIN public.ato_normativo AS a ON a.id = d.ato_id
+    WHERE (p_jurisdicao IS NULL OR a.urn_lexml LIKE p_jurisdicao || '%')
+      AND (
+          p_tipos_ato IS NULL
+          OR EXISTS (
+              SELECT 1 FROM unnest(p_tipos_ato) AS t
+              WHERE regexp_replace(unaccent(lower(a.tipo_ato)), '[\s_/-]+', '.', 'g') LIKE t || '%'
+          )
+      )
+      AND (p_tipos_dispositivo IS NULL OR d.tipo::TEXT = ANY (p_tipos_dispositivo))
+      AND (p_status_vigencia IS NULL OR a.status_vigencia = ANY (p_status_vigencia))
+      AND (
+          p_vigente_em IS NULL
+          OR NOT EXISTS (SELECT 1 FROM public.versao_textual AS x WHERE x.dispositivo_id = d.id)
+          OR EXISTS (
+              SELECT 1 FROM public.versao_textual AS vt
+              WHERE vt.dispositivo_id = d.id AND vt.vigencia @> p_vigente_em
+          )
+      )
+    ORDER BY v.distancia, d.id
+    LIMIT GREATEST(p_limite, 1);
+$$;
+
+COMMENT ON FUNCTION public.buscar_dispositivos_vetorial(vector, TEXT, INTEGER, INTEGER, TEXT, TEXT[], TEXT[], TEXT[], DATE)
+    IS 'Dispositivos mais próximos (cosseno) do vetor da consulta, com os filtros de jurisdição, tipo e vigência.';
+
+COMMIT;
@@ -0,0 +1,128 @@
+"""Carga de artefatos do parser pelo loader (`src.loader.main.carregar_ato`)."""
+
+import hashlib
+import json
+from typing import Dict, List
+
+import pytest
+
+from src.loader import main as loader
+
+TEXTO_BRUTO = (
+    "LEI Nº 1, DE 2 DE JANEIRO DE 2020\n"
+    "Art. 1º Fica instituído o Dia Estadual da Conservação do Solo.\n"
+    "Art. 2º Esta Lei entra em vigor na data de sua publicação.\n"
+)
+ARTIGOS = (
+    "Art. 1º Fica instituído o Dia Estadual da Conservação do Solo.",
+    "Art. 2º Esta Lei entra em vigor na data de sua publicação.",
+)
+
+
+class RepositorioFalso:
+    def __init__(self) -> None:
+        self.chamadas: List[str] = []
+        self.transacional: Dict = {}
+        self.inseridas: Dict[str, List[Dict]] = {}
+
+    def dispositivos_existentes(self, fonte_documento_id: str) -> Dict:
+        return {}
+
+    def carregar_ato_transacional(self, ato: Dict, componentes: Dict, remover: List[str]) -> str:
+        self.chamadas.append("carregar_ato_transacional")
+        self.transacional = componentes
+        return "ato-1"
+
+    def upsert_ato(self, registro: Dict, estrutura: Dict, hash_json) -> str:
+        self.chamadas.append("upsert_ato")
+        return "ato-1"
+
+    def limpar_anexos_relacoes(self, ato_id: str) -> None:
+        self.chamadas.append("limpar_anexos_relacoes")
+
+    def inserir_em_massa(self, tabela: str, linhas: List[Dict], *, on_conflict=None) -> None:
+        self.chamadas.append("inserir_em_massa")
+        self.inseridas.setdefault(tabela, []).extend(linhas)
+
+    def remover_dispositivos(self, ato_id: str, ids: List[str]) -> None:
+        self.chamadas.append("remover_dispositivos")
+
+    def definir_hash_json(self, ato_id: str, hash_json: str) -> None:
+        self.chamadas.append("definir_hash_json")
+
+
+def _artefato(*, legado_037: bool) -> bytes:
+    """Formato compacto atual (cabeçalho antes de `dispositivos`) ou como gravado pela versão 037:
+    offsets sem `texto_em_offsets` e `formato` depois de `dispositivos`."""
+    dispositivos = []
+    for numero, texto in enumerate(ARTIGOS, start=1):
+        inicio = TEXTO_BRUTO.index(texto)
+        dispositivos.append(
+            {"tipo": "artigo", "rotulo": f"Art. {numero}º", "texto_offsets": [inicio, inicio + len(texto)], "filhos": []}
+        )
+    cabecalho = {
+        "fonte": {"urn_lexml": "br;go;estadual;lei;2020-01-02;1", "titulo": "Lei nº 1"},
+        "formato": 2,
+        "texto_bruto_hash": hashlib.sha256(TEXTO_BRUTO.encode("utf-8")).hexdigest(),
+    }
+    if legado_037:
+        estrutura = {"fonte": cabecalho.pop("fonte"), "dispositivos": dispositivos, "anexos": [], **cabecalho}
+    else:
+        estrutura = {**cabecalho, "texto_em_offsets": True, "dispositivos": dispositivos, "anexos": []}
+    return json.dumps(estrutura, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+@pytest.fixture
+def registro() -> Dict:
+    return {
+        "id": "doc-1",
+        "urn_lexml": "br;go;estadual;lei;2020-01-02;1",
+        "caminho_parser_json": "estruturados/lei-1.json",
+        "caminho_texto_bruto": "brutos/lei-1.txt",
+    }
+
+
+def _servir(monkeypatch: pytest.MonkeyPatch, conteudo: bytes) -> None:
+    monkeypatch.setattr(loader.storage_utils, "download_stream", lambda caminho: iter([conteudo[:40], conteudo[40:]]))
+    monkeypatch.setattr(loader.storage_utils, "download_text", lambda caminho: TEXTO_BRUTO)
+
+
+def test_artefato_037_reconstroi_textos_pelos_offsets(monkeypatch, registro):
+    _servir(monkeypatch, _artefato(legado_037=True))
+    repo = RepositorioFalso()
+
+    ok, hash_json = loader.carregar_ato(repo, registro, extrair_citacoes=False)
+
+    assert ok and hash_json
+    dispositivos = repo.transacional["dispositivo"]
+    assert [linha["texto"] for linha in dispositivos] == list(ARTIGOS)
+    vazio = hashlib.sha256(b"").hexdigest()
+    assert all(linha["hash_texto"] != vazio for linha in dispositivos)
+
+
+def test_artefato_truncado_nao_grava_nada_no_modo_lotes(monkeypatch, registro):
+    conteudo = _artefato(legado_037=False)
+    # Corta no meio do segundo artigo: o primeiro já foi lido inteiro.
+    _servir(monkeypatch, conteudo[: conteudo.rindex(b'{"tipo"') + 10])
+    repo = RepositorioFalso()
+
+    ok, _ = loader.carregar_ato(repo, registro, transacional=False, extrair_citacoes=False)
+
+    assert not ok
+    assert repo.chamadas == []
+
+
+def test_hash_ignora_metadados_volateis_e_coincide_com_o_do_parser(monkeypatch, registro):
+    estrutura = json.loads(_artefato(legado_037=False))
+    hashes = set()
+    for gerado_em, parser in (("2026-10-20T08:00:00", {"metodo": "llm"}), ("2026-10-21T09:30:00", {"metodo": "lote"})):
+        conteudo = loader.artefato.serializar({"gerado_em": gerado_em, "parser": parser, **estrutura})
+        hashes.add(loader.artefato.hash_conteudo(conteudo))
+        _servir(monkeypatch, conteudo)
+        ok, hash_json = loader.carregar_ato(RepositorioFalso(), registro, extrair_citacoes=False)
+        assert ok
+        hashes.add(hash_json)
+
+    assert len(hashes) == 1
+    estrutura["dispositivos"][0]["rotulo"] = "Art. 1"
+    assert loader.artefato.hash_conteudo(loader.artefato.serializar(estrutura)) not in hashes
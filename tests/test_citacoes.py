@@ -0,0 +1,62 @@
+"""Extração de citações normativas do texto dos dispositivos (`src.loader.citacoes`)."""
+
+import pytest
+
+from src.loader.citacoes import extrair_citacoes
+
+
+ESTADUAL = "br;go;estadual"
+
+
+def _tipos(texto):
+    return [citacao.tipo for citacao in extrair_citacoes(texto, jurisdicao=ESTADUAL)]
+
+
+def test_verbo_de_outra_oracao_nao_define_a_relacao():
+    texto = "Conforme a Lei nº 14.133, de 1º de abril de 2021, os contratos serão revogados no prazo de 30 dias."
+    assert _tipos(texto) == ["cita"]
+
+
+def test_citacao_em_adjunto_nao_recebe_o_verbo_seguinte():
+    texto = (
+        "Nos termos da Lei Federal nº 8.666, de 21 de junho de 1993, e da Lei nº 1, de 2 de janeiro de 2000, "
+        "fica alterado o art. 3º desta Lei."
+    )
+    assert _tipos(texto) == ["cita", "cita"]
+
+
+@pytest.mark.parametrize(
+    ("texto", "esperado"),
+    [
+        (
+            "A Lei nº 17.928, de 27 de dezembro de 2012, e Lei nº 18.000, de 1 de maio de 2013 passam a vigorar "
+            "com as seguintes alterações:",
+            ["altera", "altera"],
+        ),
+        ("Ficam revogadas a Lei nº 1, de 2 de março de 2000 e o Decreto nº 3, de 4 de abril de 2001.", ["revoga", "revoga"]),
+        ("O art. 2º da Lei nº 17.928, de 27 de dezembro de 2012, passa a vigorar com a seguinte redação:", ["altera"]),
+        ("Revoga-se a Lei nº 1, de 2 de março de 2000. Aplica-se a Lei nº 2, de 3 de março de 2001.", ["revoga", "cita"]),
+    ],
+)
+def test_verbo_na_mesma_oracao(texto, esperado):
+    assert _tipos(texto) == esperado
+
+
+@pytest.mark.parametrize(
+    ("texto", "esperado"),
+    [
+        # Sem esfera no texto e sem verbo que a implique: `cita` sem jurisdição (Lei 14.133 é federal).
+        ("Aplica-se a Lei nº 14.133, de 1º de abril de 2021.", [("cita", "br;lei;2021-04-01;14133")]),
+        ("Aplica-se a Lei Federal nº 8.666, de 21 de junho de 1993.", [("cita", "br;federal;lei;1993-06-21;8666")]),
+        ("Aplica-se a Lei estadual nº 5, de 1 de maio de 2013.", [("cita", "br;go;estadual;lei;2013-05-01;5")]),
+        # Um ato estadual só revoga atos estaduais.
+        ("Fica revogada a Lei nº 1, de 2 de março de 2000.", [("revoga", "br;go;estadual;lei;2000-03-02;1")]),
+    ],
+)
+def test_jurisdicao_da_urn(texto, esperado):
+    assert [(citacao.tipo, citacao.urn) for citacao in extrair_citacoes(texto, jurisdicao=ESTADUAL)] == esperado
+
+
+def test_sem_jurisdicao_do_ato_citante_nada_vira_estadual():
+    citacoes = extrair_citacoes("Fica revogada a Lei nº 1, de 2 de março de 2000.")
+    assert [(citacao.tipo, citacao.urn) for citacao in citacoes] == [("cita", "br;lei;2000-03-02;1")]
@@ -0,0 +1,43 @@
+"""Parser determinístico (`src.parser.deterministico.parsear`)."""
+
+from src.parser import deterministico
+
+TEXTO = (
+    "ESTADO DE GOIÁS\n"
+    "LEI Nº 1, DE 2 DE JANEIRO DE 2020\n"
+    "Institui o Dia Estadual da Conservação do Solo.\n"
+    "Art. 1º Fica instituído o Dia Estadual da Conservação do Solo, na forma do\n"
+    "Anexo a esta Lei, que define as ações do calendário.\n"
+    "Art. 2º Esta Lei entra em vigor na data de sua publicação.\n"
+    "PALÁCIO DO GOVERNO DO ESTADO DE GOIÁS, em Goiânia, 2 de janeiro de 2020.\n"
+    "ANEXO ÚNICO\n"
+    "Calendário de ações\n"
+)
+
+
+def test_titulo_do_registro_e_preservado():
+    resultado = deterministico.parsear(TEXTO, {"titulo": "Lei nº 1"})
+    assert "titulo" not in resultado.estrutura["fonte"]
+
+    resultado = deterministico.parsear(TEXTO, {})
+    assert resultado.estrutura["fonte"]["titulo"] == "ESTADO DE GOIÁS"
+
+
+def test_linha_do_corpo_iniciada_por_anexo_nao_abre_anexo():
+    resultado = deterministico.parsear(TEXTO, {"titulo": "Lei nº 1"})
+
+    artigos = resultado.estrutura["dispositivos"]
+    assert [artigo["rotulo"] for artigo in artigos] == ["Art. 1º", "Art. 2º"]
+    assert artigos[0]["texto"].endswith("que define as ações do calendário.")
+    assert [anexo["titulo"] for anexo in resultado.estrutura["anexos"]] == ["ANEXO ÚNICO"]
+
+
+def test_artigo_seguinte_devolve_o_anexo_ao_corpo():
+    texto = TEXTO.replace("Anexo a esta Lei", "ANEXO I").replace(", que define", "\nque define")
+    resultado = deterministico.parsear(texto, {"titulo": "Lei nº 1"})
+
+    artigos = resultado.estrutura["dispositivos"]
+    assert [artigo["rotulo"] for artigo in artigos] == ["Art. 1º", "Art. 2º"]
+    assert "ANEXO I" in artigos[0]["texto"]
+    assert [anexo["titulo"] for anexo in resultado.estrutura["anexos"]] == ["ANEXO ÚNICO"]
+    assert any("anexo seguido de artigo" in motivo for motivo in resultado.motivos)
@@ -0,0 +1,64 @@
+"""Continuação de respostas truncadas do LLM (`src.utils.llm._continuar_resposta_truncada`)."""
+
+import json
+from typing import List
+
+import pytest
+
+from src.utils import json_repair, llm
+from src.utils.llm_providers import RespostaLLM
+
+TEXTO = (
+    "Art. 1º Fica instituído o Dia Estadual da Conservação do Solo.\n"
+    "Art. 2º As ações do Dia Estadual observarão a Lei nº 1, de 2 de janeiro de 2020:\n"
+    "I - campanhas educativas;\n"
+    "II - plantio de mudas.\n"
+)
+ART_1 = {"rotulo": "Art. 1º", "texto": "Fica instituído o Dia Estadual da Conservação do Solo.", "filhos": []}
+ART_2 = {"rotulo": "Art. 2º", "texto": "As ações do Dia Estadual observarão a Lei nº 1, de 2 de janeiro de 2020:"}
+RELACAO = {"tipo": "cita", "alvo_urn": "br;go;estadual;lei;2020-01-02;1"}
+INCISOS = [
+    {"rotulo": "I", "texto": "campanhas educativas;", "filhos": []},
+    {"rotulo": "II", "texto": "plantio de mudas.", "filhos": []},
+]
+
+
+def _continuar(monkeypatch: pytest.MonkeyPatch, truncado: str, continuacao: dict) -> tuple:
+    prompts: List[str] = []
+
+    def gerar(provider, prompt, **kwargs):
+        prompts.append(prompt)
+        return RespostaLLM(texto=json.dumps(continuacao, ensure_ascii=False), modelo="teste")
+
+    monkeypatch.setattr(llm, "_gerar", gerar)
+    monkeypatch.setattr(llm, "obter_provider", lambda: None)
+    reparado = json_repair.reparar_json_truncado(truncado)
+    resultado = llm._continuar_resposta_truncada(
+        "teste", reparado, TEXTO, {"urn_lexml": "br;go;estadual;lei;2020-01-03;2"}, heuristicas=None, chunk_info=None
+    )
+    return resultado, prompts
+
+
+def test_dispositivo_cortado_antes_dos_filhos_e_repetido_com_eles(monkeypatch):
+    completo = json.dumps(
+        {"dispositivos": [ART_1, {**ART_2, "relacoes": [RELACAO], "filhos": INCISOS}]}, ensure_ascii=False
+    )
+    truncado = completo[: completo.index('"filhos": [{')]
+    continuacao = {"dispositivos": [{**ART_2, "relacoes": [RELACAO], "filhos": INCISOS}]}
+
+    resultado, prompts = _continuar(monkeypatch, truncado, continuacao)
+
+    assert "dentro do item \"Art. 2º\"" in prompts[0]
+    assert "Repita-o" in prompts[0]
+    assert resultado["dispositivos"] == [ART_1, {**ART_2, "relacoes": [RELACAO], "filhos": INCISOS}]
+
+
+def test_item_fora_do_texto_abandona_a_continuacao(monkeypatch):
+    outro = {"rotulo": "Art. 1º", "texto": "Texto que não está no ato enviado ao modelo.", "filhos": []}
+    completo = json.dumps({"dispositivos": [outro, ART_2]}, ensure_ascii=False)
+    truncado = completo[: completo.index('{"rotulo": "Art. 2º"') + 5]
+
+    resultado, prompts = _continuar(monkeypatch, truncado, {"dispositivos": [ART_2]})
+
+    assert resultado is None
+    assert prompts == []